@@ -1,33 +1,36 @@
 from Helper import *
 from World import *
-from Visualizer import *
 from Agent import *
 from Cell import *
 import datetime
 
-class Agent:
-
+class AgentBase:
     """
-    Ein Agent kann sich auf dem Grid bewegen und befindet sich dabei zu jedem Zeitpunkt auf einer Zelle.
+    Gemeinsames Verhalten von Agent und CompactAgent. Legt selbst keine Instanz-Attribute an (__slots__ = ()),
+    damit CompactAgent ohne Instanz-Dict auskommt.
     """
-    def __init__(self):
-        self.name = id(self)
-        self.residence_cell = Cell # Aktueller Aufenthaltsort. Typischerweise eine Zelle auf dem Grid.
-        self.x_grid_pos = int # Aktuelle Position/Koordinaten. Müssen eigentlich immer gleich der Position des Aufenthaltsortes sein
-        self.y_grid_pos = int
-        self.population = list # Die Populationsliste einer Welt, in der der Agent "existiert"/eingespeichert ist
 
+    __slots__ = ()
+
+    def get_local_values(self, create = False):
+        """ Dict für Attributwerte, die nicht in einer Spalte der Population liegen (siehe Population.py) """
+        return self.__dict__
 
     def move_in(self, new_residence_cell):
         """ Eine neue Zelle beziehen"""
         self.residence_cell = new_residence_cell                        # neuen Aufenthaltsort einspeichern
-        self.residence_cell.dict_of_residents.update({self.name: self}) # Bei Zelle anmelden
+        self.residence_cell.add_resident(self)                          # Bei Zelle anmelden
         self.x_grid_pos = self.residence_cell.x_grid_pos    # Koordinaten des neuen Aufenthaltsortes übernehmen
         self.y_grid_pos = self.residence_cell.y_grid_pos
         
         if not self.residence_cell.main_resident:
             self.residence_cell.main_resident = self
-            
+
+        world = getattr(self.residence_cell, "world", None)
+        if world:
+            world.update_occupancy(self.residence_cell)   # Bewohnerzahl und freie Zellen aktualisieren
+            if world.spatial_index is not None:
+                world.spatial_index.insert(self)          # Räumlichen Index aktualisieren
 
 
     def move_out(self):
@@ -35,7 +38,14 @@ class Agent:
         if self.residence_cell.main_resident == self:
             self.residence_cell.main_resident = None
             
-        del(self.residence_cell.dict_of_residents[self.name]) # sich selbst aus Dict löschen
+        self.residence_cell.remove_resident(self)             # sich selbst aus Dict löschen
+
+        world = getattr(self.residence_cell, "world", None)
+        if world:
+            world.update_occupancy(self.residence_cell)   # Bewohnerzahl und freie Zellen aktualisieren
+            if world.spatial_index is not None:
+                world.spatial_index.remove(self)          # Aus dem räumlichen Index austragen
+
         self.residence_cell = False             # Zelle als Aufenthaltsort entfernen
         self.x_grid_pos = None                  # X-Position entfernen
         self.y_grid_pos = None                  # Y-Position entfernen
@@ -55,7 +65,8 @@ class Agent:
     def die(self, heaven):
         """
         Lässt den Agenten sterben, indem er von der Zelle entfernt wird und nicht wieder auf dem Grid platziert wird,
-        sondern in einer externen Liste (heaven)
+        sondern in einer externen Liste (heaven).
+        O(1) nur in Populationen mit ordered = False, standardmäßig (ordered = True) rücken alle nachfolgenden Agenten nach
         """
         assert self in self.population                      # Sichergehen, dass man überhaupt selbst in der Population ist
 
@@ -65,13 +76,75 @@ class Agent:
 
     def get_agents_like_me(self, attribute_name, population):
         """Gibt eine Liste zurück, in der alle Agenten/Objekte sind,
-        die auf einem bestimmten Attributen gleich sind wie der Agent."""
+        die auf einem bestimmten Attributen gleich sind wie der Agent.
+        Hat die Population einen Gruppen-Index für das Attribut (Population.create_group_index()),
+        wird nur die Gruppe ausgelesen statt die ganze Population zu durchsuchen."""
         assert type(attribute_name) == str
+        if attribute_name in getattr(population, "group_indexes", {}):
+            return population.get_group(attribute_name, getattr(self, attribute_name))
         return [ agent for agent in population if getattr(agent, attribute_name) == getattr(self, attribute_name) ]
 
+    def count_agents_like_me(self, attribute_name, population):
+        """Gibt die Anzahl der Agenten zurück, die auf einem bestimmten Attribut gleich sind wie der Agent."""
+        assert type(attribute_name) == str
+        if attribute_name in getattr(population, "group_indexes", {}):
+            return population.count_group(attribute_name, getattr(self, attribute_name))
+        return sum(1 for agent in population if getattr(agent, attribute_name) == getattr(self, attribute_name))
 
+    def get_agents_in_radius(self, radius, population = None):
+        """
+        Gibt alle anderen Agenten zurück, deren Abstand höchstens radius ist (optional nur aus einer Population).
+        Benötigt den räumlichen Index der World (World.create_spatial_index()).
+        """
+        return self.residence_cell.world.spatial_index.query_radius(
+            self.x_grid_pos, self.y_grid_pos, radius, population, exclude=self)
 
+    def get_nearest_agents(self, k = 1, population = None):
+        """
+        Gibt die k nächsten anderen Agenten zurück, aufsteigend nach Abstand (optional nur aus einer Population).
+        Benötigt den räumlichen Index der World (World.create_spatial_index()).
+        """
+        return self.residence_cell.world.spatial_index.query_nearest(
+            self.x_grid_pos, self.y_grid_pos, k, population, exclude=self)
 
 
+class Agent(AgentBase):
 
+    """
+    Ein Agent kann sich auf dem Grid bewegen und befindet sich dabei zu jedem Zeitpunkt auf einer Zelle.
+    """
+    def __init__(self):
+        self.name = id(self)
+        self.residence_cell = Cell # Aktueller Aufenthaltsort. Typischerweise eine Zelle auf dem Grid.
+        self.x_grid_pos = int # Aktuelle Position/Koordinaten. Müssen eigentlich immer gleich der Position des Aufenthaltsortes sein
+        self.y_grid_pos = int
+        self.population = list # Die Populationsliste einer Welt, in der der Agent "existiert"/eingespeichert ist
+        self.slot = None # Position des Agenten in seiner Population (wird von Population gesetzt)
 
+
+class CompactAgent(AgentBase):
+    """
+    Speichersparender Agent ohne Instanz-Dict (__slots__). Nicht gesetzte Angaben sind None statt Platzhalter-Typen.
+
+    Eigene Attribute einer Unterklasse sollten entweder in __slots__ der Unterklasse stehen oder als Spalten der
+    Population deklariert werden (World.create_agents(..., attributes=...)), dann brauchen sie gar keinen Platz im
+    Agenten.
+    """
+
+    __slots__ = ("name", "residence_cell", "x_grid_pos", "y_grid_pos", "population", "slot", "local_values")
+
+    def __init__(self):
+        self.name = id(self)
+        self.residence_cell = None
+        self.x_grid_pos = None
+        self.y_grid_pos = None
+        self.population = None
+        self.slot = None
+        self.local_values = None    # Werte deklarierter Attribute, solange der Agent in keiner Population ist
+
+    def get_local_values(self, create = False):
+        if self.local_values is None:
+            if not create:
+                return {}
+            self.local_values = {}
+        return self.local_values
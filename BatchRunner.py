@@ -0,0 +1,136 @@
+import csv
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+"""
+Headless-Ausführung von Modellen ohne Visualizer.
+
+Ein Lauf (Replikat) besteht aus einer Welt-Fabrik (erstellt eine neue World), einer Schritt-Funktion
+(führt einen Tick auf der World aus), einer Anzahl an Ticks und einem Seed. Während des Laufs werden
+Metriken (Funktionen, die einen Wert aus der World berechnen) gesammelt.
+
+run_batch() verteilt mehrere Replikate auf einen Prozess-Pool. Fabrik, Schritt-Funktion und Metriken müssen dafür
+picklebar sein, also auf Modulebene definiert sein (Lambdas funktionieren nicht, functools.partial schon).
+Skripte, die run_batch() aufrufen, brauchen einen "if __name__ == '__main__':"-Block.
+"""
+
+
+def set_seed(seed):
+    """ Setzt den Zustand aller verwendeten Zufallsgeneratoren """
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+
+def run_replicate(
+        world_factory,
+        step_function,
+        n_ticks,
+        seed,
+        metrics = None,
+        recording_interval = 1,
+):
+    """
+    FUNCTION
+    Führt einen einzelnen Lauf aus.
+
+    INPUT
+    world_factory:      Funktion ohne Argumente, die eine neue World zurückgibt
+    step_function:      Funktion, die einen Tick auf der übergebenen World ausführt
+    n_ticks:            Anzahl der Ticks
+    seed:               Seed für random und numpy (wird vor dem Erstellen der World gesetzt)
+    metrics:            Dict {Name: Funktion(world) -> Wert}
+    recording_interval: Metriken werden alle recording_interval Ticks (und nach dem letzten Tick) erhoben
+
+    OUTPUT
+    Dict mit "seed", "tick" (Liste der Ticks, nach denen erhoben wurde), "runtime" und einer Liste pro Metrik
+    """
+    metrics = metrics or {}
+
+    set_seed(seed)
+    world = world_factory()
+
+    result = {"seed": seed, "tick": []}
+    result.update({metric_name: [] for metric_name in metrics})
+
+    time_t0 = time.perf_counter()
+
+    for tick in range(1, n_ticks + 1):
+        step_function(world)
+
+        if tick % recording_interval == 0 or tick == n_ticks:
+            result["tick"].append(tick)
+            for metric_name, metric_function in metrics.items():
+                result[metric_name].append(metric_function(world))
+
+    result["runtime"] = time.perf_counter() - time_t0
+
+    return result
+
+
+def run_batch(
+        world_factory,
+        step_function,
+        n_ticks,
+        seeds,
+        metrics = None,
+        recording_interval = 1,
+        n_processes = None,
+):
+    """
+    FUNCTION
+    Führt für jeden Seed ein Replikat aus, parallel auf einem Prozess-Pool.
+
+    INPUT
+    wie run_replicate(), aber mit einer Liste von Seeds
+    n_processes: Anzahl der Prozesse (None = alle Kerne, 1 = ohne Pool im aktuellen Prozess)
+
+    OUTPUT
+    Liste der Ergebnisse von run_replicate() in der Reihenfolge der Seeds
+    """
+    run = partial(
+        run_replicate,
+        world_factory,
+        step_function,
+        n_ticks,
+        metrics = metrics,
+        recording_interval = recording_interval,
+    )
+
+    if n_processes == 1:
+        return [run(seed) for seed in seeds]
+
+    with ProcessPoolExecutor(max_workers = n_processes) as executor:
+        return list(executor.map(run, seeds))
+
+
+def results_as_rows(results):
+    """
+    Wandelt die Ergebnisse von run_batch() in eine Tabelle (Liste von Dicts) mit einer Zeile pro Seed und Tick um
+    """
+    rows = []
+
+    for result in results:
+        metric_names = [key for key in result if key not in ("seed", "tick", "runtime")]
+
+        for i, tick in enumerate(result["tick"]):
+            row = {"seed": result["seed"], "tick": tick}
+            row.update({metric_name: result[metric_name][i] for metric_name in metric_names})
+            rows.append(row)
+
+    return rows
+
+
+def write_rows_to_csv(rows, path):
+    """ Schreibt eine Tabelle (Liste von Dicts, z.B. von results_as_rows() oder run_sweep()) als CSV-Datei """
+    fieldnames = []
+    for row in rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+
+    with open(path, "w", newline = "") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames = fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -1,34 +1,160 @@
 from Helper import *
 from World import *
-from Visualizer import *
 from Agent import *
 from Cell import *
+from types import MappingProxyType
 
 
-class Cell:
+# Position Von-Neumann-Nachbarn (Relativ)
+REL_POS_NEUMANN_NEIGHBORS = (
+    (0, -1),
+    (1, 0),
+    (0, 1),
+    (-1, 0),
+)
+
+# Position Moore-Nachbarn (Relativ)
+REL_POS_MOORE_NEIGHBORS = (
+    (-1, -1),
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (1, 1),
+    (0, 1),
+    (-1, 1),
+    (-1, 0),
+)
+
+NAMED_NEIGHBORHOODS = {
+    "neumann": REL_POS_NEUMANN_NEIGHBORS,
+    "moore": REL_POS_MOORE_NEIGHBORS,
+}
+
+
+def get_rel_pos_neighbors(rel_pos_neighbors):
     """
-    Cells sind die Felder auf dem Grid.
-    Sie verlassen niemals ihre Position und können somit immer über ihre Position gefunden werden.
-    Sie können Agenten beherbergen.
+    Übersetzt "neumann" bzw. "moore" in die Liste der relativen Nachbarpositionen.
+    Eine eigene Liste von (X-Abweichung, Y-Abweichung)-Paaren wird als Tupel von Tupeln zurückgegeben.
     """
+    if isinstance(rel_pos_neighbors, str):
+        return NAMED_NEIGHBORHOODS[rel_pos_neighbors]
+    return tuple((int(rel_x), int(rel_y)) for rel_x, rel_y in rel_pos_neighbors)
 
-    def __init__(
-            self,
-            x_grid_pos,
-            y_grid_pos,
-            ):
 
-        self.x_grid_pos = x_grid_pos  # Unveränderliche Position auf der X-Achse des Grids
-        self.y_grid_pos = y_grid_pos  # Unveränderliche Position auf der Y-Achse des Grids
+# Rückgabewert von CellBase.pop_local_value(), wenn die Zelle keinen eigenen Wert hat
+NO_VALUE = object()
 
-        self.walkable = True    # gibt an, ob die Zelle begehbar ist für Agenten
-        self.main_resident = None
-        
-        # noch latest_resident und list_of_residents einbauen
 
-        self.dict_of_residents = {}  
+class GridArrayAttribute:
+    """
+    Deskriptor für Zellen-Attribute, deren Werte nicht in der Zelle selbst, sondern in einem 2-D-Array der World
+    liegen (World.cell_arrays[name][y, x]). Die Zelle ist damit nur noch eine Sicht auf die Arrays.
+
+    Solange eine Zelle zu keiner World gehört (oder die World das Array nicht kennt), wird der Wert wie ein
+    normales Attribut in der Zelle selbst gespeichert (siehe CellBase.get_local_values()).
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+    def get_array(self, cell):
+        world = getattr(cell, "world", None)
+        if world is not None:
+            return world.cell_arrays.get(self.name)
+        return None
 
-        self.neighbor_cells = []  # benachbarte Cells, je nach Definition von Nachbar
+    def __get__(self, cell, owner=None):
+        if cell is None:
+            return self
+
+        array = self.get_array(cell)
+        if array is not None:
+            return array.item(cell.y_grid_pos, cell.x_grid_pos)
+        return cell.get_local_values().get(self.name, self.default)
+
+    def __set__(self, cell, value):
+        array = self.get_array(cell)
+        if array is not None:
+            array[cell.y_grid_pos, cell.x_grid_pos] = value
+        else:
+            cell.get_local_values(create=True)[self.name] = value
+
+
+class MainResidentAttribute(GridArrayAttribute):
+    """
+    Im Array wird nur der Name (die ID) des Hauptbewohners gespeichert (-1 = kein Hauptbewohner).
+    Beim Lesen wird die ID über dict_of_residents wieder in den Agenten übersetzt.
+    """
+
+    def __get__(self, cell, owner=None):
+        if cell is None:
+            return self
+
+        array = self.get_array(cell)
+        if array is not None:
+            resident_id = array.item(cell.y_grid_pos, cell.x_grid_pos)
+            return None if resident_id < 0 else cell.get_resident(resident_id)
+        return cell.get_local_values().get(self.name, self.default)
+
+    def __set__(self, cell, value):
+        array = self.get_array(cell)
+        if array is not None:
+            array[cell.y_grid_pos, cell.x_grid_pos] = -1 if value is None else value.name
+        else:
+            cell.get_local_values(create=True)[self.name] = value
+
+
+class CellBase:
+    """
+    Gemeinsames Verhalten von Cell und CompactCell. Legt selbst keine Instanz-Attribute an (__slots__ = ()),
+    die Unterklassen geben ihre Attribute in __slots__ an (darunter local_values).
+    """
+
+    __slots__ = ()
+
+    walkable = GridArrayAttribute("walkable", True)         # gibt an, ob die Zelle begehbar ist für Agenten
+    main_resident = MainResidentAttribute("main_resident")  # Agent, der die Zelle als erstes bezogen hat
+
+    def get_local_values(self, create = False):
+        """ Dict für Attributwerte, die (noch) nicht in den Arrays einer World liegen (wird erst bei Bedarf angelegt) """
+        if self.local_values is None:
+            if not create:
+                return {}
+            self.local_values = {}
+        return self.local_values
+
+    def pop_local_value(self, attribute_name):
+        """
+        Entfernt den Wert eines Attributs, der bisher in der Zelle selbst lag (in get_local_values() oder im
+        Instanz-Dict), z.B. weil das Attribut jetzt in einem Array der World liegt. Gibt NO_VALUE zurück, wenn es keinen
+        solchen Wert gibt.
+        """
+        local_values = self.get_local_values()
+        if attribute_name in local_values:
+            return local_values.pop(attribute_name)
+
+        instance_dict = getattr(self, "__dict__", None)
+        if instance_dict is None:
+            return NO_VALUE
+
+        value = instance_dict.pop(attribute_name, NO_VALUE)
+        if not instance_dict:
+            del self.__dict__   # leeres (evtl. eben erst angelegtes) Instanz-Dict wieder freigeben
+        return value
+
+    def connect_to_world(self, world):
+        """
+        Verbindet die Zelle mit einer World. Werte von Array-Attributen, die bisher in der Zelle selbst
+        zwischengespeichert wurden, werden dabei in die Arrays der World übertragen.
+        """
+        self.world = world
+
+        local_values = self.get_local_values()
+        if local_values:
+            for attribute_name in world.cell_arrays:
+                if attribute_name in local_values:
+                    setattr(self, attribute_name, local_values.pop(attribute_name))
 
     def __repr__(self):
         return f"Cell at grid_pos {self.x_grid_pos} {self.y_grid_pos}"
@@ -71,10 +197,11 @@ class Cell:
             target_x_grid_pos = (self.x_grid_pos + target_rel_x_grid_pos)
             target_y_grid_pos = (self.y_grid_pos + target_rel_y_grid_pos)
 
-        # Schlägt fehl, wenn die Position außerhalb des Grids ist und Torus nicht aktiviert ist!
-        try:
+        # Außerhalb des Grids (nur ohne Torus möglich) gibt es kein Ziel.
+        # Negative Positionen müssen explizit abgefangen werden, da sie sonst als Index von hinten gelten würden.
+        if 0 <= target_x_grid_pos < len_x_grid_dim and 0 <= target_y_grid_pos < len_y_grid_dim:
             target = grid[target_y_grid_pos][target_x_grid_pos]
-        except IndexError:
+        else:
             target = None
 
         return target
@@ -95,6 +222,7 @@ class Cell:
         INPUT
         rel_pos_neighbors: Liste mit den relativen Positionen der Nachbarn vom Agent aus gesehen. Eine relative Position
                             besteht aus einer X- und einer Y-Abweichung auf bezüglich des Agenten.
+                            Alternativ "neumann" oder "moore".
         
         len_x_grid_dim,
         len_y_grid_dim:    Länge der x- und y-Dimensionen des Grids.
@@ -102,32 +230,11 @@ class Cell:
 
         OUTPUT
         self.neighbors
+
+        Für das gesamte Grid ist World.set_neighbor_cells() deutlich schneller.
         """
 
-        # Position Von-Neumann-Nachbarn (Relativ)
-        rel_pos_neumann_neighbors = [
-            (0, -1),
-            (1, 0),
-            (0, 1),
-            (-1, 0),
-        ]
-        # Position Moore-Nachbarn (Relativ)
-        rel_pos_moore_neighbors = [
-            (-1, -1),
-            (0, -1),
-            (1, -1),
-            (1, 0),
-            (1, 1),
-            (0, 1),
-            (-1, 1),
-            (-1, 0),
-        ]
-
-
-        if rel_pos_neighbors == "neumann":
-            rel_pos_neighbors = rel_pos_neumann_neighbors
-        elif rel_pos_neighbors == "moore":
-            rel_pos_neighbors = rel_pos_moore_neighbors
+        rel_pos_neighbors = get_rel_pos_neighbors(rel_pos_neighbors)
 
         arounding_cells = []
 
@@ -147,3 +254,155 @@ class Cell:
     def count_attribute_values_of_neighbor_cells(self, attribute_name, attribute_value):
         return sum( [1 for neigh in self.neighbor_cells if getattr(neigh, attribute_name) == attribute_value] )
 
+
+NO_RESIDENTS = MappingProxyType({})
+
+
+class Cell(CellBase):
+    """
+    Cells sind die Felder auf dem Grid.
+    Sie verlassen niemals ihre Position und können somit immer über ihre Position gefunden werden.
+    Sie können Agenten beherbergen.
+
+    Attribute wie walkable oder main_resident liegen in den Arrays der World (siehe GridArrayAttribute),
+    sobald die Zelle zu einer World gehört.
+
+    Die festen Attribute stehen in __slots__. Das Instanz-Dict für eigene Attribute (cell.foo = ...) wird erst
+    angelegt, wenn eines gesetzt wird, und das Bewohner-Dict erst beim ersten Einzug. Eine leere Zelle ohne eigene
+    Attribute besteht damit nur aus dem Objekt selbst. Bewohner werden über add_resident() und remove_resident()
+    geändert (wie in Agent.move_in() und Agent.move_out()), ohne Bewohner ist dict_of_residents schreibgeschützt.
+    """
+
+    __slots__ = ("world", "x_grid_pos", "y_grid_pos", "residents", "neighbor_cells", "local_values",
+                 "__dict__", "__weakref__")
+
+    def __init__(
+            self,
+            x_grid_pos,
+            y_grid_pos,
+            ):
+
+        self.world = None  # Welt, zu deren Grid die Zelle gehört (wird von World.create_grid() gesetzt)
+
+        self.x_grid_pos = x_grid_pos  # Unveränderliche Position auf der X-Achse des Grids
+        self.y_grid_pos = y_grid_pos  # Unveränderliche Position auf der Y-Achse des Grids
+
+        # noch latest_resident und list_of_residents einbauen
+
+        self.residents = None  # {Agent.name: Agent}, wird beim ersten Einzug angelegt (siehe dict_of_residents)
+
+        self.neighbor_cells = ()  # benachbarte Cells, je nach Definition von Nachbar (siehe World.set_neighbor_cells())
+
+        self.local_values = None  # Attributwerte, solange die Zelle zu keiner World gehört
+
+    @property
+    def dict_of_residents(self):
+        """ {Agent.name: Agent} der Bewohner (ohne Bewohner eine leere, schreibgeschützte Sicht) """
+        residents = self.residents
+        return NO_RESIDENTS if residents is None else residents
+
+    @dict_of_residents.setter
+    def dict_of_residents(self, residents):
+        self.residents = dict(residents) or None
+
+    def add_resident(self, agent):
+        residents = self.residents
+        if residents is None:
+            self.residents = {agent.name: agent}
+        else:
+            residents[agent.name] = agent
+
+    def remove_resident(self, agent):
+        residents = self.residents
+        if residents is None:
+            raise KeyError(agent.name)
+        del residents[agent.name]
+        if not residents:
+            self.residents = None
+
+    def get_resident(self, resident_id):
+        """ Bewohner mit dem Namen (der ID) resident_id oder None """
+        residents = self.residents
+        return None if residents is None else residents.get(resident_id)
+
+    def count_residents(self):
+        residents = self.residents
+        return 0 if residents is None else len(residents)
+
+
+class CompactCell(CellBase):
+    """
+    Speichersparende Zelle ohne Instanz-Dict (__slots__).
+
+    Bewohner werden erst bei Bedarf angelegt: Ohne Bewohner ist residents None, mit einem Bewohner der Agent selbst,
+    erst ab zwei Bewohnern ein Dict. dict_of_residents ist eine schreibgeschützte Sicht darauf, Bewohner werden nur über
+    add_resident() und remove_resident() geändert (wie in Agent.move_in() und Agent.move_out()).
+
+    Unterklassen mit eigenen Attributen sollten diese ebenfalls in __slots__ angeben, sonst bekommen sie wieder ein
+    Instanz-Dict. Zusätzliche Zellen-Attribute können auch über World.declare_cell_attribute() als Arrays angelegt
+    werden.
+    """
+
+    __slots__ = ("world", "x_grid_pos", "y_grid_pos", "residents", "neighbor_cells", "local_values")
+
+    def __init__(
+            self,
+            x_grid_pos,
+            y_grid_pos,
+            ):
+
+        self.world = None
+        self.x_grid_pos = x_grid_pos
+        self.y_grid_pos = y_grid_pos
+        self.residents = None
+        self.neighbor_cells = ()    # Wird von World.set_neighbor_cells() gesetzt
+        self.local_values = None    # Attributwerte, solange die Zelle zu keiner World gehört
+
+    @property
+    def dict_of_residents(self):
+        residents = self.residents
+        if residents is None:
+            return NO_RESIDENTS
+        if isinstance(residents, dict):
+            return MappingProxyType(residents)
+        return MappingProxyType({residents.name: residents})
+
+    @dict_of_residents.setter
+    def dict_of_residents(self, residents):
+        self.residents = None
+        for agent in residents.values():
+            self.add_resident(agent)
+
+    def add_resident(self, agent):
+        residents = self.residents
+        if residents is None or residents is agent:
+            self.residents = agent
+        elif isinstance(residents, dict):
+            residents[agent.name] = agent
+        else:
+            self.residents = {residents.name: residents, agent.name: agent}
+
+    def remove_resident(self, agent):
+        residents = self.residents
+        if isinstance(residents, dict):
+            del residents[agent.name]
+            if len(residents) == 1:
+                self.residents = next(iter(residents.values()))
+        elif residents is not None and residents.name == agent.name:
+            self.residents = None
+        else:
+            raise KeyError(agent.name)
+
+    def get_resident(self, resident_id):
+        residents = self.residents
+        if isinstance(residents, dict):
+            return residents.get(resident_id)
+        if residents is not None and residents.name == resident_id:
+            return residents
+        return None
+
+    def count_residents(self):
+        residents = self.residents
+        if residents is None:
+            return 0
+        return len(residents) if isinstance(residents, dict) else 1
@@ -0,0 +1,430 @@
+import io
+import json
+import pickle
+import random
+import struct
+import types
+
+import numpy as np
+
+from Population import *
+
+"""
+Binäre Checkpoints einer World, um lange Läufe anzuhalten, in einem anderen Prozess fortzusetzen oder nach einem
+Absturz ab einem bestimmten Tick neu zu starten.
+
+Aufbau einer Checkpoint-Datei (Format-Version 1):
+
+    b"SAMPYCKP" | Format-Version (uint32) | Länge des Headers (uint32) | Header (JSON) | Sektionen
+
+Alle Sektionen beginnen an einer durch 64 teilbaren Position. Der Header beschreibt jede Sektion mit Offset, Länge,
+dtype und Form. Numerische Arrays (Zellen-Arrays, Spalten der Populationen, Freie-Zellen-Index) liegen roh in der
+Datei und können beim Laden per np.memmap eingebunden werden. Alles andere (Agenten- und Zellenzustände außerhalb der
+Arrays, Zustand der Zufallsgeneratoren, ...) steht in zwei Pickle-Sektionen. Verweise auf Agenten, Zellen,
+Populationen und die World werden dabei als IDs gespeichert, damit auch stark vernetzte Agenten (z.B. über Listen von
+Nachbarn) ohne tiefe Rekursion gespeichert werden können.
+
+Nicht gespeichert werden: Klassenattribute (z.B. über Controller veränderte Parameter), der Rekorder, der Profiler und
+Nachbarzellen, die nicht über World.set_neighbor_cells() gesetzt wurden.
+"""
+
+CHECKPOINT_MAGIC = b"SAMPYCKP"
+CHECKPOINT_FORMAT_VERSION = 1
+SECTION_ALIGNMENT = 64
+
+# Attribute der World, die nicht gepickelt, sondern neu aufgebaut bzw. als Arrays gespeichert werden
+WORLD_ATTRIBUTES_NOT_PICKLED = (
+    "grid_as_matrix",
+    "grid_as_flat_list",
+    "NW_grid_as_flat_list",
+    "NE_grid_as_flat_list",
+    "SW_grid_as_flat_list",
+    "SE_grid_as_flat_list",
+    "cell_arrays",
+    "free_cells",
+    "neighbor_tables",
+    "agent_cell_indices_cache",
+    "agents",
+    "heaven",
+    "recorder",
+    "profiler",
+)
+
+# Attribute der Zellen, die beim Laden neu aufgebaut werden
+CELL_ATTRIBUTES_NOT_PICKLED = ("x_grid_pos", "y_grid_pos", "world", "neighbor_cells", "dict_of_residents",
+                               "residents", "local_values")
+
+
+def align(position):
+    return position + (-position) % SECTION_ALIGNMENT
+
+
+class ReferencePickler(pickle.Pickler):
+    """ Pickler, der bekannte Objekte (Agenten, Zellen, Populationen, World) nur als ID speichert """
+
+    def __init__(self, file, references):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.references = references
+
+    def persistent_id(self, obj):
+        return self.references.get(id(obj))
+
+
+class ReferenceUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, objects):
+        super().__init__(file)
+        self.objects = objects
+
+    def persistent_load(self, reference):
+        return self.objects[reference]
+
+
+def get_slot_names(obj):
+    """ Namen aller __slots__-Attribute eines Objekts (z.B. CompactCell, CompactAgent) """
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for slot_name in ((slots,) if isinstance(slots, str) else slots):
+            # Slots, die durch einen Deskriptor (z.B. PopulationAttribute) ersetzt wurden, werden übersprungen
+            if isinstance(getattr(type(obj), slot_name, None), types.MemberDescriptorType):
+                yield slot_name
+
+
+def get_object_state(obj):
+    """ Instanz-Dict und gesetzte Slots eines Objekts """
+    state = dict(getattr(obj, "__dict__", {}))
+    for slot_name in get_slot_names(obj):
+        if hasattr(obj, slot_name):
+            state[slot_name] = getattr(obj, slot_name)
+    return state
+
+
+def set_object_state(obj, state):
+    """ Gegenstück zu get_object_state(), umgeht dabei Deskriptoren wie dict.update() auf dem Instanz-Dict """
+    slot_names = set(get_slot_names(obj))
+    local_values = {}
+
+    for key, value in state.items():
+        if key in slot_names:
+            object.__setattr__(obj, key, value)
+        else:
+            local_values[key] = value
+
+    # Übrige Einträge stammen aus dem Instanz-Dict (bei Objekten ohne Instanz-Dict aus get_local_values())
+    if local_values:
+        if hasattr(obj, "__dict__"):
+            obj.__dict__.update(local_values)
+        else:
+            obj.get_local_values(create=True).update(local_values)
+
+
+def is_raw_array(array):
+    return isinstance(array, np.ndarray) and array.dtype != np.dtype(object)
+
+
+########################################################################################################################
+# Speichern
+########################################################################################################################
+
+def save_world_checkpoint(world, path):
+    """
+    FUNCTION
+    Speichert den vollständigen Zustand einer World inklusive der Zufallsgeneratoren (random und numpy).
+
+    INPUT
+    world: Die zu speichernde World
+    path:  Pfad der Checkpoint-Datei
+    """
+
+    arrays = {}     # Name der Sektion -> Array
+    references = {id(world): ("world",)}
+
+    # Zellen
+    for flat_index, cell in enumerate(world.grid_as_flat_list):
+        references[id(cell)] = ("cell", flat_index)
+
+    for attribute_name, array in world.cell_arrays.items():
+        arrays["cell_arrays/" + attribute_name] = array
+
+    n_free = world.free_cells.n_free
+    arrays["free_cells/cells"] = world.free_cells.cells
+    arrays["free_cells/positions"] = world.free_cells.positions
+
+    # Populationen
+    skeleton_populations = []
+    population_states = {}
+
+    for population_name, population in world.agents.items():
+        references[id(population)] = ("population", population_name)
+        agents = list(population)
+
+        for slot, agent in enumerate(agents):
+            references[id(agent)] = ("agent", population_name, slot)
+
+        skeleton_populations.append((population_name, type(population), [type(agent) for agent in agents]))
+
+        state = {"agent_states": [get_object_state(agent) for agent in agents], "object_columns": {}}
+
+        if hasattr(population, "columns"):
+            state["population_state"] = {key: value for key, value in population.__dict__.items()
+                                         if key not in ("agents", "columns")}
+            for column_name, column in population.columns.items():
+                if is_raw_array(column):
+                    arrays["populations/" + population_name + "/" + column_name] = column
+                else:
+                    state["object_columns"][column_name] = column.tolist()
+
+        population_states[population_name] = state
+
+    # Himmel
+    for i, agent in enumerate(world.heaven):
+        references[id(agent)] = ("heaven", i)
+
+    # Zustände außerhalb der Arrays
+    cell_states = {}
+    residents = {}
+    for flat_index, cell in enumerate(world.grid_as_flat_list):
+        extra_state = {key: value for key, value in get_object_state(cell).items()
+                       if key not in CELL_ATTRIBUTES_NOT_PICKLED}
+        if extra_state:
+            cell_states[flat_index] = extra_state
+        if cell.dict_of_residents:
+            residents[flat_index] = list(cell.dict_of_residents.values())
+
+    states = {
+        "world_state": {key: value for key, value in world.__dict__.items()
+                        if key not in WORLD_ATTRIBUTES_NOT_PICKLED},
+        "cell_states": cell_states,
+        "residents": residents,
+        "populations": population_states,
+        "heaven_states": [get_object_state(agent) for agent in world.heaven],
+        "heaven_attributes": getattr(world.heaven, "__dict__", {}),
+        "random_state": random.getstate(),
+        "numpy_random_state": np.random.get_state(),
+    }
+
+    skeleton = {
+        "world_class": type(world),
+        "cell_class": world.cell_class,
+        "populations": skeleton_populations,
+        "heaven_class": type(world.heaven),
+        "heaven": [type(agent) for agent in world.heaven],
+    }
+
+    skeleton_bytes = pickle.dumps(skeleton, protocol=pickle.HIGHEST_PROTOCOL)
+
+    states_buffer = io.BytesIO()
+    ReferencePickler(states_buffer, references).dump(states)
+    states_bytes = states_buffer.getvalue()
+
+    # Sektionen anordnen (Offsets relativ zum Beginn des Datenbereichs)
+    sections = {}
+    position = 0
+
+    for name, data in (("skeleton", skeleton_bytes), ("states", states_bytes)):
+        sections[name] = {"offset": position, "nbytes": len(data)}
+        position = align(position + len(data))
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        sections[name] = {
+            "offset": position,
+            "nbytes": array.nbytes,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        position = align(position + array.nbytes)
+
+    header = json.dumps({
+        "len_x_grid_dim": world.len_x_grid_dim,
+        "len_y_grid_dim": world.len_y_grid_dim,
+        "n_free_cells": int(n_free),
+        "sections": sections,
+    }).encode("utf-8")
+
+    data_start = align(len(CHECKPOINT_MAGIC) + 8 + len(header))
+
+    with open(path, "wb") as file:
+        file.write(CHECKPOINT_MAGIC)
+        file.write(struct.pack("<II", CHECKPOINT_FORMAT_VERSION, len(header)))
+        file.write(header)
+
+        for name, data in (("skeleton", skeleton_bytes), ("states", states_bytes)):
+            file.seek(data_start + sections[name]["offset"])
+            file.write(data)
+
+        for name, array in arrays.items():
+            file.seek(data_start + sections[name]["offset"])
+            array.tofile(file)
+
+
+########################################################################################################################
+# Laden
+########################################################################################################################
+
+def read_checkpoint_header(path):
+    """ Liest den Header einer Checkpoint-Datei und gibt ihn zusammen mit dem Beginn des Datenbereichs zurück """
+    with open(path, "rb") as file:
+        if file.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} is not a sampy checkpoint")
+
+        format_version, header_length = struct.unpack("<II", file.read(8))
+        if format_version > CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f"Checkpoint format version {format_version} is newer than supported "
+                             f"version {CHECKPOINT_FORMAT_VERSION}")
+
+        header = json.loads(file.read(header_length).decode("utf-8"))
+
+    header["format_version"] = format_version
+    return header, align(len(CHECKPOINT_MAGIC) + 8 + header_length)
+
+
+def read_checkpoint_arrays(path, mmap_mode = "r"):
+    """
+    Gibt alle Array-Sektionen eines Checkpoints als Dict {Name: Array} zurück, ohne die World wieder aufzubauen.
+    Mit mmap_mode = "r" (Standard) werden die Arrays nur eingeblendet, mit None in den Arbeitsspeicher gelesen.
+    Namen: "cell_arrays/<Attribut>", "populations/<Population>/<Attribut>", "free_cells/cells", "free_cells/positions"
+    """
+    header, data_start = read_checkpoint_header(path)
+    arrays = {}
+
+    for name, section in header["sections"].items():
+        if "dtype" not in section:
+            continue
+
+        dtype = np.dtype(section["dtype"])
+        shape = tuple(section["shape"])
+
+        if mmap_mode and section["nbytes"] > 0:
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mmap_mode,
+                                     offset=data_start + section["offset"], shape=shape)
+        else:
+            with open(path, "rb") as file:
+                file.seek(data_start + section["offset"])
+                arrays[name] = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+    return arrays
+
+
+def read_section_bytes(path, section, data_start):
+    with open(path, "rb") as file:
+        file.seek(data_start + section["offset"])
+        return file.read(section["nbytes"])
+
+
+def load_world_checkpoint(path, mmap_arrays = False, restore_random_state = True):
+    """
+    FUNCTION
+    Baut eine World aus einer Checkpoint-Datei wieder auf.
+
+    INPUT
+    path:                 Pfad der Checkpoint-Datei
+    mmap_arrays:          Arrays per np.memmap (copy-on-write) einbinden statt sie einzulesen
+    restore_random_state: Zustand von random und numpy.random wiederherstellen
+
+    OUTPUT
+    Die World. Die Klassen der World, Zellen und Agenten müssen importierbar sein;
+    die World-Klasse muss mit (len_x_grid_dim, len_y_grid_dim) erstellt werden können.
+    """
+    header, data_start = read_checkpoint_header(path)
+    sections = header["sections"]
+    arrays = read_checkpoint_arrays(path, mmap_mode = "c" if mmap_arrays else None)
+
+    skeleton = pickle.loads(read_section_bytes(path, sections["skeleton"], data_start))
+
+    # World und Grid aufbauen
+    world_class = skeleton["world_class"]
+    world = world_class.__new__(world_class)
+    world_class.__init__(world, header["len_x_grid_dim"], header["len_y_grid_dim"])
+    world.create_grid(skeleton["cell_class"])
+
+    # Leere Objekte anlegen, auf die beim Entpickeln verwiesen wird
+    objects = {("world",): world}
+    for flat_index, cell in enumerate(world.grid_as_flat_list):
+        objects[("cell", flat_index)] = cell
+
+    populations = {}
+    for population_name, population_class, agent_classes in skeleton["populations"]:
+        population = population_class() if population_class is list else population_class.__new__(population_class)
+        agents = [agent_class.__new__(agent_class) for agent_class in agent_classes]
+
+        objects[("population", population_name)] = population
+        for slot, agent in enumerate(agents):
+            objects[("agent", population_name, slot)] = agent
+
+        populations[population_name] = (population, agents)
+
+    heaven = [agent_class.__new__(agent_class) for agent_class in skeleton["heaven"]]
+    for i, agent in enumerate(heaven):
+        objects[("heaven", i)] = agent
+
+    states = ReferenceUnpickler(io.BytesIO(read_section_bytes(path, sections["states"], data_start)), objects).load()
+
+    # World-Zustand und Zellen-Arrays
+    world.__dict__.update(states["world_state"])
+
+    for attribute_name, (dtype, default) in world.cell_attribute_declarations.items():
+        world.declare_cell_attribute(attribute_name, dtype, default)
+
+    for name, array in arrays.items():
+        if name.startswith("cell_arrays/"):
+            world.cell_arrays[name[len("cell_arrays/"):]] = array
+
+    world.free_cells.cells = arrays["free_cells/cells"]
+    world.free_cells.positions = arrays["free_cells/positions"]
+    world.free_cells.n_free = header["n_free_cells"]
+
+    # Populationen
+    for population_name, (population, agents) in populations.items():
+        state = states["populations"][population_name]
+
+        for agent, agent_state in zip(agents, state["agent_states"]):
+            set_object_state(agent, agent_state)
+
+        if isinstance(population, list):
+            population.extend(agents)
+        else:
+            population.__dict__.update(state["population_state"])
+            population.agents = agents
+            population.columns = {}
+
+            for column_name in population.defaults:
+                section_name = "populations/" + population_name + "/" + column_name
+                if section_name in arrays:
+                    population.columns[column_name] = arrays[section_name]
+                else:
+                    column = np.empty(population.capacity, dtype=object)
+                    column[:] = state["object_columns"][column_name]
+                    population.columns[column_name] = column
+
+            # Deskriptoren in den (in diesem Prozess evtl. noch unveränderten) Agentenklassen hinterlegen
+            for agent_class in population.agent_classes:
+                for column_name in population.columns:
+                    population.add_descriptor(agent_class, column_name)
+
+        world.agents[population_name] = population
+
+    for agent, agent_state in zip(heaven, states["heaven_states"]):
+        set_object_state(agent, agent_state)
+
+    # Ohne Heaven.append(), damit n_dead nicht erneut gezählt wird (wie beim Entpickeln)
+    world.heaven = restore_heaven(skeleton["heaven_class"], heaven, states["heaven_attributes"])
+
+    # Zellen
+    for flat_index, cell_state in states["cell_states"].items():
+        set_object_state(world.grid_as_flat_list[flat_index], cell_state)
+
+    for flat_index, cell_residents in states["residents"].items():
+        cell = world.grid_as_flat_list[flat_index]
+        for agent in cell_residents:
+            cell.add_resident(agent)
+
+    if world.neighbor_cells_key is not None:
+        world.set_neighbor_cells(*world.neighbor_cells_key)
+
+    if restore_random_state:
+        random.setstate(states["random_state"])
+        np.random.set_state(states["numpy_random_state"])
+
+    return world
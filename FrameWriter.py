@@ -0,0 +1,119 @@
+import atexit
+import io
+import os
+import queue
+import threading
+import zipfile
+
+import numpy as np
+
+"""
+Schreibt Frames des Visualizers in einem Hintergrund-Thread auf die Festplatte.
+
+Der Visualizer übergibt pro Frame nur die Rohdaten (RGB-Bytes, siehe Visualizer.start_frame_export()), das Kodieren
+und Schreiben passiert im Thread. Ist die Warteschlange voll, wartet submit(), bis wieder Platz ist, damit kein Frame
+verloren geht.
+
+Formate:
+- "png":     Ein Verzeichnis mit einer PNG-Datei pro Frame (frame_00000010.png, ...), z.B. für ffmpeg:
+             ffmpeg -framerate 30 -pattern_type glob -i "frames/*.png" movie.mp4
+- "archive": Eine komprimierte ZIP-Datei mit einem NumPy-Array (Höhe x Breite x 3, uint8) pro Frame,
+             lesbar mit read_frame_archive()
+"""
+
+FRAME_FORMATS = ("png", "archive")
+
+
+def get_frame_file_name(tick, extension):
+    return "frame_{:08d}.{}".format(tick, extension)
+
+
+class FrameWriter:
+
+    def __init__(self, path, frame_format = "png", queue_size = 64, compression_level = 6):
+        """
+        INPUT
+        path:              Verzeichnis (png) bzw. Datei (archive)
+        frame_format:      "png" oder "archive"
+        queue_size:        Anzahl der Frames, die auf das Schreiben warten dürfen
+        compression_level: zlib-Kompressionsstufe des Archivs (0-9)
+        """
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format: {frame_format}")
+
+        self.path = path
+        self.frame_format = frame_format
+        self.n_frames_written = 0
+        self.error = None
+
+        if frame_format == "png":
+            os.makedirs(path, exist_ok=True)
+            self.archive = None
+        else:
+            self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=compression_level)
+
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, name="FrameWriter", daemon=True)
+        self.thread.start()
+
+        # Beim Beenden des Programms noch ausstehende Frames schreiben
+        atexit.register(self.close)
+
+    def submit(self, tick, rgb_bytes, size):
+        """ Übergibt einen Frame (RGB-Bytes zeilenweise, size = (Breite, Höhe)) an den Schreib-Thread """
+        if self.error is not None:
+            raise self.error
+        self.frames.put((tick, rgb_bytes, size))
+
+    def run(self):
+        while True:
+            frame = self.frames.get()
+            try:
+                if frame is None:
+                    return
+                if self.error is None:
+                    self.write_frame(*frame)
+            except Exception as error:
+                self.error = error      # wird beim nächsten submit() bzw. close() im Hauptthread ausgelöst
+            finally:
+                self.frames.task_done()
+
+    def write_frame(self, tick, rgb_bytes, size):
+        if self.frame_format == "png":
+            import pygame
+            surface = pygame.image.frombytes(rgb_bytes, size, "RGB")
+            pygame.image.save(surface, os.path.join(self.path, get_frame_file_name(tick, "png")))
+        else:
+            width, height = size
+            frame = np.frombuffer(rgb_bytes, dtype=np.uint8).reshape(height, width, 3)
+            buffer = io.BytesIO()
+            np.save(buffer, frame)
+            self.archive.writestr(get_frame_file_name(tick, "npy"), buffer.getvalue())
+
+        self.n_frames_written += 1
+
+    def close(self):
+        """ Wartet, bis alle Frames geschrieben sind, und schließt das Archiv """
+        if self.thread is None:
+            return
+
+        self.frames.put(None)
+        self.thread.join()
+        self.thread = None
+
+        if self.archive is not None:
+            self.archive.close()
+
+        atexit.unregister(self.close)
+
+        if self.error is not None:
+            raise self.error
+
+
+def read_frame_archive(path):
+    """ Liest ein Frame-Archiv und gibt nacheinander (Tick, Frame als Array Höhe x Breite x 3) zurück """
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            tick = int(name[len("frame_"):-len(".npy")])
+            with archive.open(name) as frame_file:
+                yield tick, np.load(io.BytesIO(frame_file.read()))
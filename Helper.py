@@ -1,6 +1,8 @@
 import random
 import math
 
+import numpy as np
+
 # Hilfsfunktionen
 
 # translates one scale into another scale
@@ -114,3 +116,172 @@ def direction_to_target(my_dim_pos, target_dim_pos, dim_len, torus=True):
         # Wenn die Richtung positiv ist (nach "rechts"), dann mache einen positiven Schritt,
         # wenn die Richtung negativ ist (nach "links"), dann einen negativen Schritt
         return (1 if direction > 0 else -1)
+
+
+
+########################################################################################################################
+# Vektorisierte Varianten
+#
+# Dieselben Berechnungen wie oben, aber für NumPy-Arrays von Positionen bzw. Werten (Skalare werden wie Arrays
+# behandelt und nach den Regeln von NumPy "gebroadcastet"). Die Ergebnisse sind elementweise identisch mit denen der
+# skalaren Funktionen, da in derselben Reihenfolge gerechnet wird. Einzige Ausnahme: Bei Gleitkomma-Positionen können
+# quadrierte Distanzen in der letzten Stelle abweichen, da NumPy x ** 2 als x * x rechnet, Python dagegen über pow().
+# Für ganzzahlige Positionen (wie auf dem Grid) sind auch die Distanzen identisch.
+########################################################################################################################
+
+def rescale_array(val, min1, max1, min2, max2):
+    """ Wie rescale(), elementweise """
+    val = np.asarray(val)
+    scale_is_empty = np.equal(min1, max1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rescaled_val = (((val - min1) / np.subtract(max1, min1)) * np.subtract(max2, min2)) + min2
+
+    rescaled_val = np.where(rescaled_val > max2, max2, np.where(rescaled_val < min2, min2, rescaled_val))
+    return np.where(scale_is_empty, val, rescaled_val)
+
+def subtract_via_edge_array(dim_pos1, dim_pos2, dim_len):
+    """ Wie subtract_via_edge(), elementweise """
+    dim_pos1 = np.asarray(dim_pos1)
+    dim_pos2 = np.asarray(dim_pos2)
+    return np.where(dim_pos1 > dim_pos2,
+                    (dim_len - dim_pos1) + dim_pos2,    # Distanz/Differenz über rechten Rand
+                    (dim_pos2 - dim_len) - dim_pos1)    # Distanz/Differenz über linken Rand
+
+def squared_distance_on_torus_array(dim_pos1, dim_pos2, dim_len):
+    """ Wie squared_distance_on_torus(), elementweise """
+    return np.minimum((np.asarray(dim_pos1) - dim_pos2) ** 2,
+                      subtract_via_edge_array(dim_pos1, dim_pos2, dim_len) ** 2)
+
+def euclidian_distance_array(
+        x_pos1,
+        y_pos1,
+        x_pos2,
+        y_pos2,
+        x_dim_len = None,
+        y_dim_len = None,
+        torus = True):
+    """ Wie euclidian_distance(), elementweise """
+
+    if torus:
+        assert x_dim_len != None and y_dim_len != None
+        return np.sqrt(squared_distance_on_torus_array(x_pos1, x_pos2, x_dim_len)
+                       + squared_distance_on_torus_array(y_pos1, y_pos2, y_dim_len))
+    else:
+        return np.sqrt((np.asarray(x_pos1) - x_pos2) ** 2 + (np.asarray(y_pos1) - y_pos2) ** 2)
+
+def shortest_distance_to_target_array(
+        my_dim_pos,
+        target_dim_pos,
+        dim_len,
+        torus = True,
+        ):
+    """ Wie shortest_distance_to_target(), elementweise (positiv = Ziel ist "rechts", negativ = "links") """
+    my_dim_pos = np.asarray(my_dim_pos)
+    target_dim_pos = np.asarray(target_dim_pos)
+
+    direct_distance = target_dim_pos - my_dim_pos
+
+    if torus:
+        edge_distance = np.where(my_dim_pos >= target_dim_pos,
+                                 target_dim_pos + dim_len - my_dim_pos,
+                                 -(my_dim_pos + dim_len - target_dim_pos))
+
+        return np.where(np.abs(direct_distance) <= np.abs(edge_distance), direct_distance, edge_distance)
+
+    else:
+        return direct_distance
+
+def direction_to_target_array(my_dim_pos, target_dim_pos, dim_len, torus=True):
+    """ Wie direction_to_target(), elementweise (1, -1 oder 0) """
+    direction = shortest_distance_to_target_array(my_dim_pos, target_dim_pos, dim_len, torus)
+    return np.where(np.equal(target_dim_pos, my_dim_pos), 0, np.where(direction > 0, 1, -1))
+
+def iterate_pairwise_distances(
+        x_positions1,
+        y_positions1,
+        x_positions2 = None,
+        y_positions2 = None,
+        x_dim_len = None,
+        y_dim_len = None,
+        torus = True,
+        chunk_size = 1024):
+    """
+    FUNCTION
+    Berechnet die paarweisen Distanzen zwischen zwei Mengen von Positionen blockweise, damit der Speicherbedarf
+    der Zwischenergebnisse höchstens chunk_size x len(x_positions2) Werte beträgt.
+
+    INPUT
+    x_positions1, y_positions1: Positionen der ersten Menge (Zeilen)
+    x_positions2, y_positions2: Positionen der zweiten Menge (Spalten), Standard: die erste Menge
+    chunk_size:                 Anzahl der Zeilen pro Block
+
+    OUTPUT
+    Generator von (Start-Zeile, Block der Form (Zeilen, len(x_positions2)))
+    """
+    x_positions1 = np.asarray(x_positions1)
+    y_positions1 = np.asarray(y_positions1)
+    x_positions2 = x_positions1 if x_positions2 is None else np.asarray(x_positions2)
+    y_positions2 = y_positions1 if y_positions2 is None else np.asarray(y_positions2)
+
+    for start in range(0, len(x_positions1), chunk_size):
+        stop = start + chunk_size
+        yield start, euclidian_distance_array(x_positions1[start:stop, None], y_positions1[start:stop, None],
+                                              x_positions2[None, :], y_positions2[None, :],
+                                              x_dim_len, y_dim_len, torus)
+
+def pairwise_distance_matrix(
+        x_positions1,
+        y_positions1,
+        x_positions2 = None,
+        y_positions2 = None,
+        x_dim_len = None,
+        y_dim_len = None,
+        torus = True,
+        chunk_size = 1024,
+        out = None):
+    """
+    FUNCTION
+    Matrix der paarweisen Distanzen (Zeilen: erste Menge, Spalten: zweite Menge), blockweise berechnet.
+
+    INPUT
+    wie iterate_pairwise_distances()
+    out: Vorab angelegtes Array für das Ergebnis (z.B. ein np.memmap für sehr große Matrizen)
+    """
+    n_rows = len(x_positions1)
+    n_columns = n_rows if x_positions2 is None else len(x_positions2)
+
+    if out is None:
+        out = np.empty((n_rows, n_columns), dtype=float)
+
+    for start, block in iterate_pairwise_distances(x_positions1, y_positions1, x_positions2, y_positions2,
+                                                   x_dim_len, y_dim_len, torus, chunk_size):
+        out[start:start + len(block)] = block
+
+    return out
+
+def agents_to_grid_array(
+        population,
+        attribute_name,
+        len_x_grid_dim,
+        len_y_grid_dim,
+        x_grid_pos_attr_name = "x_grid_pos",
+        y_grid_pos_attr_name = "y_grid_pos",
+        fill_value = np.nan,
+        dtype = float):
+    """
+    Schreibt ein Attribut aller Agenten an ihre Position in ein Array der Form (len_y_grid_dim, len_x_grid_dim).
+    Zellen ohne Agent bekommen fill_value. Bei mehreren Agenten auf einer Zelle gewinnt der letzte.
+    """
+    n_agents = len(population)
+    x_grid_positions = np.fromiter((getattr(agent, x_grid_pos_attr_name) for agent in population), np.int64, n_agents)
+    y_grid_positions = np.fromiter((getattr(agent, y_grid_pos_attr_name) for agent in population), np.int64, n_agents)
+
+    if hasattr(population, "columns") and attribute_name in population.columns:
+        values = population.column(attribute_name)
+    else:
+        values = [getattr(agent, attribute_name) for agent in population]
+
+    grid_array = np.full((len_y_grid_dim, len_x_grid_dim), fill_value, dtype=dtype)
+    grid_array[y_grid_positions, x_grid_positions] = values
+    return grid_array
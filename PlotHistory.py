@@ -0,0 +1,118 @@
+import numpy as np
+
+"""
+Verlauf einer Plot-Linie mit fester Kapazität.
+
+Solange weniger Werte als capacity angehängt wurden, wird jeder Wert einzeln gespeichert. Ist der Speicher voll, werden
+jeweils zwei benachbarte Eimer (Buckets) zu einem zusammengefasst, danach steht jeder Eimer für doppelt so viele Werte.
+Jeder Eimer merkt sich Minimum und Maximum seiner Werte samt ihrer Position im Verlauf, damit Ausreißer beim
+Zusammenfassen nicht verschwinden. Speicherbedarf und Zeichenaufwand hängen dadurch nur von capacity ab, nicht von der
+Anzahl der Ticks.
+"""
+
+
+class PlotHistory:
+
+    def __init__(self, capacity = 1024):
+        self.capacity = max(int(capacity) // 2 * 2, 2)     # gerade, damit immer zwei Eimer zusammengefasst werden können
+
+        # Anzahl der Werte pro vollem Eimer
+        self.bucket_size = 1
+
+        # Volle Eimer
+        self.n_buckets = 0
+        self.min_values = np.empty(self.capacity, dtype=float)
+        self.max_values = np.empty(self.capacity, dtype=float)
+        self.min_positions = np.empty(self.capacity, dtype=np.int64)
+        self.max_positions = np.empty(self.capacity, dtype=np.int64)
+
+        # Eimer, der gerade gefüllt wird
+        self.pending_count = 0
+        self.pending_min_value = None
+        self.pending_max_value = None
+        self.pending_min_position = None
+        self.pending_max_position = None
+
+        self.n_values = 0
+        self.last_value = None
+
+    def __len__(self):
+        return self.n_values
+
+    def append(self, value):
+        position = self.n_values
+        self.n_values += 1
+        self.last_value = value
+
+        if self.pending_count == 0 or value < self.pending_min_value:
+            self.pending_min_value = value
+            self.pending_min_position = position
+        if self.pending_count == 0 or value > self.pending_max_value:
+            self.pending_max_value = value
+            self.pending_max_position = position
+        self.pending_count += 1
+
+        if self.pending_count == self.bucket_size:
+            self.min_values[self.n_buckets] = self.pending_min_value
+            self.max_values[self.n_buckets] = self.pending_max_value
+            self.min_positions[self.n_buckets] = self.pending_min_position
+            self.max_positions[self.n_buckets] = self.pending_max_position
+            self.n_buckets += 1
+            self.pending_count = 0
+
+            if self.n_buckets == self.capacity:
+                self.decimate()
+
+    def decimate(self):
+        """ Fasst jeweils zwei benachbarte volle Eimer zu einem zusammen (bei Gleichstand gewinnt der frühere Wert) """
+        half = self.n_buckets // 2
+
+        for values, positions, is_better in (
+                (self.min_values, self.min_positions, np.less),
+                (self.max_values, self.max_positions, np.greater),
+        ):
+            first_values, second_values = values[0:2 * half:2], values[1:2 * half:2]
+            first_positions, second_positions = positions[0:2 * half:2], positions[1:2 * half:2]
+
+            take_second = is_better(second_values, first_values)
+            values[:half] = np.where(take_second, second_values, first_values)
+            positions[:half] = np.where(take_second, second_positions, first_positions)
+
+        self.n_buckets = half
+        self.bucket_size *= 2
+
+    def get_points(self):
+        """
+        FUNCTION
+        Gibt die zu zeichnenden Punkte in zeitlicher Reihenfolge zurück: pro Eimer Minimum und Maximum in der
+        Reihenfolge, in der sie aufgetreten sind (nur ein Punkt, wenn beide derselbe Wert sind).
+        Solange nicht zusammengefasst wurde, ist das genau ein Punkt pro Wert.
+
+        OUTPUT
+        (positions, values): Positionen der Werte im Verlauf (0 = erster Wert) und die Werte als Arrays
+        """
+        min_values = self.min_values[:self.n_buckets]
+        max_values = self.max_values[:self.n_buckets]
+        min_positions = self.min_positions[:self.n_buckets]
+        max_positions = self.max_positions[:self.n_buckets]
+
+        if self.pending_count:
+            min_values = np.append(min_values, self.pending_min_value)
+            max_values = np.append(max_values, self.pending_max_value)
+            min_positions = np.append(min_positions, self.pending_min_position)
+            max_positions = np.append(max_positions, self.pending_max_position)
+
+        min_first = min_positions <= max_positions
+        positions = np.stack([
+            np.where(min_first, min_positions, max_positions),
+            np.where(min_first, max_positions, min_positions),
+        ], axis=1)
+        values = np.stack([
+            np.where(min_first, min_values, max_values),
+            np.where(min_first, max_values, min_values),
+        ], axis=1)
+
+        keep = np.ones(positions.shape, dtype=bool)
+        keep[:, 1] = positions[:, 1] != positions[:, 0]
+
+        return positions[keep], values[keep]
@@ -0,0 +1,438 @@
+import numpy as np
+
+"""
+Eine Population speichert ihre Agenten wie eine Liste, hält deklarierte Agenten-Attribute aber zusätzlich
+spaltenweise in NumPy-Arrays ("Struct of Arrays").
+
+Jeder Agent bekommt beim Einfügen einen Slot (seine Position in der Population). Deklarierte Attribute werden in der
+Agentenklasse durch einen PopulationAttribute-Deskriptor ersetzt, sodass agent.output weiterhin funktioniert, der Wert
+aber in population.columns["output"][agent.slot] liegt. Vektorisierte Modellschritte, Statistiken und Darstellungen
+können über population.column("output") direkt auf die Spalte zugreifen.
+
+Für Attribute, nach denen Agenten häufig gruppiert werden (z.B. die Gruppe in einem Segregationsmodell), kann mit
+create_group_index() ein Gruppen-Index angelegt werden. Er ordnet jedem Wert die Agenten mit diesem Wert zu und wird
+bei jeder Zuweisung agent.attribut = wert aktualisiert. Werden Spalten direkt als Array beschrieben, muss das über
+set_column() geschehen (oder danach rebuild_group_index() aufgerufen werden).
+
+Beim Entfernen eines Agenten rücken die nachfolgenden Agenten standardmäßig wie in einer Liste nach, dabei bekommt
+jeder von ihnen einen neuen Slot (O(N) pro entferntem Agenten). Mit ordered = False wird stattdessen der letzte Agent
+in die Lücke verschoben (O(1)), die Reihenfolge der Population ändert sich dadurch. Mehrere Agenten auf einmal
+entfernt remove_agents() in einem Durchgang.
+
+Heaven nimmt gestorbene Agenten auf. Je nach policy werden sie aufbewahrt ("keep", wie bisher die Liste world.heaven),
+nur gezählt ("count") oder für spätere Geburten wiederverwendet ("recycle").
+
+Deklariert werden sollten nur Attribute, die pro Agent verschieden sind. Klassenattribute, die z.B. über
+Visualizer.control() für alle Agenten gleichzeitig verändert werden, sollten Klassenattribute bleiben.
+"""
+
+
+class PopulationAttribute:
+    """
+    Deskriptor für Agenten-Attribute, deren Werte in einer Spalte der Population liegen.
+    Gehört der Agent zu keiner Population mit dieser Spalte, wird der Wert im Agenten selbst gespeichert.
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default  # Vorheriges Klassenattribut, falls vorhanden
+
+    def get_column(self, agent):
+        columns = getattr(getattr(agent, "population", None), "columns", None)
+        if columns is not None and getattr(agent, "slot", None) is not None:
+            return columns.get(self.name)
+        return None
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self.default     # Zugriff über die Klasse liefert weiterhin den Standardwert
+
+        column = self.get_column(agent)
+        if column is not None:
+            return column.item(agent.slot)
+        return agent.get_local_values().get(self.name, self.default)
+
+    def __set__(self, agent, value):
+        column = self.get_column(agent)
+        if column is not None:
+            group_index = agent.population.group_indexes.get(self.name)
+            if group_index is None:
+                column[agent.slot] = value
+            else:
+                previous_value = column.item(agent.slot)
+                column[agent.slot] = value
+                group_index.move(agent, previous_value, column.item(agent.slot))
+        else:
+            agent.get_local_values(create=True)[self.name] = value
+
+
+def get_population_attribute(agent_class, attribute_name):
+    """ Gibt den PopulationAttribute-Deskriptor einer Klasse zurück (oder None) """
+    for cls in agent_class.__mro__:
+        if attribute_name in cls.__dict__:
+            descriptor = cls.__dict__[attribute_name]
+            return descriptor if isinstance(descriptor, PopulationAttribute) else None
+    return None
+
+
+class GroupIndex:
+    """ Ordnet jedem Wert eines Attributs die Agenten mit diesem Wert zu: {Wert: {Agent.name: Agent}} """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, agent, value):
+        self.groups.setdefault(value, {})[agent.name] = agent
+
+    def remove(self, agent, value):
+        group = self.groups[value]
+        del group[agent.name]
+        if not group:
+            del self.groups[value]     # Leere Gruppen entfernen, damit get_counts() nur vorhandene Werte enthält
+
+    def move(self, agent, previous_value, value):
+        if previous_value != value:
+            self.remove(agent, previous_value)
+            self.add(agent, value)
+
+    def get_agents(self, value):
+        return list(self.groups.get(value, {}).values())
+
+    def count(self, value):
+        return len(self.groups.get(value, ()))
+
+    def get_counts(self):
+        return {value: len(group) for value, group in self.groups.items()}
+
+
+class Population:
+    """
+    Listenartiger Container für Agenten mit spaltenweise gespeicherten Attributen.
+
+    Unterstützt die Listenoperationen, die in sampy auf Populationen angewendet werden
+    (len, in, Iteration, Indexzugriff, append, extend, index, remove, del).
+    """
+
+    def __init__(self, attributes = None, capacity = 16, ordered = True):
+        """
+        INPUT
+        attributes: Dict mit den zu deklarierenden Attributen, entweder {Name: dtype} oder {Name: (dtype, Standardwert)}
+        capacity:   Anfangsgröße der Spalten (wird bei Bedarf verdoppelt)
+        ordered:    Reihenfolge beim Entfernen erhalten (True, O(N), Standard) oder letzten Agenten nachrücken lassen
+                    (False, O(1))
+        """
+        self.ordered = ordered
+        self.agents = []                    # Agenten in Slot-Reihenfolge
+        self.columns = {}                   # Attribut-Name -> Array der Länge self.capacity
+        self.defaults = {}                  # Attribut-Name -> Standardwert
+        self.capacity = max(int(capacity), 1)
+        self.agent_classes = set()          # Klassen, in denen die Deskriptoren bereits hinterlegt sind
+        self.group_indexes = {}             # Attribut-Name -> GroupIndex
+
+        if attributes:
+            for attribute_name, spec in attributes.items():
+                if isinstance(spec, tuple):
+                    self.declare_attribute(attribute_name, *spec)
+                else:
+                    self.declare_attribute(attribute_name, spec)
+
+    ####################################################################################################################
+    # Spalten
+    ####################################################################################################################
+
+    def declare_attribute(self, attribute_name, dtype = float, default = None):
+        """
+        Legt eine neue Spalte an. Werte bereits enthaltener Agenten werden in die Spalte übernommen.
+        Ohne Standardwert wird das Klassenattribut der Agentenklasse verwendet (falls vorhanden), sonst 0.
+        """
+        if default is None:
+            default = 0
+            for agent_class in self.agent_classes:
+                if getattr(agent_class, attribute_name, None) is not None:
+                    default = getattr(agent_class, attribute_name)
+
+        column = np.full(self.capacity, default, dtype=dtype)
+
+        for agent_class in self.agent_classes:
+            self.add_descriptor(agent_class, attribute_name)
+
+        # Bisherige Werte der Agenten übernehmen
+        for slot, agent in enumerate(self.agents):
+            local_values = agent.get_local_values()
+            if attribute_name in local_values:
+                column[slot] = local_values.pop(attribute_name)
+            else:
+                column[slot] = getattr(agent, attribute_name, default)
+
+        self.defaults[attribute_name] = default
+        self.columns[attribute_name] = column
+
+        if attribute_name in self.group_indexes:
+            self.rebuild_group_index(attribute_name)
+
+    def column(self, attribute_name):
+        """ Spalte eines Attributs für alle aktuellen Agenten (Array-Sicht, keine Kopie) """
+        return self.columns[attribute_name][:len(self.agents)]
+
+    def set_column(self, attribute_name, values):
+        """ Schreibt die Werte aller aktuellen Agenten auf einmal und hält dabei einen Gruppen-Index aktuell """
+        self.column(attribute_name)[:] = values
+
+        if attribute_name in self.group_indexes:
+            self.rebuild_group_index(attribute_name)
+
+    def add_descriptor(self, agent_class, attribute_name):
+        """ Ersetzt das Attribut in der Agentenklasse durch einen PopulationAttribute-Deskriptor """
+        if get_population_attribute(agent_class, attribute_name) is not None:
+            return
+
+        class_value = getattr(agent_class, attribute_name, self.defaults.get(attribute_name))
+        setattr(agent_class, attribute_name, PopulationAttribute(attribute_name, class_value))
+
+    def register_agent_class(self, agent_class):
+        if agent_class not in self.agent_classes:
+            self.agent_classes.add(agent_class)
+            for attribute_name in self.columns:
+                self.add_descriptor(agent_class, attribute_name)
+
+    def grow(self):
+        """ Verdoppelt die Kapazität aller Spalten """
+        new_capacity = self.capacity * 2
+
+        for attribute_name, column in self.columns.items():
+            new_column = np.full(new_capacity, self.defaults[attribute_name], dtype=column.dtype)
+            new_column[:self.capacity] = column
+            self.columns[attribute_name] = new_column
+
+        self.capacity = new_capacity
+
+    def store_values_in_agent(self, agent):
+        """ Schreibt die Spaltenwerte eines Agenten, der die Population verlässt, in den Agenten zurück """
+        local_values = agent.get_local_values(create=bool(self.columns))
+        for attribute_name, column in self.columns.items():
+            local_values[attribute_name] = column.item(agent.slot)
+        agent.slot = None
+
+    ####################################################################################################################
+    # Gruppen-Index
+    ####################################################################################################################
+
+    def create_group_index(self, attribute_name, dtype = object):
+        """
+        Legt einen Gruppen-Index für ein Attribut an. Ist das Attribut noch keine Spalte, wird es mit dtype deklariert.
+        Danach liefern get_group() und count_group() die Agenten mit einem Wert in O(Gruppengröße) bzw. O(1).
+        """
+        if attribute_name not in self.columns:
+            self.declare_attribute(attribute_name, dtype)
+
+        self.group_indexes[attribute_name] = GroupIndex()
+        self.rebuild_group_index(attribute_name)
+
+    def rebuild_group_index(self, attribute_name):
+        """ Baut einen Gruppen-Index aus der Spalte neu auf (z.B. nach direktem Schreiben in die Spalte) """
+        group_index = GroupIndex()
+        for agent, value in zip(self.agents, self.column(attribute_name).tolist()):
+            group_index.add(agent, value)
+        self.group_indexes[attribute_name] = group_index
+
+    def get_group(self, attribute_name, value):
+        """ Alle Agenten, deren Attribut gleich value ist (in der Reihenfolge, in der sie der Gruppe beigetreten sind) """
+        return self.group_indexes[attribute_name].get_agents(value)
+
+    def count_group(self, attribute_name, value):
+        """ Anzahl der Agenten, deren Attribut gleich value ist """
+        return self.group_indexes[attribute_name].count(value)
+
+    def get_group_counts(self, attribute_name):
+        """ {Wert: Anzahl der Agenten} für alle vorhandenen Werte eines Attributs """
+        return self.group_indexes[attribute_name].get_counts()
+
+    ####################################################################################################################
+    # Listen-Operationen
+    ####################################################################################################################
+
+    def append(self, agent):
+        self.register_agent_class(type(agent))
+
+        slot = len(self.agents)
+        if slot >= self.capacity:
+            self.grow()
+
+        self.agents.append(agent)
+        agent.population = self
+        agent.slot = slot
+
+        # Werte, die bisher im Agenten lagen, in die Spalten verschieben
+        local_values = agent.get_local_values()
+        for attribute_name, column in self.columns.items():
+            if attribute_name in local_values:
+                column[slot] = local_values.pop(attribute_name)
+            else:
+                column[slot] = self.defaults[attribute_name]
+
+        for attribute_name, group_index in self.group_indexes.items():
+            group_index.add(agent, self.columns[attribute_name].item(slot))
+
+    def extend(self, agents):
+        for agent in agents:
+            self.append(agent)
+
+    def index(self, agent):
+        if agent in self:
+            return agent.slot
+        raise ValueError(f"{agent} is not in population")
+
+    def remove(self, agent):
+        del self[self.index(agent)]
+
+    def detach(self, agent):
+        """ Trägt einen Agenten aus den Gruppen-Indizes aus und schreibt seine Spaltenwerte in den Agenten zurück """
+        for attribute_name, group_index in self.group_indexes.items():
+            group_index.remove(agent, self.columns[attribute_name].item(agent.slot))
+
+        self.store_values_in_agent(agent)
+
+    def __delitem__(self, slot):
+        n_agents = len(self.agents)
+        if slot < 0:
+            slot += n_agents
+
+        self.detach(self.agents[slot])
+
+        if self.ordered:
+            # Nachfolgende Einträge wie in einer Liste um eins nach vorne schieben
+            for column in self.columns.values():
+                column[slot:n_agents - 1] = column[slot + 1:n_agents]
+
+            del self.agents[slot]
+            for following_slot in range(slot, n_agents - 1):
+                self.agents[following_slot].slot = following_slot
+
+        else:
+            # Letzten Eintrag in die Lücke verschieben (Swap-Remove)
+            last_slot = n_agents - 1
+            last_agent = self.agents.pop()
+
+            if slot != last_slot:
+                for column in self.columns.values():
+                    column[slot] = column[last_slot]
+                self.agents[slot] = last_agent
+                last_agent.slot = slot
+
+    def remove_agents(self, agents):
+        """
+        FUNCTION
+        Entfernt mehrere Agenten auf einmal. Mit ordered = True werden Spalten und Slots in einem einzigen Durchgang
+        zusammengeschoben (statt einmal pro Agent), mit ordered = False wird für jeden Agenten ein Swap-Remove gemacht.
+        """
+        agents = list({id(agent): agent for agent in agents if agent in self}.values())
+
+        if not self.ordered:
+            for agent in agents:
+                del self[agent.slot]
+            return
+
+        n_agents = len(self.agents)
+        keep = np.ones(n_agents, dtype=bool)
+        for agent in agents:
+            keep[agent.slot] = False
+            self.detach(agent)
+
+        n_remaining = int(keep.sum())
+        for column in self.columns.values():
+            column[:n_remaining] = column[:n_agents][keep]
+
+        self.agents = [agent for agent, is_kept in zip(self.agents, keep.tolist()) if is_kept]
+        for slot, agent in enumerate(self.agents):
+            agent.slot = slot
+
+    def __contains__(self, agent):
+        slot = getattr(agent, "slot", None)
+        return (getattr(agent, "population", None) is self
+                and slot is not None
+                and slot < len(self.agents)
+                and self.agents[slot] is agent)
+
+    def __getitem__(self, index):
+        return self.agents[index]
+
+    def __iter__(self):
+        return iter(self.agents)
+
+    def __len__(self):
+        return len(self.agents)
+
+    def __repr__(self):
+        return f"Population of {len(self.agents)} agents with columns {list(self.columns)}"
+
+
+class Heaven(list):
+    """
+    Liste der gestorbenen Agenten (world.heaven) mit einstellbarer Aufbewahrung:
+
+    "keep":    Alle gestorbenen Agenten werden aufbewahrt (Standard)
+    "count":   Gestorbene Agenten werden nur gezählt, die Liste bleibt leer
+    "recycle": Gestorbene Agenten werden aufbewahrt und bei Geburten (World.spawn_agents()) wiederverwendet
+
+    n_dead zählt in allen Fällen die Agenten, die jemals gestorben sind.
+    """
+
+    POLICIES = ("keep", "count", "recycle")
+
+    def __init__(self, agents = (), policy = "keep"):
+        super().__init__()
+        self.policy = None
+        self.n_dead = 0
+        self.set_policy(policy)
+        self.extend(agents)
+
+    def set_policy(self, policy):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown heaven policy: {policy}")
+        self.policy = policy
+        if policy == "count":
+            self.clear()
+
+    def append(self, agent):
+        self.n_dead += 1
+        if self.policy != "count":
+            super().append(agent)
+
+    def extend(self, agents):
+        for agent in agents:
+            self.append(agent)
+
+    def __reduce__(self):
+        # Beim Entpickeln und Kopieren nicht über append() gehen: policy und n_dead sind dann noch nicht gesetzt,
+        # und n_dead würde doppelt gezählt
+        return restore_heaven, (type(self),), (list(self), dict(self.__dict__))
+
+    def __setstate__(self, state):
+        agents, attributes = state
+        list.extend(self, agents)
+        self.__dict__.update(attributes)
+
+    def take_agent(self, agent_class):
+        """ Gibt einen gestorbenen Agenten der Klasse zur Wiederverwendung zurück (None, wenn es keinen gibt) """
+        if self.policy != "recycle":
+            return None
+
+        for i in range(len(self) - 1, -1, -1):
+            if type(self[i]) is agent_class:
+                if i == len(self) - 1:
+                    return self.pop()
+                agent = self[i]
+                self[i] = self[-1]  # Swap-Remove, die Reihenfolge im Himmel spielt keine Rolle
+                self.pop()
+                return agent
+
+        return None
+
+
+def restore_heaven(heaven_class, agents = (), attributes = None):
+    """ Baut einen Himmel aus seinen Agenten und Attributen (policy, n_dead) wieder auf, ohne append() aufzurufen """
+    heaven = heaven_class.__new__(heaven_class)
+    list.extend(heaven, agents)
+    if attributes:
+        heaven.__dict__.update(attributes)
+    return heaven
@@ -0,0 +1,276 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+"""
+Spaltenweiser Datenrekorder für Agenten-Attribute.
+
+Ein Attribut wird einmal registriert und danach mit record() pro Tick für alle Agenten einer Population erhoben.
+Die Werte landen in einem vorab angelegten Block (chunk_size Ticks x Anzahl Agenten). Ist ein Block voll, wird er
+an eine Datei im Rekorder-Verzeichnis angehängt und danach wiederverwendet. Der Speicherbedarf im Arbeitsspeicher
+ist damit unabhängig von der Laufzeit, beim Auslesen werden die geschriebenen Blöcke per np.memmap eingebunden.
+
+Die Spalten sind nach dem Slot der Agenten in der Population geordnet. Gibt es in einem Tick weniger Agenten als
+Spalten, wird der Rest mit fill_value aufgefüllt. Gibt es mehr Agenten als Spalten (z.B. nach
+World.spawn_agents()), wird die Datenreihe auf mindestens die doppelte Spaltenzahl erweitert, frühere Zeilen werden
+beim Auslesen mit fill_value aufgefüllt. Da Agenten ihren Slot wechseln, wenn andere sterben (Swap-Remove,
+siehe Population.py), wird pro Population und Tick zusätzlich die ID (Agent.name) des Agenten in jeder Spalte erhoben
+(-1 = nicht besetzt). get_agent_ids() gibt diese IDs zurück, get_agent_data() die Werte eines einzelnen Agenten.
+
+Ohne directory legt der Rekorder beim ersten Auslagern ein temporäres Verzeichnis an und löscht es wieder mit close()
+(auch über "with Recorder() as recorder:") oder spätestens, wenn der Rekorder nicht mehr referenziert wird.
+"""
+
+
+class RecordedSeries:
+
+    def __init__(self, name, population, attribute_name, n_columns, dtype, fill_value, chunk_size, agent_ids = None):
+        self.name = name
+        self.population = population
+        self.attribute_name = attribute_name
+        self.n_columns = n_columns
+        self.dtype = np.dtype(dtype)
+        self.fill_value = fill_value
+        self.agent_ids = agent_ids      # RecordedSeries mit den IDs der Agenten pro Spalte (geteilt pro Population)
+
+        self.chunk = np.full((chunk_size, n_columns), fill_value, dtype=self.dtype)
+        self.n_rows_in_chunk = 0
+        self.n_spilled_rows = 0
+        self.path = None
+
+        # Abgeschlossene Dateien mit weniger Spalten als die aktuelle (path, Anzahl Zeilen, Anzahl Spalten)
+        self.segments = []
+
+    def get_current_values(self):
+        population = self.population
+
+        if hasattr(population, "columns") and self.attribute_name in population.columns:
+            return population.column(self.attribute_name)
+
+        return np.fromiter((getattr(agent, self.attribute_name) for agent in population),
+                           dtype=self.dtype, count=len(population))
+
+    def get_current_agent_ids(self):
+        return np.fromiter((agent.name for agent in self.population), dtype=np.int64, count=len(self.population))
+
+    @property
+    def n_rows(self):
+        return sum(n_rows for _, n_rows, _ in self.segments) + self.n_spilled_rows + self.n_rows_in_chunk
+
+
+class Recorder:
+
+    def __init__(self, directory = None, chunk_size = 1000):
+        """
+        INPUT
+        directory:  Verzeichnis für die ausgelagerten Blöcke (None = temporäres Verzeichnis, erst beim ersten Auslagern)
+        chunk_size: Anzahl der Ticks pro Block im Arbeitsspeicher
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+
+        # Löscht ein selbst angelegtes temporäres Verzeichnis (siehe close())
+        self.finalizer = None
+
+        self.series = {}
+
+        self.ticks = RecordedSeries("tick", None, None, 1, np.int64, -1, chunk_size)
+
+    def register(
+            self,
+            name,
+            population,
+            attribute_name = None,
+            n_columns = None,
+            dtype = float,
+            fill_value = None,
+    ):
+        """
+        FUNCTION
+        Registriert ein Attribut zur Erhebung.
+
+        INPUT
+        name:           Name der Datenreihe
+        population:     Population bzw. Liste von Agenten
+        attribute_name: Attribut der Agenten (Standard: name)
+        n_columns:      Anfängliche Anzahl der Spalten (Standard: aktuelle Größe der Population). Wächst die Population
+                        darüber hinaus, werden die Spalten erweitert, ein größerer Wert spart das Erweitern.
+        dtype:          Numerischer Datentyp der Datenreihe
+        fill_value:     Wert für nicht besetzte Spalten (Standard: NaN bzw. -1 für ganzzahlige Datentypen)
+        """
+        if np.dtype(dtype) == np.dtype(object):
+            raise ValueError("Only numeric attributes can be recorded")
+
+        if fill_value is None:
+            fill_value = np.nan if np.issubdtype(np.dtype(dtype), np.floating) else -1
+
+        if n_columns is None:
+            n_columns = len(population)
+
+        # Gleichzeitig registrierte Datenreihen derselben Population teilen sich die Agenten-IDs
+        agent_ids = next((series.agent_ids for series in self.series.values()
+                          if series.population is population and series.n_columns == n_columns
+                          and series.agent_ids.n_rows == 0), None)
+        if agent_ids is None:
+            agent_ids = RecordedSeries(name + ".agent_ids", population, "name", n_columns, np.int64, -1,
+                                       self.chunk_size)
+
+        self.series[name] = RecordedSeries(
+            name,
+            population,
+            attribute_name or name,
+            n_columns,
+            dtype,
+            fill_value,
+            self.chunk_size,
+            agent_ids,
+        )
+
+    def record(self, tick):
+        """ Erhebt alle registrierten Attribute für den übergebenen Tick """
+        self.write_row(self.ticks, [tick])
+
+        for series in self.series.values():
+            self.write_row(series, series.get_current_values())
+
+        for agent_ids in self.get_agent_id_series():
+            self.write_row(agent_ids, agent_ids.get_current_agent_ids())
+
+    def get_agent_id_series(self):
+        return list({id(series.agent_ids): series.agent_ids for series in self.series.values()}.values())
+
+    def write_row(self, series, values):
+        if len(values) > series.n_columns:
+            self.widen(series, len(values))
+
+        row = series.chunk[series.n_rows_in_chunk]
+        row[:len(values)] = values
+        row[len(values):] = series.fill_value
+        series.n_rows_in_chunk += 1
+
+        if series.n_rows_in_chunk == self.chunk_size:
+            self.spill(series)
+
+    def widen(self, series, n_columns):
+        """
+        Erweitert eine Datenreihe auf mindestens n_columns Spalten (mindestens auf das Doppelte). Bereits ausgelagerte
+        Zeilen bleiben mit der alten Spaltenzahl in ihrer Datei, neue Zeilen kommen in eine neue Datei.
+        """
+        if series.n_spilled_rows:
+            self.spill(series)
+            series.segments.append((series.path, series.n_spilled_rows, series.n_columns))
+            series.path = None
+            series.n_spilled_rows = 0
+
+        new_chunk = np.full((self.chunk_size, max(n_columns, 2 * series.n_columns)), series.fill_value,
+                            dtype=series.dtype)
+        new_chunk[:, :series.n_columns] = series.chunk
+        series.chunk = new_chunk
+        series.n_columns = new_chunk.shape[1]
+
+    def spill(self, series):
+        """ Hängt die gefüllten Zeilen des Blocks an die Datei der Datenreihe an """
+        if series.n_rows_in_chunk == 0:
+            return
+
+        if series.path is None:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="sampy_recorder_")
+                self.finalizer = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
+            segment_suffix = f".{len(series.segments)}" if series.segments else ""
+            series.path = os.path.join(self.directory, series.name + segment_suffix + ".dat")
+            open(series.path, "wb").close()
+
+        with open(series.path, "ab") as file:
+            series.chunk[:series.n_rows_in_chunk].tofile(file)
+
+        series.n_spilled_rows += series.n_rows_in_chunk
+        series.n_rows_in_chunk = 0
+
+    def flush(self):
+        """ Lagert alle bisher erhobenen Zeilen auf die Festplatte aus """
+        self.spill(self.ticks)
+        for series in self.series.values():
+            self.spill(series)
+        for agent_ids in self.get_agent_id_series():
+            self.spill(agent_ids)
+
+    def close(self):
+        """
+        Beendet die Aufzeichnung: Ein temporäres Verzeichnis wird mitsamt den ausgelagerten Blöcken gelöscht,
+        in ein vorgegebenes Verzeichnis werden alle Zeilen ausgelagert.
+        """
+        if self.finalizer is not None:
+            self.finalizer()
+        else:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        # Das temporäre Verzeichnis wird nur vom ursprünglichen Rekorder gelöscht
+        state = self.__dict__.copy()
+        state["finalizer"] = None
+        return state
+
+    def get_data(self, name):
+        """
+        Gibt eine Datenreihe als Array (Ticks x Spalten) zurück.
+        Sind Blöcke ausgelagert, werden sie per np.memmap eingebunden und zusammen mit dem aktuellen Block kopiert.
+        Nach flush() wird die Datei direkt als np.memmap zurückgegeben.
+        """
+        series = self.ticks if name == "tick" else self.series[name]
+        data = self.read_series(series)
+        return data[:, 0] if name == "tick" else data
+
+    def read_series(self, series):
+        current_rows = series.chunk[:series.n_rows_in_chunk]
+
+        parts = [np.memmap(path, dtype=series.dtype, mode="r", shape=(n_rows, n_columns))
+                 for path, n_rows, n_columns in series.segments]
+        if series.n_spilled_rows:
+            parts.append(np.memmap(series.path, dtype=series.dtype, mode="r",
+                                   shape=(series.n_spilled_rows, series.n_columns)))
+
+        if not parts:
+            return current_rows.copy()
+
+        # Nach flush() liegt alles in einer Datei und es wird nichts in den Arbeitsspeicher kopiert
+        if len(parts) == 1 and len(current_rows) == 0:
+            return parts[0]
+
+        parts.append(current_rows)
+
+        # Zeilen aus Zeiten mit weniger Spalten werden mit fill_value aufgefüllt
+        data = np.full((sum(len(part) for part in parts), series.n_columns), series.fill_value, dtype=series.dtype)
+        first_row = 0
+        for part in parts:
+            data[first_row:first_row + len(part), :part.shape[1]] = part
+            first_row += len(part)
+
+        return data
+
+    def get_ticks(self):
+        return self.get_data("tick")
+
+    def get_agent_ids(self, name):
+        """ Gibt die IDs (Agent.name) der Agenten in den Spalten der Datenreihe zurück (Ticks x Spalten, -1 = leer) """
+        return self.read_series(self.series[name].agent_ids)
+
+    def get_agent_data(self, name, agent_id):
+        """ Gibt die Werte eines Agenten über alle Ticks zurück, unabhängig von seinem Slot (fill_value = nicht dabei) """
+        series = self.series[name]
+        rows, columns = np.nonzero(self.get_agent_ids(name) == agent_id)
+
+        data = self.get_data(name)
+        values = np.full(len(data), series.fill_value, dtype=series.dtype)
+        values[rows] = data[rows, columns]
+        return values
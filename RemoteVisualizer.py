@@ -0,0 +1,396 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+"""
+Visualizer in einem eigenen Prozess.
+
+Die Simulation schreibt nach jedem Tick (oder so oft sie will) die zu zeigenden Grid-Arrays und Plot-Werte mit
+publish() in einen gemeinsamen Speicherbereich (SharedFrameBuffer). Ein eigener Render-Prozess liest daraus in seiner
+eigenen Bildrate den jeweils neuesten Stand und malt ihn mit einem gewöhnlichen Visualizer. Die Simulation wartet
+dadurch nie auf die Darstellung, publish() kopiert nur die Arrays.
+
+Plot-Werte werden in einen Ringpuffer pro Graph geschrieben, der Render-Prozess übernimmt bei jedem Frame alle neuen
+Werte in seine Verläufe. Schreibt die Simulation zwischen zwei Frames mehr Werte als der Ringpuffer fasst
+(series_capacity), gehen die ältesten davon verloren.
+
+Änderungen an den Controllern schickt der Render-Prozess über eine Queue zurück. Die Simulation übernimmt sie mit
+apply_controller_changes(), z.B. einmal pro Tick. Der Pause-Modus des Fensters hält nur die Darstellung an, nicht die
+Simulation.
+
+Der Simulations-Prozess importiert dafür kein pygame, das passiert nur im Render-Prozess.
+"""
+
+
+ALIGNMENT = 64
+
+# Versuche von SharedFrameBuffer.read(), bevor es ohne Frame zurückkehrt (die Simulation schreibt gerade oder ist
+# mitten in write() abgestürzt), und Wartezeit des Render-Prozesses bis zum nächsten Leseversuch
+MAX_READ_ATTEMPTS = 1000
+READ_RETRY_INTERVAL = 0.005
+
+
+class SharedFrameBuffer:
+    """
+    Gemeinsamer Speicherbereich für Grid-Arrays und Plot-Werte. Genau ein Prozess schreibt, beliebig viele lesen.
+
+    Ein Sequenzzähler zeigt an, ob gerade geschrieben wird (ungerade) und ob sich der Stand während des Lesens
+    geändert hat. Leser wiederholen das Lesen dann, bis sie einen vollständigen Frame bekommen haben, höchstens aber
+    max_attempts Mal.
+
+    layout: Dict mit
+        "arrays":          {Name: (Form, dtype)}
+        "series":          {Graph-Name: [Werte-Namen]}
+        "series_capacity": Anzahl der Plot-Werte pro Graph im Ringpuffer
+    """
+
+    def __init__(self, layout, name = None):
+        self.layout = layout
+
+        # Felder: Name -> (Offset, Form, dtype)
+        self.fields = {}
+        size = 0
+
+        def add_field(field_name, shape, dtype):
+            nonlocal size
+            self.fields[field_name] = (size, tuple(shape), np.dtype(dtype))
+            size += -(-int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize // ALIGNMENT) * ALIGNMENT
+
+        add_field("header", (2,), np.int64)     # Sequenzzähler, Tick
+
+        for array_name, (shape, dtype) in layout["arrays"].items():
+            add_field("arrays/" + array_name, shape, dtype)
+
+        for graph_name, value_names in layout["series"].items():
+            add_field("series/" + graph_name, (layout["series_capacity"], len(value_names)), float)
+            add_field("series_count/" + graph_name, (1,), np.int64)
+
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            self.is_owner = True
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            self.is_owner = False
+
+        self.views = {
+            field_name: np.ndarray(shape, dtype=dtype, buffer=self.shared_memory.buf, offset=offset)
+            for field_name, (offset, shape, dtype) in self.fields.items()
+        }
+
+        if self.is_owner:
+            for view in self.views.values():
+                view[...] = 0
+
+    @property
+    def name(self):
+        return self.shared_memory.name
+
+    def write(self, tick, arrays = None, plot_values = None):
+        """
+        FUNCTION
+        Schreibt einen neuen Stand.
+
+        INPUT
+        arrays:      {Name: Array} (nicht angegebene Arrays behalten ihren letzten Stand)
+        plot_values: {Graph-Name: {Werte-Name: Wert}} (ein neuer Wert pro Graph)
+        """
+        header = self.views["header"]
+        header[0] += 1          # ungerade: wird gerade geschrieben
+
+        header[1] = tick
+
+        for array_name, array in (arrays or {}).items():
+            self.views["arrays/" + array_name][...] = array
+
+        capacity = self.layout["series_capacity"]
+        for graph_name, value_dict in (plot_values or {}).items():
+            count = self.views["series_count/" + graph_name]
+            row = self.views["series/" + graph_name][count[0] % capacity]
+            row[:] = [value_dict[value_name] for value_name in self.layout["series"][graph_name]]
+            count[0] += 1
+
+        header[0] += 1          # gerade: Stand ist vollständig
+
+    def read(self, series_counts, max_attempts = MAX_READ_ATTEMPTS):
+        """
+        FUNCTION
+        Liest den neuesten vollständigen Stand.
+
+        INPUT
+        series_counts: {Graph-Name: Anzahl der bereits gelesenen Plot-Werte}, wird aktualisiert
+        max_attempts:  Anzahl der Leseversuche
+
+        OUTPUT
+        (Tick, {Name: Kopie des Arrays}, {Graph-Name: Array der neuen Plot-Werte, eine Zeile pro Wert}),
+        None, wenn in max_attempts Versuchen kein vollständiger Stand gelesen werden konnte
+        """
+        header = self.views["header"]
+        capacity = self.layout["series_capacity"]
+
+        for _ in range(max_attempts):
+            sequence = int(header[0])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+
+            tick = int(header[1])
+            arrays = {array_name: self.views["arrays/" + array_name].copy() for array_name in self.layout["arrays"]}
+
+            new_values = {}
+            new_counts = {}
+            for graph_name in self.layout["series"]:
+                count = int(self.views["series_count/" + graph_name][0])
+                first = max(series_counts.get(graph_name, 0), count - capacity)
+                rows = np.arange(first, count) % capacity
+                new_values[graph_name] = self.views["series/" + graph_name][rows]
+                new_counts[graph_name] = count
+
+            if int(header[0]) == sequence:
+                series_counts.update(new_counts)
+                return tick, arrays, new_values
+
+        return None
+
+    def close(self):
+        """ Gibt den Speicherbereich frei (der erzeugende Prozess löscht ihn auch) """
+        self.views = {}
+        self.shared_memory.close()
+        if self.is_owner:
+            self.shared_memory.unlink()
+
+
+class RemoteControlledObject:
+    """
+    Steht im Render-Prozess für das kontrollierte Objekt eines Controllers. Visualizer.control() liest und setzt das
+    Attribut wie gewohnt, geänderte Werte werden an die Simulation geschickt.
+    """
+
+    def __init__(self, controller_name, attribute_name, value, controller_queue):
+        object.__setattr__(self, "controller_name", controller_name)
+        object.__setattr__(self, "attribute_name", attribute_name)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "controller_queue", controller_queue)
+
+    def __getattr__(self, name):
+        if name == self.attribute_name:
+            return self.value
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name != self.attribute_name:
+            raise AttributeError(name)
+
+        if value != self.value:
+            object.__setattr__(self, "value", value)
+            self.controller_queue.put((self.controller_name, value))
+
+
+def run_render_process(layout, shared_memory_name, controller_queue, stop_event):
+    """ Hauptschleife des Render-Prozesses (muss auf Modulebene stehen, damit sie im neuen Prozess gefunden wird) """
+    import pygame
+    from Visualizer import Visualizer
+
+    frame_buffer = SharedFrameBuffer(layout, shared_memory_name)
+    visualizer = Visualizer(layout["len_x_grid_dim"], layout["len_y_grid_dim"], **layout["visualizer_kwargs"])
+
+    controlled_objects = {
+        controller_name: RemoteControlledObject(controller_name, controller["attribute_name"], controller["value"],
+                                                controller_queue)
+        for controller_name, controller in layout["controllers"].items()
+    }
+
+    series_counts = {}
+
+    # Ist die Simulation beendet oder abgestürzt, ohne stop() aufzurufen, beendet sich der Render-Prozess selbst
+    parent_process = multiprocessing.parent_process()
+
+    try:
+        while not stop_event.is_set() and (parent_process is None or parent_process.is_alive()):
+            frame = frame_buffer.read(series_counts)
+
+            if frame is None:
+                # Kein vollständiger Frame: Fenster weiter bedienbar halten und später erneut lesen
+                visualizer.update_pygame_events()
+                time.sleep(READ_RETRY_INTERVAL)
+                continue
+
+            tick, arrays, new_values = frame
+
+            for array_name, draw_kwargs in layout["grid_arrays"].items():
+                visualizer.draw_grid_array(arrays[array_name], **draw_kwargs)
+
+            for graph_name, value_names in layout["series"].items():
+                for values in new_values[graph_name].tolist():
+                    visualizer.append_plot_values(graph_name, dict(zip(value_names, values)))
+                if graph_name in visualizer.graphs:
+                    visualizer.draw_graph(graph_name, value_names)
+
+            for controller_name, controller in layout["controllers"].items():
+                visualizer.control(
+                    controller_name,
+                    controlled_objects[controller_name],
+                    controller["attribute_name"],
+                    controller["attribute_min"],
+                    controller["attribute_max"],
+                    controller["increment"],
+                )
+
+            # Tick der Simulation rechtsbündig über dem Grid anzeigen (links steht der Frame-Zähler des Visualizers)
+            text_surface = visualizer.render_text("simulation tick: " + str(tick), visualizer.font_medium,
+                                                  visualizer.colors["black"])
+            visualizer.screen.blit(text_surface, (
+                visualizer.simulation_window_x_origin + visualizer.simulation_window_width - text_surface.get_width(),
+                visualizer.screen_gap // 4,
+            ))
+
+            visualizer.update_screen()
+
+    except pygame.error:
+        pass    # Fenster wurde geschlossen
+
+    finally:
+        frame_buffer.close()
+        pygame.quit()
+
+
+class RemoteVisualizer:
+    """
+    FUNCTION
+    Startet einen Visualizer in einem eigenen Prozess und versorgt ihn mit Frames aus einem gemeinsamen Speicher.
+
+    INPUT
+    len_x_grid_dim, len_y_grid_dim: Größe des Grids
+    grid_arrays:       {Name: Dict mit Argumenten für Visualizer.draw_grid_array()}, in dieser Reihenfolge gemalt.
+                       Die Arrays haben die Form (len_y_grid_dim, len_x_grid_dim)
+    plots:             {Graph-Name: [Werte-Namen]}
+    controllers:       {Controller-Name: (Objekt oder Klasse, Attribut-Name, Minimum, Maximum[, Schrittweite])}
+    series_capacity:   Größe des Ringpuffers für Plot-Werte pro Graph
+    visualizer_kwargs: weitere Argumente für den Visualizer (z.B. display_speed, incremental_redraw)
+
+    Beispiel:
+        remote = RemoteVisualizer(80, 80, grid_arrays={"output": {"attribute_min": -50, "attribute_max": 50}},
+                                  plots={"output": ["mean"]}, controllers={"loss rate": (Agent, "loss_rate", 0, 1, 0.01)})
+        remote.start()
+        for tick in range(n_ticks):
+            step(world)
+            remote.publish(tick, {"output": ...}, {"output": {"mean": ...}})
+            remote.apply_controller_changes()
+        remote.stop()
+    """
+
+    def __init__(
+            self,
+            len_x_grid_dim,
+            len_y_grid_dim,
+            grid_arrays = None,
+            plots = None,
+            controllers = None,
+            series_capacity = 4096,
+            **visualizer_kwargs,
+    ):
+        self.len_x_grid_dim = len_x_grid_dim
+        self.len_y_grid_dim = len_y_grid_dim
+        self.grid_arrays = dict(grid_arrays or {})
+        self.plots = {graph_name: list(value_names) for graph_name, value_names in (plots or {}).items()}
+        self.controllers = {
+            controller_name: (tuple(controller) + (1,))[:5] for controller_name, controller in (controllers or {}).items()
+        }
+        self.series_capacity = series_capacity
+        self.visualizer_kwargs = visualizer_kwargs
+
+        self.frame_buffer = None
+        self.controller_queue = None
+        self.stop_event = None
+        self.process = None
+
+    def get_layout(self):
+        return {
+            "len_x_grid_dim": self.len_x_grid_dim,
+            "len_y_grid_dim": self.len_y_grid_dim,
+            "arrays": {array_name: ((self.len_y_grid_dim, self.len_x_grid_dim), float) for array_name in self.grid_arrays},
+            "grid_arrays": self.grid_arrays,
+            "series": self.plots,
+            "series_capacity": self.series_capacity,
+            "controllers": {
+                controller_name: {
+                    "attribute_name": attribute_name,
+                    "attribute_min": attribute_min,
+                    "attribute_max": attribute_max,
+                    "increment": increment,
+                    "value": getattr(instance_or_class, attribute_name),
+                }
+                for controller_name, (instance_or_class, attribute_name, attribute_min, attribute_max, increment)
+                in self.controllers.items()
+            },
+            "visualizer_kwargs": self.visualizer_kwargs,
+        }
+
+    def start(self):
+        """ Legt den gemeinsamen Speicher an und startet den Render-Prozess """
+        layout = self.get_layout()
+        context = multiprocessing.get_context("spawn")
+
+        self.frame_buffer = SharedFrameBuffer(layout)
+        self.controller_queue = context.Queue()
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=run_render_process,
+            args=(layout, self.frame_buffer.name, self.controller_queue, self.stop_event),
+            daemon=True,
+        )
+        self.process.start()
+        return self
+
+    def is_running(self):
+        """ False, sobald das Fenster geschlossen wurde """
+        return self.process is not None and self.process.is_alive()
+
+    def publish(self, tick, grid_arrays = None, plot_values = None):
+        """
+        FUNCTION
+        Stellt einen neuen Stand für den Render-Prozess bereit. Wartet nie auf die Darstellung.
+
+        INPUT
+        grid_arrays: {Name: Array der Form (len_y_grid_dim, len_x_grid_dim)}, z.B. aus World.cell_arrays oder
+                     Helper.agents_to_grid_array()
+        plot_values: {Graph-Name: {Werte-Name: Wert}}
+        """
+        self.frame_buffer.write(tick, grid_arrays, plot_values)
+
+    def apply_controller_changes(self):
+        """ Überträgt alle seit dem letzten Aufruf im Fenster geänderten Controller-Werte, gibt ihre Anzahl zurück """
+        n_changes = 0
+        while True:
+            try:
+                controller_name, value = self.controller_queue.get_nowait()
+            except queue.Empty:
+                return n_changes
+
+            instance_or_class, attribute_name = self.controllers[controller_name][:2]
+            setattr(instance_or_class, attribute_name, value)
+            n_changes += 1
+
+    def stop(self, timeout = 5):
+        """ Beendet den Render-Prozess und gibt den gemeinsamen Speicher frei """
+        if self.process is None:
+            return
+
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.apply_controller_changes()
+        self.controller_queue.close()
+        self.frame_buffer.close()
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
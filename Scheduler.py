@@ -0,0 +1,101 @@
+import numpy as np
+
+"""
+Scheduler legen fest, in welcher Reihenfolge und mit welchem Informationsstand die Agenten einer Population
+pro Tick aktiviert werden.
+
+- SequentialScheduler:  Agenten werden in Populations-Reihenfolge nacheinander aktiviert.
+                        Spätere Agenten sehen die bereits veränderten Werte früherer Agenten.
+- RandomScheduler:      Wie sequentiell, aber jeden Tick in einer neuen zufälligen Reihenfolge. Die Population selbst
+                        wird dabei nicht umsortiert (es wird nur eine Permutation der Indizes gezogen).
+- SynchronousScheduler: Alle Agenten sehen den Zustand vom Beginn des Ticks. Die geschriebenen Attribute werden
+                        doppelt gepuffert: Ein Agent sieht während seiner Aktivierung seine eigenen neuen Werte, alle
+                        anderen Agenten sehen bis zum Ende des Ticks die alten Werte.
+
+Da im synchronen Modus die Reihenfolge keine Rolle für die Ergebnisse spielt (abgesehen von der Reihenfolge, in der
+Zufallszahlen gezogen werden), kann ein synchroner Tick auch vektorisiert oder parallel berechnet werden.
+"""
+
+
+class Scheduler:
+
+    def get_order(self, agents):
+        """ Reihenfolge der Aktivierung als Liste von Agenten """
+        return list(agents)
+
+    def activate(self, population, step_function):
+        """
+        Ruft step_function(agent) für alle Agenten auf, die zu Beginn des Ticks in der Population sind.
+        Agenten, die während des Ticks die Population verlassen (z.B. sterben), werden übersprungen,
+        sofern die Population eine Population-Instanz ist.
+        """
+        check_membership = hasattr(population, "columns")
+
+        for agent in self.get_order(population):
+            if check_membership and agent not in population:
+                continue
+            step_function(agent)
+
+
+class SequentialScheduler(Scheduler):
+    pass
+
+
+class RandomScheduler(Scheduler):
+
+    def get_order(self, agents):
+        agents = list(agents)
+        return [agents[i] for i in np.random.permutation(len(agents)).tolist()]
+
+
+class SynchronousScheduler(Scheduler):
+
+    def __init__(self, buffered_attributes):
+        """
+        INPUT
+        buffered_attributes: Namen der Attribute, die während eines Ticks geschrieben werden
+        """
+        self.buffered_attributes = list(buffered_attributes)
+
+    def activate(self, population, step_function):
+        agents = list(population)
+        n_agents = len(agents)
+
+        # Puffer für die neuen Werte
+        new_values = {attribute_name: [None] * n_agents for attribute_name in self.buffered_attributes}
+
+        for i, agent in enumerate(agents):
+            previous_values = [getattr(agent, attribute_name) for attribute_name in self.buffered_attributes]
+
+            step_function(agent)
+
+            # Neue Werte in den Puffer schreiben und für die übrigen Agenten die alten Werte wiederherstellen
+            for attribute_name, previous_value in zip(self.buffered_attributes, previous_values):
+                new_values[attribute_name][i] = getattr(agent, attribute_name)
+                setattr(agent, attribute_name, previous_value)
+
+        # Puffer übernehmen (Spalten einer Population auf einmal)
+        columns = getattr(population, "columns", {})
+
+        for attribute_name, values in new_values.items():
+            if attribute_name in columns and len(population) == n_agents:
+                population.set_column(attribute_name, values)
+            else:
+                for agent, value in zip(agents, values):
+                    setattr(agent, attribute_name, value)
+
+
+def create_scheduler(scheduler, buffered_attributes = None):
+    """ Übersetzt "sequential", "random" bzw. "synchronous" in eine Scheduler-Instanz """
+    if isinstance(scheduler, Scheduler):
+        return scheduler
+    elif scheduler == "sequential":
+        return SequentialScheduler()
+    elif scheduler == "random":
+        return RandomScheduler()
+    elif scheduler == "synchronous":
+        if not buffered_attributes:
+            raise ValueError("The synchronous scheduler needs the names of the buffered attributes")
+        return SynchronousScheduler(buffered_attributes)
+    else:
+        raise ValueError(f"Unknown scheduler: {scheduler}")
@@ -0,0 +1,207 @@
+import math
+
+import numpy as np
+
+from Helper import squared_distance_on_torus_array
+
+"""
+Räumlicher Index für Agenten auf dem Grid.
+
+Das Grid wird in quadratische Eimer (Buckets) mit bucket_size x bucket_size Zellen eingeteilt. Jeder Eimer kennt die
+Agenten, die auf seinen Zellen wohnen. Eine Umkreissuche muss dadurch nur die Eimer betrachten, die den Umkreis
+überdecken, statt die ganze Population. Auf einem Torus werden die Eimer über die Ränder hinweg gesucht.
+
+Der Index gehört zu einer World (World.create_spatial_index()) und wird von Agent.move_in() und Agent.move_out()
+aktuell gehalten. Abstände sind euklidisch und entsprechen Helper.euclidian_distance(). Ein Agent liegt im Umkreis r,
+wenn sein Abstand <= r ist.
+
+Eine gute Eimergröße liegt etwa beim typischen Suchradius.
+"""
+
+
+class SpatialIndex:
+
+    def __init__(self, len_x_grid_dim, len_y_grid_dim, bucket_size = 4, torus = True):
+        self.len_x_grid_dim = len_x_grid_dim
+        self.len_y_grid_dim = len_y_grid_dim
+        self.bucket_size = max(int(bucket_size), 1)
+        self.torus = torus
+
+        self.n_x_buckets = math.ceil(len_x_grid_dim / self.bucket_size)
+        self.n_y_buckets = math.ceil(len_y_grid_dim / self.bucket_size)
+
+        # Pro Eimer ein Dict {Agent.name: Agent}, in Einfüge-Reihenfolge
+        self.buckets = [{} for _ in range(self.n_x_buckets * self.n_y_buckets)]
+
+        # Agent.name -> Index des Eimers, in dem der Agent eingetragen ist
+        self.agent_buckets = {}
+
+    def __len__(self):
+        return len(self.agent_buckets)
+
+    def __contains__(self, agent):
+        return agent.name in self.agent_buckets
+
+    def get_bucket_index(self, x_grid_pos, y_grid_pos):
+        return (y_grid_pos // self.bucket_size) * self.n_x_buckets + (x_grid_pos // self.bucket_size)
+
+    ####################################################################################################################
+    # Aktualisierung
+    ####################################################################################################################
+
+    def insert(self, agent):
+        """ Trägt einen Agenten an seiner aktuellen Position ein (bzw. verschiebt ihn dorthin) """
+        if agent.name in self.agent_buckets:
+            self.remove(agent)
+
+        bucket_index = self.get_bucket_index(agent.x_grid_pos, agent.y_grid_pos)
+        self.buckets[bucket_index][agent.name] = agent
+        self.agent_buckets[agent.name] = bucket_index
+
+    def remove(self, agent):
+        """ Entfernt einen Agenten aus dem Index (unabhängig von seiner aktuellen Position) """
+        bucket_index = self.agent_buckets.pop(agent.name, None)
+        if bucket_index is not None:
+            del self.buckets[bucket_index][agent.name]
+
+    ####################################################################################################################
+    # Abfragen
+    ####################################################################################################################
+
+    def get_axis_buckets(self, first_pos, last_pos, radius, dim_len, n_buckets):
+        """ Eimer-Indizes einer Achse, die das Intervall [first_pos - radius, last_pos + radius] überdecken """
+        reach = int(math.floor(radius))
+
+        if not self.torus:
+            # Das Intervall vorher auf das Grid beschneiden, damit der Aufwand nicht mit dem Radius wächst
+            first_bucket = max(first_pos - reach, 0) // self.bucket_size
+            last_bucket = min(last_pos + reach, dim_len - 1) // self.bucket_size
+            return np.arange(first_bucket, last_bucket + 1)
+
+        if (last_pos - first_pos) + 2 * reach + 1 >= dim_len:
+            return np.arange(n_buckets)
+
+        positions = np.arange(first_pos - reach, last_pos + reach + 1) % dim_len
+        return np.unique(positions // self.bucket_size)
+
+    def get_candidates(self, x_grid_pos, y_grid_pos, radius):
+        """ Alle Agenten in den Eimern, die den Umkreis überdecken """
+        x_buckets = self.get_axis_buckets(x_grid_pos, x_grid_pos, radius, self.len_x_grid_dim, self.n_x_buckets)
+        y_buckets = self.get_axis_buckets(y_grid_pos, y_grid_pos, radius, self.len_y_grid_dim, self.n_y_buckets)
+
+        candidates = []
+        for y_bucket in y_buckets.tolist():
+            for x_bucket in x_buckets.tolist():
+                candidates.extend(self.buckets[y_bucket * self.n_x_buckets + x_bucket].values())
+
+        return candidates
+
+    def get_squared_distances(self, x_grid_pos, y_grid_pos, agents):
+        """ Quadrierte (Torus-)Abstände von einer Position zu allen übergebenen Agenten """
+        x_grid_positions = np.fromiter((agent.x_grid_pos for agent in agents), dtype=np.int64, count=len(agents))
+        y_grid_positions = np.fromiter((agent.y_grid_pos for agent in agents), dtype=np.int64, count=len(agents))
+
+        if self.torus:
+            return (squared_distance_on_torus_array(x_grid_positions, x_grid_pos, self.len_x_grid_dim)
+                    + squared_distance_on_torus_array(y_grid_positions, y_grid_pos, self.len_y_grid_dim))
+
+        return (x_grid_positions - x_grid_pos) ** 2 + (y_grid_positions - y_grid_pos) ** 2
+
+    def filter_agents(self, agents, population, exclude):
+        if population is None and exclude is None:
+            return agents
+        return [agent for agent in agents
+                if agent is not exclude and (population is None or getattr(agent, "population", None) is population)]
+
+    def query_radius(self, x_grid_pos, y_grid_pos, radius, population = None, exclude = None):
+        """
+        FUNCTION
+        Gibt alle Agenten zurück, deren Abstand zur Position höchstens radius ist.
+
+        INPUT
+        population: Nur Agenten dieser Population berücksichtigen (None = alle Agenten im Index)
+        exclude:    Dieser Agent wird nicht zurückgegeben (z.B. der fragende Agent selbst)
+
+        OUTPUT
+        Liste von Agenten (Reihenfolge: nach Eimern, innerhalb eines Eimers nach Einfüge-Reihenfolge)
+        """
+        candidates = self.filter_agents(self.get_candidates(x_grid_pos, y_grid_pos, radius), population, exclude)
+        if not candidates:
+            return []
+
+        within_radius = self.get_squared_distances(x_grid_pos, y_grid_pos, candidates) <= radius ** 2
+        return [agent for agent, is_within in zip(candidates, within_radius.tolist()) if is_within]
+
+    def get_max_distance(self):
+        """ Größtmöglicher Abstand zweier Positionen auf dem Grid """
+        if self.torus:
+            return math.sqrt((self.len_x_grid_dim // 2) ** 2 + (self.len_y_grid_dim // 2) ** 2)
+        return math.sqrt((self.len_x_grid_dim - 1) ** 2 + (self.len_y_grid_dim - 1) ** 2)
+
+    def query_nearest(self, x_grid_pos, y_grid_pos, k = 1, population = None, exclude = None):
+        """
+        FUNCTION
+        Gibt die k nächsten Agenten zu einer Position zurück, aufsteigend nach Abstand sortiert
+        (bei gleichem Abstand in der Reihenfolge von query_radius()).
+        Der Suchradius beginnt bei einer Eimergröße und wird verdoppelt, bis k Agenten gefunden sind.
+
+        OUTPUT
+        Liste von höchstens k Agenten
+        """
+        radius = self.bucket_size
+        max_distance = self.get_max_distance()
+
+        while True:
+            candidates = self.filter_agents(self.get_candidates(x_grid_pos, y_grid_pos, radius), population, exclude)
+            squared_distances = self.get_squared_distances(x_grid_pos, y_grid_pos, candidates)
+
+            # Nur Agenten innerhalb des Radius sind sicher die nächsten, weiter entfernte Eimer wurden nicht durchsucht
+            within_radius = np.flatnonzero(squared_distances <= radius ** 2)
+
+            if len(within_radius) >= k or radius >= max_distance:
+                order = within_radius[np.argsort(squared_distances[within_radius], kind="stable")[:k]]
+                return [candidates[i] for i in order.tolist()]
+
+            radius *= 2
+
+    def query_pairs(self, radius, population = None):
+        """
+        FUNCTION
+        Gibt alle Paare von Agenten zurück, deren Abstand höchstens radius ist. Jedes Paar kommt nur einmal vor.
+
+        OUTPUT
+        Liste von Tupeln (Agent, Agent, Abstand)
+        """
+        pairs = []
+        for bucket_index, bucket in enumerate(self.buckets):
+            agents = self.filter_agents(list(bucket.values()), population, None)
+            if not agents:
+                continue
+
+            # Alle Eimer, die von irgendeiner Zelle dieses Eimers aus im Radius liegen
+            first_x = (bucket_index % self.n_x_buckets) * self.bucket_size
+            first_y = (bucket_index // self.n_x_buckets) * self.bucket_size
+            last_x = min(first_x + self.bucket_size, self.len_x_grid_dim) - 1
+            last_y = min(first_y + self.bucket_size, self.len_y_grid_dim) - 1
+            x_buckets = self.get_axis_buckets(first_x, last_x, radius, self.len_x_grid_dim, self.n_x_buckets)
+            y_buckets = self.get_axis_buckets(first_y, last_y, radius, self.len_y_grid_dim, self.n_y_buckets)
+
+            for other_y_bucket in y_buckets.tolist():
+                for other_x_bucket in x_buckets.tolist():
+                    other_bucket_index = other_y_bucket * self.n_x_buckets + other_x_bucket
+                    if other_bucket_index < bucket_index:
+                        continue    # Dieses Eimer-Paar wurde bereits vom anderen Eimer aus betrachtet
+
+                    other_agents = self.filter_agents(list(self.buckets[other_bucket_index].values()), population, None)
+
+                    for i, agent in enumerate(agents):
+                        # Innerhalb desselben Eimers nur die nachfolgenden Agenten betrachten
+                        partners = other_agents[i + 1:] if other_bucket_index == bucket_index else other_agents
+                        if not partners:
+                            continue
+
+                        squared_distances = self.get_squared_distances(agent.x_grid_pos, agent.y_grid_pos, partners)
+                        for j in np.flatnonzero(squared_distances <= radius ** 2).tolist():
+                            pairs.append((agent, partners[j], math.sqrt(squared_distances[j])))
+
+        return pairs
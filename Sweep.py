@@ -0,0 +1,212 @@
+import itertools
+import random
+import types
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from BatchRunner import *
+
+"""
+Parameter-Sweeps ohne Visualizer.
+
+Ein Sweep-Parameter wird wie ein Controller des Visualizers beschrieben: (Objekt oder Klasse, Attribut-Name,
+Minimum, Maximum, Schrittweite). Aus mehreren Parametern wird ein Design erzeugt (vollfaktoriell oder zufällig
+gezogen), jede Parameterkombination wird für jeden Seed headless ausgeführt und alle Ergebnisse landen in einer
+Tabelle (Liste von Dicts) mit einer Zeile pro Parameterkombination, Seed und erhobenem Tick.
+
+Das kontrollierte Objekt wird im Worker-Prozess verändert, bevor die World erstellt wird. Für Klassen und Module
+funktioniert das direkt. Soll ein Objekt verändert werden, das erst mit der World entsteht, kann stattdessen eine
+Funktion übergeben werden, die das Objekt aus der World holt (auf Modulebene definiert, damit sie picklebar ist).
+"""
+
+
+class SweepParameter:
+
+    def __init__(
+            self,
+            parameter_name,
+            instance_or_class,
+            attribute_name,
+            attribute_min,
+            attribute_max,
+            increment = 1,
+    ):
+        self.parameter_name = parameter_name
+        self.instance_or_class = instance_or_class
+        self.attribute_name = attribute_name
+        self.attribute_min = attribute_min
+        self.attribute_max = attribute_max
+        self.increment = increment
+
+    def __repr__(self):
+        return f"SweepParameter {self.parameter_name}: {self.attribute_min} to {self.attribute_max} by {self.increment}"
+
+    def get_values(self):
+        """ Skalenwerte wie in Visualizer.control() (Rundung entfernt Gleitkomma-Artefakte von np.arange) """
+        values_on_scale = np.arange(self.attribute_min, self.attribute_max + self.increment, self.increment)
+        values_on_scale = values_on_scale[values_on_scale <= self.attribute_max + abs(self.increment) * 1e-9]
+        return [round(value, 10) for value in values_on_scale.tolist()]
+
+    def is_applied_before_world_creation(self):
+        target = self.instance_or_class
+        return isinstance(target, (type, types.ModuleType)) or not callable(target)
+
+    def apply(self, value, world = None):
+        """ Setzt den Wert im kontrollierten Objekt (bzw. in dem Objekt, das die Funktion aus der World holt) """
+        target = self.instance_or_class
+        if not self.is_applied_before_world_creation():
+            target = target(world)
+        setattr(target, self.attribute_name, value)
+
+
+def sweep_parameters_from_controllers(controllers):
+    """
+    Erstellt Sweep-Parameter aus den Controllern eines Visualizers (Visualizer.controllers),
+    damit ein interaktiv eingerichtetes Modell direkt als Sweep ausgeführt werden kann.
+    """
+    return [
+        SweepParameter(
+            controller_name,
+            controller["controlled_object"],
+            controller["attribute_name"],
+            controller["attribute_min"],
+            controller["attribute_max"],
+            controller.get("increment", 1),
+        )
+        for controller_name, controller in controllers.items()
+    ]
+
+
+########################################################################################################################
+# Designs
+########################################################################################################################
+
+def full_factorial_design(parameters):
+    """ Alle Kombinationen aller Skalenwerte, als Liste von Dicts {Parameter-Name: Wert} """
+    names = [parameter.parameter_name for parameter in parameters]
+    return [dict(zip(names, values))
+            for values in itertools.product(*[parameter.get_values() for parameter in parameters])]
+
+
+def sampled_design(parameters, n_samples, seed = None):
+    """ n_samples zufällig gezogene Kombinationen (je Parameter gleichverteilt über seine Skalenwerte) """
+    rng = random.Random(seed)
+    values = {parameter.parameter_name: parameter.get_values() for parameter in parameters}
+    return [{name: rng.choice(values[name]) for name in values} for _ in range(n_samples)]
+
+
+########################################################################################################################
+# Ausführung
+########################################################################################################################
+
+def create_configured_world(world_factory, parameters, design_point):
+    """ Setzt die Parameterwerte und erstellt dann die World (läuft im Worker-Prozess) """
+    for parameter in parameters:
+        if parameter.is_applied_before_world_creation():
+            parameter.apply(design_point[parameter.parameter_name])
+
+    world = world_factory()
+
+    for parameter in parameters:
+        if not parameter.is_applied_before_world_creation():
+            parameter.apply(design_point[parameter.parameter_name], world)
+
+    return world
+
+
+def run_design_point(world_factory, step_function, n_ticks, parameters, metrics, recording_interval, task):
+    """ Führt ein Replikat für eine Parameterkombination aus und gibt seine Tabellenzeilen zurück """
+    design_point, seed = task
+
+    result = run_replicate(
+        partial(create_configured_world, world_factory, parameters, design_point),
+        step_function,
+        n_ticks,
+        seed,
+        metrics = metrics,
+        recording_interval = recording_interval,
+    )
+
+    rows = results_as_rows([result])
+    for row in rows:
+        row.update(design_point)
+        row["runtime"] = result["runtime"]
+
+    return rows
+
+
+def run_sweep(
+        world_factory,
+        step_function,
+        n_ticks,
+        parameters,
+        seeds,
+        metrics = None,
+        design = "full_factorial",
+        n_samples = None,
+        design_seed = None,
+        recording_interval = None,
+        n_processes = None,
+):
+    """
+    FUNCTION
+    Führt einen Parameter-Sweep parallel aus.
+
+    INPUT
+    world_factory, step_function, n_ticks, metrics: wie bei run_batch()
+    parameters:         Liste von SweepParameter
+    seeds:              Seeds, die für jede Parameterkombination ausgeführt werden
+    design:             "full_factorial", "sampled" oder eine eigene Liste von Dicts {Parameter-Name: Wert}
+    n_samples:          Anzahl der Kombinationen bei design = "sampled"
+    design_seed:        Seed für das Ziehen der Kombinationen
+    recording_interval: Erhebungsintervall der Metriken (None = nur nach dem letzten Tick)
+    n_processes:        Anzahl der Prozesse (None = alle Kerne, 1 = ohne Pool)
+
+    OUTPUT
+    Liste von Dicts mit den Spalten: Parameter-Namen, seed, tick, Metriken, runtime
+    """
+    if design == "full_factorial":
+        design_points = full_factorial_design(parameters)
+    elif design == "sampled":
+        design_points = sampled_design(parameters, n_samples, design_seed)
+    else:
+        design_points = list(design)
+
+    tasks = [(design_point, seed) for design_point in design_points for seed in seeds]
+
+    run = partial(
+        run_design_point,
+        world_factory,
+        step_function,
+        n_ticks,
+        parameters,
+        metrics or {},
+        recording_interval or n_ticks,
+    )
+
+    if n_processes == 1:
+        # Im eigenen Prozess die ursprünglichen Werte der Klassen/Objekte danach wiederherstellen
+        original_values = [(parameter, getattr(parameter.instance_or_class, parameter.attribute_name))
+                           for parameter in parameters if parameter.is_applied_before_world_creation()]
+
+        rows_per_task = [run(task) for task in tasks]
+
+        for parameter, original_value in original_values:
+            setattr(parameter.instance_or_class, parameter.attribute_name, original_value)
+    else:
+        with ProcessPoolExecutor(max_workers = n_processes) as executor:
+            rows_per_task = list(executor.map(run, tasks, chunksize = max(1, len(tasks) // 64)))
+
+    # Spaltenreihenfolge: Parameter, seed, tick, Metriken
+    parameter_names = [parameter.parameter_name for parameter in parameters]
+    table = []
+    for rows in rows_per_task:
+        for row in rows:
+            table.append({
+                **{name: row[name] for name in parameter_names},
+                **{key: value for key, value in row.items() if key not in parameter_names},
+            })
+
+    return table
@@ -0,0 +1,157 @@
+import contextlib
+import functools
+import time
+from collections import deque
+
+"""
+Misst, wofür die Zeit eines Ticks verbraucht wird.
+
+Abschnitte eines Ticks werden mit "with profiler.phase(Name):" gemessen (oder mit dem Dekorator profiled_phase()).
+Verschachtelte Abschnitte zählen nur einmal: Die Zeit eines inneren Abschnitts wird vom äußeren abgezogen, so dass
+sich die Abschnitte eines Ticks nie zu mehr als der Tick-Dauer aufsummieren. end_tick() schließt einen Tick ab.
+Statistiken (Ticks pro Sekunde, mittlere Zeit pro Abschnitt) beziehen sich auf die letzten window Ticks.
+
+Ist der Profiler ausgeschaltet (enabled = False), werden keine Abschnitte gemessen, nur die Tick-Rate.
+
+Abschnitte, die World und Visualizer selbst messen:
+- "model step":       World.activate_agents()
+- "neighbor updates": World.set_neighbor_cells(), World.gather_neighbor_values()
+- "recorder":         World.record()
+- "drawing":          Agenten, Populationen und Grid-Arrays malen
+- "plotting":         Visualizer.plot()
+- "controllers":      Visualizer.control()
+- "display":          Bildschirm aktualisieren (display.flip/update) und leeren, Frame-Export
+- "frame rate limit": Warten auf die nächste Bildrate (display_speed)
+- "pause":            Wartezeit in der Pause (abzüglich der Controller)
+
+Die Heating-Model-Schritte (models/heating_model.py) messen sich ebenfalls als "model step".
+"""
+
+NULL_PHASE = contextlib.nullcontext()
+
+
+class TickProfiler:
+
+    def __init__(self, window = 100, enabled = True):
+        """
+        INPUT
+        window:  Anzahl der Ticks, über die die Statistiken gebildet werden
+        enabled: Abschnitte messen (die Tick-Rate wird immer gemessen)
+        """
+        self.window = window
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        # Zeiten des laufenden Ticks {Abschnitt: Sekunden}
+        self.current_phase_times = {}
+
+        # Offene Abschnitte als [Name, Startzeit, Zeit der inneren Abschnitte]
+        self.open_phases = []
+
+        # Abgeschlossene Ticks
+        self.tick_start = time.perf_counter()
+        self.tick_timestamps = deque([self.tick_start], maxlen=self.window + 1)
+        self.tick_times = deque(maxlen=self.window)
+        self.phase_times = deque(maxlen=self.window)
+        self.n_ticks = 0
+
+    def phase(self, phase_name):
+        """ Kontextmanager, der die Zeit des Abschnitts zum laufenden Tick addiert """
+        if not self.enabled:
+            return NULL_PHASE
+        return self.measure_phase(phase_name)
+
+    @contextlib.contextmanager
+    def measure_phase(self, phase_name):
+        open_phase = [phase_name, time.perf_counter(), 0.0]
+        self.open_phases.append(open_phase)
+        try:
+            yield
+        finally:
+            self.open_phases.pop()
+            elapsed = time.perf_counter() - open_phase[1]
+            self.add_phase_time(phase_name, elapsed - open_phase[2])
+            if self.open_phases:
+                self.open_phases[-1][2] += elapsed
+
+    def add_phase_time(self, phase_name, seconds):
+        self.current_phase_times[phase_name] = self.current_phase_times.get(phase_name, 0.0) + seconds
+
+    def end_tick(self):
+        """ Schließt den laufenden Tick ab (z.B. einmal pro Tick in Visualizer.update_screen()) """
+        now = time.perf_counter()
+
+        self.tick_times.append(now - self.tick_start)
+        self.tick_timestamps.append(now)
+        self.phase_times.append(self.current_phase_times)
+
+        self.tick_start = now
+        self.current_phase_times = {}
+        self.n_ticks += 1
+
+    @property
+    def ticks_per_second(self):
+        """ Tick-Rate über die letzten window Ticks """
+        if len(self.tick_timestamps) < 2:
+            return 0.0
+        return (len(self.tick_timestamps) - 1) / max(self.tick_timestamps[-1] - self.tick_timestamps[0], 1e-12)
+
+    def get_phase_times(self):
+        """ Mittlere Zeit pro Tick (in Sekunden) für jeden Abschnitt über die letzten window Ticks """
+        n_ticks = len(self.phase_times)
+        totals = {}
+        for phase_times in self.phase_times:
+            for phase_name, seconds in phase_times.items():
+                totals[phase_name] = totals.get(phase_name, 0.0) + seconds
+
+        return {phase_name: seconds / n_ticks for phase_name, seconds in totals.items()}
+
+    def get_statistics(self):
+        """
+        OUTPUT
+        dict mit
+        - "ticks":            Anzahl der abgeschlossenen Ticks
+        - "ticks_per_second": Tick-Rate
+        - "tick_seconds":     mittlere Dauer eines Ticks
+        - "phase_seconds":    mittlere Zeit pro Abschnitt, absteigend sortiert
+        - "other_seconds":    mittlere Zeit pro Tick, die keinem Abschnitt zugeordnet ist
+        """
+        tick_seconds = sum(self.tick_times) / len(self.tick_times) if self.tick_times else 0.0
+        phase_seconds = dict(sorted(self.get_phase_times().items(), key=lambda item: -item[1]))
+
+        return {
+            "ticks": self.n_ticks,
+            "ticks_per_second": self.ticks_per_second,
+            "tick_seconds": tick_seconds,
+            "phase_seconds": phase_seconds,
+            "other_seconds": max(tick_seconds - sum(phase_seconds.values()), 0.0),
+        }
+
+    def get_summary_text(self):
+        """ Einzeilige Zusammenfassung, z.B. "61.2 ticks/s | model step 9.8 ms | drawing 4.1 ms | ..." """
+        statistics = self.get_statistics()
+
+        parts = [f"{statistics['ticks_per_second']:.1f} ticks/s"]
+        parts += [f"{phase_name} {seconds * 1000:.1f} ms" for phase_name, seconds in statistics["phase_seconds"].items()]
+        if statistics["phase_seconds"]:
+            parts.append(f"other {statistics['other_seconds'] * 1000:.1f} ms")
+
+        return " | ".join(parts)
+
+
+def profiled_phase(phase_name):
+    """ Dekorator für Methoden von Objekten mit einem Attribut profiler: misst jeden Aufruf als Abschnitt phase_name """
+
+    def decorator(method):
+
+        @functools.wraps(method)
+        def profiled_method(self, *args, **kwargs):
+            if not self.profiler.enabled:
+                return method(self, *args, **kwargs)
+            with self.profiler.measure_phase(phase_name):
+                return method(self, *args, **kwargs)
+
+        return profiled_method
+
+    return decorator
@@ -2,6 +2,7 @@ import pygame
 from pygame.locals import DOUBLEBUF
 
 import math
+import os
 import numpy as np
 
 from Helper import *
@@ -9,6 +10,9 @@ from World import *
 from Visualizer import *
 from Agent import *
 from Cell import *
+from PlotHistory import *
+from FrameWriter import *
+from TickProfiler import *
 
 
 import time
@@ -30,6 +34,21 @@ auch zugegriffen wird, sonst macht es keinen Unterschied, diese zu verändern).
 Mit der plot()-Funktion können beliebige Werte während der Simulation geplottet werden.
 
 Zuletzt muss noch die update_screen()-Funktion aufgerufen werden, um die Darstellung zu aktualisieren.
+
+Die Simulationsmodule (World, Agent, Cell, ...) importieren den Visualizer nicht. Wer zeichnen will, importiert ihn
+selbst (from Visualizer import *), Läufe ohne Darstellung laden dadurch kein pygame.
+
+Mit incremental_redraw=True wird das Grid nicht in jedem Frame komplett neu gemalt: update_screen() überträgt nur die
+Rechtecke, in denen sich Zellen oder Agenten seit dem letzten Frame geändert haben (pygame.display.update(rects)), dazu
+die Bereiche der Plots und Controller. Nach request_full_redraw() wird wieder alles neu gemalt.
+
+Mit offscreen=True wird ohne Fenster gerendert (SDL-Treiber "dummy"), update_screen() pausiert dann nicht und wartet
+nicht auf display_speed. Mit start_frame_export() wird jeder k-te Frame als PNG-Datei oder in ein komprimiertes
+Frame-Archiv geschrieben, stop_frame_export() wartet, bis alles geschrieben ist.
+
+Der Visualizer misst die Zeit fürs Malen, Plotten, die Controller und die Bildschirm-Aktualisierung mit einem
+TickProfiler (self.profiler, siehe TickProfiler.py). Mit show_profiler=True wird unter dem Grid die Tick-Rate und die
+Zeit pro Abschnitt angezeigt, self.profiler.get_statistics() liefert dieselben Zahlen als dict.
 """
 
 class Visualizer:
@@ -75,6 +94,19 @@ class Visualizer:
 
     DOUBLECLICKTIME = 250
 
+    # Maximale Anzahl gerenderter Texte im Text-Cache
+    TEXT_CACHE_SIZE = 1024
+
+    # Ab so vielen geänderten Rechtecken wird beim inkrementellen Neuzeichnen das ganze Simulations-Fenster übertragen
+    MAX_DIRTY_RECTS = 256
+
+    # Sekunden, nach denen die Profiler-Anzeige aktualisiert wird (damit sie lesbar bleibt)
+    PROFILER_OVERLAY_INTERVAL = 0.5
+
+    # Millisekunden, die in der Pause höchstens auf ein Event gewartet wird, bevor die Pause-Bedingung erneut geprüft
+    # wird (z.B. falls display_speed vom Programm geändert wurde)
+    PAUSE_EVENT_TIMEOUT = 250
+
     def __init__(
             self,
             len_x_grid_dim,
@@ -85,6 +117,11 @@ class Visualizer:
             controlling_window_width = 300,
             screen_height=600,
             pause_if_mouse_in_controlling_window = True,
+            incremental_redraw = False,
+            plot_history_capacity = None,
+            offscreen = False,
+            profiler = None,
+            show_profiler = False,
     ):
 
         ######################################################
@@ -139,6 +176,11 @@ class Visualizer:
         flags = DOUBLEBUF
         #screen = pygame.display.set_mode(resolution, flags, bpp)
 
+        # Ohne Fenster rendern (z.B. auf Servern ohne Display oder für den Frame-Export, siehe start_frame_export())
+        self.offscreen = offscreen
+        if self.offscreen:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+
         pygame.init()
         pygame.font.init()
         self.clock = pygame.time.Clock()
@@ -163,6 +205,9 @@ class Visualizer:
         # Zeitmesser für Doppelklick
         self.dbclock = pygame.time.Clock()
 
+        # Bereits gerenderte Texte {(Text, Font, Farbe, Kantenglättung): Surface}, siehe render_text()
+        self.text_surfaces = {}
+
         ######################################################
         # DICTS
         ######################################################
@@ -170,6 +215,9 @@ class Visualizer:
         # Plotting
         self.graphs = {}
 
+        # Anzahl der Eimer pro Plot-Linie (siehe PlotHistory.py), standardmäßig zwei pro Pixel der Plot-Breite
+        self.plot_history_capacity = plot_history_capacity or 2 * self.plotting_window_width
+
         # Controllers
         self.controllers = {}
 
@@ -185,12 +233,64 @@ class Visualizer:
         # wenn die Jitteroption aktiviert ist, dann wird für jeden Agenten eine Abweichung hier eingespeichert
         self.jitter_deviations_dict = {}
 
+        # Flächen für draw_grid_array() (werden beim ersten Aufruf angelegt) und Gitter-Overlays pro Umrandungsfarbe
+        self.grid_surface = None
+        self.scaled_grid_surface = None
+        self.grid_line_overlays = {}
+
+        ######################################################
+        # Inkrementelles Neuzeichnen (siehe update_screen())
+        ######################################################
+        self.incremental_redraw = incremental_redraw
+        self.full_redraw_needed = True
+
+        # Rechtecke, die beim nächsten update_screen() auf den Bildschirm gebracht werden
+        self.dirty_rects = []
+
+        # Im aktuellen und im letzten Frame gemalte Agenten als (Rechteck, Farbe, Umrandungsfarbe)
+        self.frame_items = []
+        self.previous_frame_items = None
+
+        # Farben des zuletzt mit draw_grid_array() gemalten Grids
+        self.previous_grid_colors = None
+        self.previous_grid_outline_color = None
+        self.grid_array_drawn = False
+
+        self.simulation_window_rect = pygame.Rect(
+            self.simulation_window_x_origin,
+            self.simulation_window_y_origin,
+            self.cell_width * self.len_x_grid_dim,
+            self.cell_height * self.len_y_grid_dim,
+        )
+
+        # Alles außerhalb des Grids (Plots, Controller, Tick-Anzeige) wird in jedem Frame neu gemalt
+        self.panel_rects = [
+            pygame.Rect(0, 0, self.simulation_window_rect.left, self.screen_height),
+            pygame.Rect(self.simulation_window_rect.right, 0,
+                        self.screen_width - self.simulation_window_rect.right, self.screen_height),
+            pygame.Rect(self.simulation_window_rect.left, 0,
+                        self.simulation_window_rect.width, self.simulation_window_rect.top),
+            pygame.Rect(self.simulation_window_rect.left, self.simulation_window_rect.bottom,
+                        self.simulation_window_rect.width, self.screen_height - self.simulation_window_rect.bottom),
+        ]
+
         ######################################################
         # Tick
         ######################################################
         self.tick = 0
+        self.time_t0 = time.perf_counter()
+
+        # Zeitmessung pro Abschnitt eines Ticks (siehe TickProfiler.py). Mit profiler=world.profiler landen Modell und
+        # Darstellung in derselben Messung, update_screen() schließt dann jeweils den Tick ab.
+        self.profiler = profiler if profiler is not None else TickProfiler()
+        self.show_profiler = show_profiler
+        if self.show_profiler:
+            self.profiler.enabled = True
+        self.profiler_overlay_text = ""
+        self.profiler_overlay_time = self.time_t0
+
+        # Tick-Rate über die letzten Ticks, wird in update_screen() aktualisiert
         self.ticks_per_second = 0
-        self.time_t0 = time.process_time()
 
         ######################################################
         # Sonstiges
@@ -198,11 +298,15 @@ class Visualizer:
         self.pause_if_mouse_in_controlling_window = pause_if_mouse_in_controlling_window
         self.pause = False
 
+        # Frame-Export (siehe start_frame_export())
+        self.frame_writer = None
+        self.export_every_k_ticks = 1
+
     ####################################################################################################################
     # Funktionen
     ####################################################################################################################
 
-    def update_pygame_events(self):
+    def update_pygame_events(self, pygame_events = None):
 
         # Maustasten in Ursprungszustand setzen
         self.buttons["mouse_left"] = "up"
@@ -211,8 +315,9 @@ class Visualizer:
         # Mausposition erfragen und in Dict einspeichern
         self.buttons["mouse_x_screen_pos"], self.buttons["mouse_y_screen_pos"] = pygame.mouse.get_pos()
 
-        # Pygame-Events abfragen
-        pygame_events = pygame.event.get()
+        # Pygame-Events abfragen (falls nicht schon übergeben, siehe wait_while_paused())
+        if pygame_events is None:
+            pygame_events = pygame.event.get()
 
         # Für alle aufgetretenen Events
         for event in pygame_events:
@@ -232,6 +337,10 @@ class Visualizer:
                 else:
                     self.buttons["mouse_left"] = "single_click"
 
+            # Fenster wieder sichtbar geworden? Dann muss alles neu gemalt werden
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.request_full_redraw()
+
             # Pygame schließen?
             elif event.type == pygame.QUIT:
                 pygame.display.quit()
@@ -306,23 +415,34 @@ class Visualizer:
         agent_height,   # agents's height on screen
         )
 
+        item = (rect, tuple(color), self.colors[outline_color] if draw_outline else None)
+
+        # Beim inkrementellen Neuzeichnen wird erst in update_screen() gemalt, und nur, wo sich etwas geändert hat
+        if self.incremental_redraw:
+            self.frame_items.append(item)
+        else:
+            self.draw_item(item)
+
+    def draw_item(self, item):
+        """
+        Malt ein Rechteck mit optionaler 1 Pixel breiter Umrandung. Die Umrandung wird aus vier schmalen Flächen
+        gefüllt statt mit pygame.draw.rect(..., 1), weil diese bei gesetztem Clip-Bereich (siehe draw_changed_items())
+        den Rand des Clip-Bereichs mit umrandet. Ohne Clipping sind beide Varianten pixelgleich.
+        """
+        rect, color, outline_color = item
+        rect = pygame.Rect(rect)
 
         # Quadrat malen
-        pygame.draw.rect(
-            self.screen,
-            color,
-            rect,
-        )
+        self.screen.fill(color, rect)
 
-        if draw_outline:
+        if outline_color is not None and rect.width > 0 and rect.height > 0:
             # Umrandung für Quadrat malen
-            pygame.draw.rect(
-                self.screen,
-                self.colors[outline_color],
-                rect,
-                1,
-            )
+            self.screen.fill(outline_color, (rect.left, rect.top, rect.width, 1))
+            self.screen.fill(outline_color, (rect.left, rect.bottom - 1, rect.width, 1))
+            self.screen.fill(outline_color, (rect.left, rect.top, 1, rect.height))
+            self.screen.fill(outline_color, (rect.right - 1, rect.top, 1, rect.height))
 
+    @profiled_phase("drawing")
     def draw_population_base_function(
         self,
         population,
@@ -456,12 +576,224 @@ class Visualizer:
 
         )
 
+    ####################################################################################################################
+    # Grid als Array malen
+    ####################################################################################################################
+
+    def calculate_dynamic_colors(self, values, attribute_min, attribute_max):
+        """
+        Vektorisierte Variante der Farbberechnung von draw_population_with_dynamic_color():
+        Werte über der Mitte der Skala werden rot, Werte darunter blau, die Mitte weiß.
+
+        OUTPUT
+        uint8-Array mit einer zusätzlichen letzten Dimension (r, g, b)
+        """
+        rescaled_values = rescale_array(values, attribute_min, attribute_max, -255, 255)
+        fading = 255 - np.abs(rescaled_values)
+
+        colors = np.empty(np.shape(values) + (3,), dtype=np.uint8)
+        colors[..., 0] = np.where(rescaled_values > 0, 255, fading)
+        colors[..., 1] = fading
+        colors[..., 2] = np.where(rescaled_values < 0, 255, fading)
+        return colors
+
+    def calculate_categorial_colors(self, values, attribute_states_and_colors_dict, default_color = None):
+        """ Vektorisierte Variante der Farbzuordnung von draw_population_with_categorial_attributes() """
+        values = np.asarray(values)
+        colors = np.empty(values.shape + (3,), dtype=np.uint8)
+        colors[...] = self.BACKGROUND_COLOR if default_color is None else default_color
+
+        for attribute_state, color in attribute_states_and_colors_dict.items():
+            colors[values == attribute_state] = color
+        return colors
+
+    def get_grid_line_overlay(self, outline_color):
+        """
+        Gitter mit den Umrandungen aller Zellen als transparente Fläche. Wie bei draw_agent_base_function() bekommt
+        jede Zelle eine 1 Pixel breite Umrandung am Rand ihres Rechtecks. Wird nur einmal pro Farbe berechnet.
+        """
+        if outline_color not in self.grid_line_overlays:
+            width = self.cell_width * self.len_x_grid_dim
+            height = self.cell_height * self.len_y_grid_dim
+
+            overlay = pygame.Surface((width, height))
+            overlay.fill(self.colors["white"] if outline_color != "white" else self.colors["black"])
+            overlay.set_colorkey(overlay.get_at((0, 0)))
+
+            color = self.colors[outline_color]
+            for x_grid_pos in range(self.len_x_grid_dim):
+                for x_screen_pos in (x_grid_pos * self.cell_width, (x_grid_pos + 1) * self.cell_width - 1):
+                    pygame.draw.line(overlay, color, (x_screen_pos, 0), (x_screen_pos, height - 1))
+            for y_grid_pos in range(self.len_y_grid_dim):
+                for y_screen_pos in (y_grid_pos * self.cell_height, (y_grid_pos + 1) * self.cell_height - 1):
+                    pygame.draw.line(overlay, color, (0, y_screen_pos), (width - 1, y_screen_pos))
+
+            self.grid_line_overlays[outline_color] = overlay
+
+        return self.grid_line_overlays[outline_color]
+
+    @profiled_phase("drawing")
+    def draw_grid_array(
+            self,
+            array,
+            attribute_min = None,
+            attribute_max = None,
+            attribute_states_and_colors_dict = None,
+            draw_outline = False,
+            outline_color = "black",
+    ):
+        """
+        FUNCTION
+        Malt das ganze Grid mit einer einzigen Blit-Operation (über pygame.surfarray) statt einem Rechteck pro Agent.
+        Das Array wird auf die Größe des Simulations-Fensters skaliert (jede Zelle wird zu cell_width x cell_height
+        Pixeln), die Umrandung der Zellen wird optional als Gitter darübergelegt.
+
+        INPUT
+        array:                            Array der Form (len_y_grid_dim, len_x_grid_dim), z.B. aus World.cell_arrays,
+                                          mit Werten oder mit Farben (Form (len_y_grid_dim, len_x_grid_dim, 3))
+        attribute_min, attribute_max:     Skala für Werte, Farben wie bei draw_population_with_dynamic_color()
+                                          (None = Minimum bzw. Maximum des Arrays)
+        attribute_states_and_colors_dict: Alternativ Farben für kategoriale Werte wie bei
+                                          draw_population_with_categorial_attributes()
+        draw_outline:                     Gitter mit den Umrandungen der Zellen malen
+
+        Zellen mit NaN (z.B. ohne Agent, siehe draw_population_as_array()) werden in der Hintergrundfarbe gemalt.
+        """
+        array = np.asarray(array)
+
+        if array.ndim == 3:
+            colors = array.astype(np.uint8, copy=False)
+        elif attribute_states_and_colors_dict is not None:
+            colors = self.calculate_categorial_colors(array, attribute_states_and_colors_dict)
+        else:
+            is_empty = np.isnan(array) if np.issubdtype(array.dtype, np.floating) else np.zeros(array.shape, dtype=bool)
+            values = np.where(is_empty, 0, array)
+
+            if attribute_min is None or attribute_max is None:
+                attribute_min = values[~is_empty].min(initial=0) if attribute_min is None else attribute_min
+                attribute_max = values[~is_empty].max(initial=0) if attribute_max is None else attribute_max
+
+            colors = self.calculate_dynamic_colors(values, attribute_min, attribute_max)
+            colors[is_empty] = self.BACKGROUND_COLOR
+
+        # Flächen nur einmal anlegen und danach wiederverwenden
+        if self.grid_surface is None:
+            self.grid_surface = pygame.Surface((self.len_x_grid_dim, self.len_y_grid_dim))
+            self.scaled_grid_surface = pygame.Surface(
+                (self.cell_width * self.len_x_grid_dim, self.cell_height * self.len_y_grid_dim))
+
+        # surfarray erwartet die Achsen in der Reihenfolge (x, y)
+        pygame.surfarray.blit_array(self.grid_surface, colors.transpose(1, 0, 2))
+        pygame.transform.scale(self.grid_surface, self.scaled_grid_surface.get_size(), self.scaled_grid_surface)
+
+        if draw_outline:
+            self.scaled_grid_surface.blit(self.get_grid_line_overlay(outline_color), (0, 0))
+
+        outline = outline_color if draw_outline else None
+        self.grid_array_drawn = True
+
+        # Beim inkrementellen Neuzeichnen nur die Zellen übertragen, deren Farbe sich seit dem letzten Frame geändert hat
+        if (self.incremental_redraw
+                and self.previous_grid_colors is not None
+                and self.previous_grid_colors.shape == colors.shape
+                and self.previous_grid_outline_color == outline):
+            changed_cell_rects = self.get_changed_cell_rects(np.any(colors != self.previous_grid_colors, axis=-1))
+            for rect in changed_cell_rects:
+                self.restore_simulation_background(rect)
+            self.dirty_rects.extend(changed_cell_rects)
+        else:
+            self.screen.blit(self.scaled_grid_surface, self.simulation_window_rect.topleft)
+            self.dirty_rects.append(self.simulation_window_rect.copy())
+
+        if self.incremental_redraw:
+            self.previous_grid_colors = colors.copy()
+            self.previous_grid_outline_color = outline
 
+    def get_changed_cell_rects(self, changed):
+        """
+        Fasst geänderte Zellen (bool-Array der Form (len_y_grid_dim, len_x_grid_dim)) zeilenweise zu Rechtecken auf dem
+        Bildschirm zusammen: Jede zusammenhängende Folge geänderter Zellen in einer Zeile wird ein Rechteck.
+        Bei sehr vielen Rechtecken wird stattdessen das ganze Simulations-Fenster zurückgegeben.
+        """
+        padded = np.zeros((changed.shape[0], changed.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = changed
+        steps = np.diff(padded, axis=1)
+
+        # argwhere liefert zeilenweise sortiert, Anfänge und Enden einer Zeile gehören also paarweise zusammen
+        starts = np.argwhere(steps == 1)
+        ends = np.argwhere(steps == -1)[:, 1]
+
+        if len(starts) > self.MAX_DIRTY_RECTS:
+            return [self.simulation_window_rect.copy()]
+
+        return [
+            pygame.Rect(
+                self.simulation_window_x_origin + x_start * self.cell_width,
+                self.simulation_window_y_origin + y_grid_pos * self.cell_height,
+                (x_end - x_start) * self.cell_width,
+                self.cell_height,
+            )
+            for (y_grid_pos, x_start), x_end in zip(starts.tolist(), ends.tolist())
+        ]
+
+    def restore_simulation_background(self, rect):
+        """ Malt den Hintergrund des Simulations-Fensters (das Grid-Array oder die Hintergrundfarbe) in einem Rechteck neu """
+        if self.grid_array_drawn:
+            self.screen.blit(self.scaled_grid_surface, rect, rect.move(-self.simulation_window_x_origin,
+                                                                      -self.simulation_window_y_origin))
+        else:
+            self.screen.fill(self.BACKGROUND_COLOR, rect)
+
+    def population_to_grid_array(
+            self,
+            population,
+            attribute_name,
+            x_grid_pos_attr_name = "x_grid_pos",
+            y_grid_pos_attr_name = "y_grid_pos",
+            fill_value = np.nan,
+            dtype = float,
+    ):
+        """
+        Schreibt ein Attribut aller Agenten an ihre Position in ein Array der Form (len_y_grid_dim, len_x_grid_dim).
+        Zellen ohne Agent bekommen fill_value. Bei mehreren Agenten auf einer Zelle gewinnt der letzte.
+        """
+        return agents_to_grid_array(
+            population, attribute_name, self.len_x_grid_dim, self.len_y_grid_dim,
+            x_grid_pos_attr_name, y_grid_pos_attr_name, fill_value, dtype)
+
+    @profiled_phase("drawing")
+    def draw_population_as_array(
+            self,
+            population,
+            attribute_name,
+            attribute_min = None,
+            attribute_max = None,
+            attribute_states_and_colors_dict = None,
+            draw_outline = False,
+            outline_color = "black",
+    ):
+        """
+        Schnelle Alternative zu draw_population_with_dynamic_color() bzw. draw_population_with_categorial_attributes()
+        für Agenten, die ihre Zelle ganz ausfüllen: Die Werte werden in ein Grid-Array geschrieben und mit
+        draw_grid_array() in einem Schritt gemalt.
+        """
+        dtype = object if attribute_states_and_colors_dict is not None else float
+        fill_value = None if attribute_states_and_colors_dict is not None else np.nan
+
+        self.draw_grid_array(
+            self.population_to_grid_array(population, attribute_name, fill_value = fill_value, dtype = dtype),
+            attribute_min = attribute_min,
+            attribute_max = attribute_max,
+            attribute_states_and_colors_dict = attribute_states_and_colors_dict,
+            draw_outline = draw_outline,
+            outline_color = outline_color,
+        )
 
     ####################################################################################################################
     # Plot-Funktionen
     ####################################################################################################################
 
+    @profiled_phase("plotting")
     def plot(
             self,
             graph_name,
@@ -471,6 +803,11 @@ class Visualizer:
             summary_method = sum,
             line_colors = "standard",
     ):
+        self.append_plot_values(graph_name, value_dict, plotting_interval, summary_method)
+        self.draw_graph(graph_name, list(value_dict), line_colors)
+
+    def append_plot_values(self, graph_name, value_dict, plotting_interval = 1, summary_method = sum):
+        """ Hängt die Werte an die Verläufe des Graphen an, ohne zu malen (z.B. mehrere Ticks auf einmal) """
 
         ############################################################################################################
         # initialize graph
@@ -500,9 +837,9 @@ class Visualizer:
 
             # checken, ob es für den Value noch keinen Speicher im Graphen gibt
             if not value_name in self.graphs[graph_name]:
-                # Datenliste für Value anlegen
+                # Verlauf mit fester Kapazität für Value anlegen
                 self.graphs[graph_name].update(
-                    {value_name:[]}
+                    {value_name: PlotHistory(self.plot_history_capacity)}
                 )
                 # Falls das Plotting-Intervall größer 1 ist und daher Werte zwischengespeichert werden müssen
                 if plotting_interval > 1:
@@ -532,7 +869,8 @@ class Visualizer:
             elif value_dict[value_name] > self.graphs[graph_name]["max_value"]:
                 self.graphs[graph_name]["max_value"] = value_dict[value_name]
 
-
+    def draw_graph(self, graph_name, value_names, line_colors = "standard"):
+        """ Malt einen Graphen mit den Verläufen der angegebenen Werte """
 
         # Länge und Breite des Graphen berechnen
         graph_width = self.plotting_window_width
@@ -552,21 +890,18 @@ class Visualizer:
         plot_x_origin = graph_x_origin + GRAPH_PLOT_X_GAP
         plot_y_origin = graph_y_origin + GRAPH_PLOT_Y_GAP // 2
 
-        pygame.draw.rect(
-            self.screen,
-            self.colors["dim gray"],
-            (plot_x_origin, plot_y_origin, plot_width, plot_height),
-            1,
-        )
+        # Farben für Linien holen
+        line_colors = (self.plot_colors if line_colors == "standard" else line_colors)
+
+        # Statische Teile des Graphen (Rahmen, Bezeichnung, Legende) nur neu malen, wenn sich Layout oder Linien ändern
+        static_key = (graph_height, tuple(value_names), tuple(tuple(color) for color in line_colors[:len(value_names)]))
+        if self.graphs[graph_name].get("static_key") != static_key:
+            self.graphs[graph_name]["static_surface"] = self.render_graph_static_surface(
+                graph_name, value_names, line_colors, graph_width, graph_height)
+            self.graphs[graph_name]["static_key"] = static_key
+
+        self.screen.blit(self.graphs[graph_name]["static_surface"], (graph_x_origin, graph_y_origin))
 
-        # Graph-Bezeichnung einzeichnen
-        self.draw_text_new(
-            graph_name,
-            graph_x_origin + 5,
-            graph_y_origin + 5,
-            self.font_medium,
-            "black",
-        )
         # Abgrenzung zwischen Plot- und Simulations-Window malen
         pygame.draw.line(
             self.screen,
@@ -576,50 +911,40 @@ class Visualizer:
             1,
         )
 
-        # Graphen-Tick-Minimum einzeichnen
-        self.draw_text_new(
-            str(0),
-            plot_x_origin,
-            plot_y_origin + plot_height + 2,
-            self.font_small,
-            "dim gray",
-        )
         # Graphen-Tick-Maximum einzeichnen
         self.draw_text_new(
-            str(len(self.graphs[graph_name][value_name])),
+            str(len(self.graphs[graph_name][value_names[-1]])),
             plot_x_origin + plot_width - 10,
             plot_y_origin + plot_height + 2,
             self.font_small,
             "dim gray",
         )
 
-        # Farben für Linien holen
-        line_colors = (self.plot_colors if line_colors == "standard" else line_colors)
-
-        for i, value_name in enumerate(value_dict.keys()):
+        for i, value_name in enumerate(value_names):
 
-            # für bessere Lesbarkeit die Datenliste unter anderem Namen abspeichern
-            value_list = self.graphs[graph_name][value_name]
+            # für bessere Lesbarkeit den Verlauf unter anderem Namen abspeichern
+            history = self.graphs[graph_name][value_name]
 
             # Wenn es zu plottende Daten gibt
-            if len(value_list) >= 2:
+            if len(history) >= 2:
 
                 # Minimum und Maximum der Datenlisten aller Datenlisten im Graph heraussuchen
                 # Die 0 ist immer mit in der Auswahl
                 min_value = math.floor(self.graphs[graph_name]["min_value"])
                 max_value = math.ceil(self.graphs[graph_name]["max_value"])
 
-
-                pointlist = [
-                    (round(plot_x_origin + rescale(i, 0, len(value_list) - 1, 0, plot_width)),
-
-                     round(plot_y_origin + plot_height - rescale(value, min_value, max_value, 0, plot_height))
-                     )
-                    for i, value in enumerate(value_list)
-                ]
-
-                # Graphen-Linie zeichnen
-                pygame.draw.aalines(
+                # Pro Eimer des Verlaufs höchstens zwei Punkte (Minimum und Maximum), unabhängig von der Anzahl der Ticks
+                positions, values = history.get_points()
+                x_screen_positions = np.round(plot_x_origin + rescale_array(positions, 0, len(history) - 1, 0, plot_width))
+                y_screen_positions = np.round(plot_y_origin + plot_height - rescale_array(values, min_value, max_value, 0, plot_height))
+                x_screen_positions, y_screen_positions = self.reduce_to_pixel_columns(
+                    x_screen_positions.astype(int), y_screen_positions.astype(int))
+                pointlist = np.stack([x_screen_positions, y_screen_positions], axis=1).tolist()
+
+                # Graphen-Linie zeichnen. Liegen mehrere Punkte in einer Pixel-Spalte, bringt Kantenglättung nichts
+                # mehr, dann wird die deutlich schnellere Variante ohne Kantenglättung verwendet
+                draw_lines = pygame.draw.aalines if len(pointlist) <= plot_width else pygame.draw.lines
+                draw_lines(
                     self.screen,
                     line_colors[i],
                     False,
@@ -652,22 +977,15 @@ class Visualizer:
 
 
 
-        for i, value_name in enumerate(value_dict.keys()):
+        for i, value_name in enumerate(value_names):
 
             y_pos = plot_y_origin + plot_height // 2 + self.font_small_height * i * 2 - self.font_small_height * (
-                            len(value_dict) // 2)
+                            len(value_names) // 2)
 
-            # Werte-Label in Legende malen
-            self.draw_text_new(
-                value_name,
-                graph_x_origin,
-                y_pos,
-                self.font_small,
-                line_colors[i],
-            )
+            # Aktuellen Wert unter dem Werte-Label der Legende malen
             if len(self.graphs[graph_name][value_name]) > 0:
                 self.draw_text_new(
-                    str(self.graphs[graph_name][value_name][-1]),
+                    str(self.graphs[graph_name][value_name].last_value),
                     graph_x_origin,
                     y_pos + self.font_small_height,
                     self.font_small,
@@ -678,10 +996,70 @@ class Visualizer:
 
 
 
+    def render_graph_static_surface(self, graph_name, value_names, line_colors, graph_width, graph_height):
+        """
+        Malt die Teile eines Graphen, die sich nicht ändern (Rahmen der Plotting-Area, Bezeichnung, Tick-Minimum und
+        die Werte-Labels der Legende), einmal auf eine eigene Fläche mit Hintergrundfarbe. Koordinaten wie in plot(),
+        aber relativ zum Ursprung des Graphen.
+        """
+        surface = pygame.Surface((graph_width, graph_height))
+        surface.fill(self.BACKGROUND_COLOR)
+
+        plot_x_origin = graph_width // 5
+        plot_y_origin = (graph_height // 5) // 2
+        plot_width = graph_width - graph_width // 5
+        plot_height = graph_height - graph_height // 5
+
+        pygame.draw.rect(
+            surface,
+            self.colors["dim gray"],
+            (plot_x_origin, plot_y_origin, plot_width, plot_height),
+            1,
+        )
+
+        # Graph-Bezeichnung einzeichnen
+        surface.blit(self.render_text(graph_name, self.font_medium, self.colors["black"]), (5, 5))
+
+        # Graphen-Tick-Minimum einzeichnen
+        surface.blit(self.render_text(str(0), self.font_small, self.colors["dim gray"]),
+                     (plot_x_origin, plot_y_origin + plot_height + 2))
+
+        # Werte-Labels der Legende malen
+        for i, value_name in enumerate(value_names):
+            y_pos = plot_y_origin + plot_height // 2 + self.font_small_height * i * 2 - self.font_small_height * (
+                            len(value_names) // 2)
+            surface.blit(self.render_text(value_name, self.font_small, tuple(line_colors[i])), (0, y_pos))
+
+        return surface
+
+    def reduce_to_pixel_columns(self, x_screen_positions, y_screen_positions):
+        """
+        Behält von mehreren Punkten in derselben Pixel-Spalte nur den obersten und den untersten (in zeitlicher
+        Reihenfolge). Die gezeichnete Linie deckt damit dieselben Pixel-Spalten von oben bis unten ab, die Anzahl der
+        Punkte hängt aber nur noch von der Breite des Plots ab. Die x-Positionen müssen aufsteigend sortiert sein.
+        """
+        if len(x_screen_positions) < 2 or (np.diff(x_screen_positions) > 0).all():
+            return x_screen_positions, y_screen_positions
+
+        column_starts = np.flatnonzero(np.r_[True, x_screen_positions[1:] != x_screen_positions[:-1]])
+        column_ends = np.r_[column_starts[1:], len(x_screen_positions)]
+
+        # Innerhalb jeder Spalte nach y sortieren: erster Punkt ist der oberste, letzter der unterste
+        order = np.lexsort((y_screen_positions, x_screen_positions))
+        top, bottom = order[column_starts], order[column_ends - 1]
+
+        indices = np.stack([np.minimum(top, bottom), np.maximum(top, bottom)], axis=1)
+        keep = np.ones(indices.shape, dtype=bool)
+        keep[:, 1] = indices[:, 1] != indices[:, 0]
+        indices = indices[keep]
+
+        return x_screen_positions[indices], y_screen_positions[indices]
+
     ####################################################################################################################
     # Controller-Funktionen
     ####################################################################################################################
 
+    @profiled_phase("controllers")
     def control(
             self,
             controller_name,
@@ -858,6 +1236,7 @@ class Visualizer:
                 "rect_slider": rect_slider,
                 "rect_slider_button": rect_slider_button,
                 "rect_controlling_window": rect_controlling_window,
+                "static_surface": None,     # wird mit der neuen Geometrie neu gemalt
             })
 
         ################################################################################################################
@@ -869,36 +1248,25 @@ class Visualizer:
         # Dict holen und zur besseren Lesbarkeit unter "d" abspeichern
         d = self.controllers[controller_name]
 
-        # Konstante Werte des Controllers holen
-        values_on_scale = d["values_on_scale"]
+        # Statische Teile des Controllers nur einmal auf eine eigene Fläche malen
+        if d.get("static_surface") is None:
+            d["static_surface"] = self.render_controller_static_surface(controller_name, attribute_min, attribute_max)
+
+        # Konstante Werte des Controllers holen, die jede Runde gebraucht werden
         increment = d["increment"]
         controller_width = d["controller_width"]
-        controller_height = d["controller_height"]
         controller_x_origin = d["controller_x_origin"]
-        controller_x_end = d["controller_x_end"]
         controller_y_origin = d["controller_y_origin"]
-        controller_y_end = d["controller_y_end"]
-        slider_height = d["slider_height"]
         slider_y_origin = d["slider_y_origin"]
         slider_y_end = d["slider_y_end"]
-        n_rows_above_slider = d["n_rows_above_slider"]
-        above_slider_height = d["above_slider_height"]
         above_slider_row_height = d["above_slider_row_height"]
-        n_rows_beneath_slider = d["n_rows_beneath_slider"]
-        beneath_slider_height = d["beneath_slider_height"]
-        beneath_slider_row_height = d["beneath_slider_row_height"]
         button_width = d["button_width"]
         button_height = d["button_height"]
         button_x_screen_pos = d["button_x_screen_pos"]
-        button_y_screen_pos = d["button_y_screen_pos"]
-        displayed_step_size = d["displayed_step_size"]
-        displayed_steps = d["displayed_steps"]
-        displayed_step_y_screen_positions = d["displayed_step_y_screen_positions"]
         rect_button_value_up = d["rect_button_value_up"]
         rect_button_value_down = d["rect_button_value_down"]
         rect_button_sweep_value_up = d["rect_button_sweep_value_up"]
         rect_button_sweep_value_down = d["rect_button_sweep_value_down"]
-        rect_controller = d["rect_controller"]
         rect_slider = d["rect_slider"]
         rect_controlling_window = d["rect_controlling_window"]
 
@@ -930,13 +1298,8 @@ class Visualizer:
         # malen
         ################################################################################################################
 
-        # Controller-Überschrift malen
-        self.draw_text_new(
-            controller_name,
-            controller_x_origin + controller_width // 10,
-            controller_y_origin,
-            self.font_medium,
-        )
+        # Statische Teile (Überschrift, Skala, Laufschiene, Umrandung, Knöpfe) übertragen
+        self.screen.blit(d["static_surface"], (controller_x_origin, controller_y_origin))
 
         # Aktuellen Wert über Controller malen
         self.draw_text_new(
@@ -956,61 +1319,6 @@ class Visualizer:
                 color_from_my_colors_dict="dark red"
             )
 
-        # Slider/Attribut-Minimum über Slider anzeigen
-        self.draw_text_new(
-            str(attribute_min),
-            controller_x_origin + controller_width // 10,
-            slider_y_origin - self.font_small_height - button_height // 2,
-            self.font_small,
-            "dim gray",
-        )
-
-        # Slider/Attribut-Maximum unter Slider anzeigen
-        self.draw_text_new(
-            str(attribute_max),
-            controller_x_origin + controller_width // 10,
-            slider_y_end + button_height // 2,
-            self.font_small,
-            "dim gray",
-        )
-
-        # Skalenschritte einzeichnen
-        for i, displayed_step_y_screen_pos in enumerate(displayed_step_y_screen_positions):
-            if i % 10 == 0:
-                pygame.draw.line(
-                    self.screen,
-                    self.colors["dim gray"],
-                    (controller_x_origin + controller_width // 10, displayed_step_y_screen_pos),
-                    (controller_x_origin + controller_width - controller_width // 10, displayed_step_y_screen_pos),
-                    1,
-                )
-            elif i % 5 == 0:
-                pygame.draw.line(
-                    self.screen,
-                    self.colors["dim gray"],
-                    (controller_x_origin + controller_width // 6, displayed_step_y_screen_pos),
-                    (controller_x_origin + controller_width - controller_width // 6, displayed_step_y_screen_pos),
-                    1,
-                )
-            else:
-                # Skalenlinien einzeichnen
-                pygame.draw.line(
-                    self.screen,
-                    self.colors["dim gray"],
-                    (controller_x_origin + controller_width // 5, displayed_step_y_screen_pos),
-                    (controller_x_origin + controller_width - controller_width // 5, displayed_step_y_screen_pos),
-                    1,
-                )
-
-        # Poti-Laufschiene malen
-        pygame.draw.line(
-            self.screen,
-            self.colors["black"],
-            (controller_x_origin + controller_width // 2, slider_y_origin),
-            (controller_x_origin + controller_width // 2, slider_y_end),
-            1,
-        )
-
         # Sweep-Value-Linie malen
         if self.controllers[controller_name]["sweep_value"]:
             pygame.draw.line(
@@ -1043,25 +1351,6 @@ class Visualizer:
             1,
             )
 
-        # Controller-Umrandung links malen
-        pygame.draw.line(
-            self.screen,
-            self.colors["dim gray"],
-            (controller_x_origin, controller_y_origin),
-            (controller_x_origin, controller_y_end),
-            1,
-        )
-
-        # Controller-Umrandung rechts malen
-        if self.controllers[controller_name]["controller_index"] == len(self.controllers) - 1:
-            pygame.draw.line(
-                self.screen,
-                self.colors["dim gray"],
-                (controller_x_end, controller_y_origin),
-                (controller_x_end, controller_y_end),
-                1,
-            )
-
         # Aktuellen Wert in Slider-Button malen
         self.draw_text_new(
             str(round(self.controllers[controller_name]["current_value"], 4)),
@@ -1071,42 +1360,6 @@ class Visualizer:
             "white",
         )
 
-        # Kleine Knöpfe unter Slider malen
-        pygame.draw.rect(self.screen, self.colors[self.CHANGE_VALUE_BUTTON_COLOR], rect_button_value_up)
-        pygame.draw.rect(self.screen, self.colors["black"], rect_button_value_up, 1)
-        self.draw_text_new(
-            "+1",
-            rect_button_value_up[0] + 4,
-            rect_button_value_up[1] + 3,
-            self.font_small,
-        )
-        pygame.draw.rect(self.screen, self.colors[self.CHANGE_VALUE_BUTTON_COLOR], rect_button_value_down)
-        pygame.draw.rect(self.screen, self.colors["black"], rect_button_value_down, 1)
-        self.draw_text_new(
-            "-1",
-            rect_button_value_down[0] + 4,
-            rect_button_value_down[1] + 3,
-            self.font_small,
-        )
-        pygame.draw.rect(self.screen, self.colors[self.CHANGE_VALUE_BUTTON_COLOR], rect_button_sweep_value_up)
-        pygame.draw.rect(self.screen, self.colors["black"], rect_button_sweep_value_up, 1)
-        self.draw_text_new(
-            "+1",
-            rect_button_sweep_value_up[0] + 4,
-            rect_button_sweep_value_up[1] + 3,
-            self.font_small,
-            "dark red",
-        )
-        pygame.draw.rect(self.screen, self.colors[self.CHANGE_VALUE_BUTTON_COLOR], rect_button_sweep_value_down)
-        pygame.draw.rect(self.screen, self.colors["black"], rect_button_sweep_value_down, 1)
-        self.draw_text_new(
-            "-1",
-            rect_button_sweep_value_down[0] + 4,
-            rect_button_sweep_value_down[1] + 3,
-            self.font_small,
-            "dark red",
-        )
-
         ################################################################################################################
         # User-Interaktionen (Controller-Window)
         ################################################################################################################
@@ -1288,6 +1541,116 @@ class Visualizer:
             # neuen Attribut-Wert dem kontrollierten Objekt übermitteln
             setattr(instance_or_class, attribute_name, self.controllers[controller_name]["current_value"])
 
+    def render_controller_static_surface(self, controller_name, attribute_min, attribute_max):
+        """
+        Malt die Teile eines Controllers, die sich nicht ändern (Überschrift, Minimum und Maximum, Skalenlinien,
+        Laufschiene, Umrandung und die kleinen Knöpfe), einmal auf eine eigene Fläche, die control() dann nur noch
+        überträgt. Die Fläche beginnt am Ursprung des Controllers und hat die Hintergrundfarbe.
+        """
+        d = self.controllers[controller_name]
+
+        controller_width = d["controller_width"]
+        controller_x_origin = d["controller_x_origin"]
+        controller_y_origin = d["controller_y_origin"]
+        controller_x_end = d["controller_x_end"]
+        controller_y_end = d["controller_y_end"]
+        slider_y_origin = d["slider_y_origin"]
+        slider_y_end = d["slider_y_end"]
+        button_height = d["button_height"]
+
+        # Der letzte Controller hat zusätzlich eine Umrandung rechts
+        is_last_controller = d["controller_index"] == len(self.controllers) - 1
+        surface = pygame.Surface((controller_width + is_last_controller, d["controller_height"] + 1))
+        surface.fill(self.BACKGROUND_COLOR)
+
+        def to_surface(x_screen_pos, y_screen_pos):
+            return x_screen_pos - controller_x_origin, y_screen_pos - controller_y_origin
+
+        def draw_text(text, x_screen_pos, y_screen_pos, font, color_from_my_colors_dict = "black"):
+            color = self.colors[color_from_my_colors_dict]
+            surface.blit(self.render_text(text, font, color), to_surface(x_screen_pos, y_screen_pos))
+
+        # Controller-Überschrift malen
+        draw_text(controller_name, controller_x_origin + controller_width // 10, controller_y_origin, self.font_medium)
+
+        # Slider/Attribut-Minimum über Slider anzeigen
+        draw_text(
+            str(attribute_min),
+            controller_x_origin + controller_width // 10,
+            slider_y_origin - self.font_small_height - button_height // 2,
+            self.font_small,
+            "dim gray",
+        )
+
+        # Slider/Attribut-Maximum unter Slider anzeigen
+        draw_text(
+            str(attribute_max),
+            controller_x_origin + controller_width // 10,
+            slider_y_end + button_height // 2,
+            self.font_small,
+            "dim gray",
+        )
+
+        # Skalenschritte einzeichnen: jede zehnte Linie am breitesten, jede fünfte mittel, die übrigen schmal
+        for i, displayed_step_y_screen_pos in enumerate(d["displayed_step_y_screen_positions"]):
+            if i % 10 == 0:
+                margin = controller_width // 10
+            elif i % 5 == 0:
+                margin = controller_width // 6
+            else:
+                margin = controller_width // 5
+
+            pygame.draw.line(
+                surface,
+                self.colors["dim gray"],
+                to_surface(controller_x_origin + margin, displayed_step_y_screen_pos),
+                to_surface(controller_x_origin + controller_width - margin, displayed_step_y_screen_pos),
+                1,
+            )
+
+        # Poti-Laufschiene malen
+        pygame.draw.line(
+            surface,
+            self.colors["black"],
+            to_surface(controller_x_origin + controller_width // 2, slider_y_origin),
+            to_surface(controller_x_origin + controller_width // 2, slider_y_end),
+            1,
+        )
+
+        # Controller-Umrandung links malen
+        pygame.draw.line(
+            surface,
+            self.colors["dim gray"],
+            to_surface(controller_x_origin, controller_y_origin),
+            to_surface(controller_x_origin, controller_y_end),
+            1,
+        )
+
+        # Controller-Umrandung rechts malen
+        if is_last_controller:
+            pygame.draw.line(
+                surface,
+                self.colors["dim gray"],
+                to_surface(controller_x_end, controller_y_origin),
+                to_surface(controller_x_end, controller_y_end),
+                1,
+            )
+
+        # Kleine Knöpfe unter Slider malen
+        for rect_name, label, color_name in (
+                ("rect_button_value_up", "+1", "black"),
+                ("rect_button_value_down", "-1", "black"),
+                ("rect_button_sweep_value_up", "+1", "dark red"),
+                ("rect_button_sweep_value_down", "-1", "dark red"),
+        ):
+            rect = d[rect_name]
+            rect_on_surface = to_surface(rect[0], rect[1]) + (rect[2], rect[3])
+            pygame.draw.rect(surface, self.colors[self.CHANGE_VALUE_BUTTON_COLOR], rect_on_surface)
+            pygame.draw.rect(surface, self.colors["black"], rect_on_surface, 1)
+            draw_text(label, rect[0] + 4, rect[1] + 3, self.font_small, color_name)
+
+        return surface
+
     ####################################################################################################################
     # Pygame-Hilfsfunktionen
     ####################################################################################################################
@@ -1316,6 +1679,23 @@ class Visualizer:
         )
         )
 
+    def render_text(self, text, font, color, antialias = True):
+        """
+        Gibt den Text als Surface zurück. Jede Kombination aus Text, Font und Farbe wird nur einmal gerendert.
+        Ist der Cache voll, fliegt der älteste Eintrag heraus (häufig wechselnde Texte wie aktuelle Werte verdrängen
+        so keine Beschriftungen, die in jedem Frame gebraucht und dabei wieder nach hinten sortiert werden).
+        """
+        key = (text, font, color, antialias)
+        text_surface = self.text_surfaces.pop(key, None)
+
+        if text_surface is None:
+            text_surface = font.render(text, antialias, color)
+            if len(self.text_surfaces) >= self.TEXT_CACHE_SIZE:
+                del self.text_surfaces[next(iter(self.text_surfaces))]
+
+        self.text_surfaces[key] = text_surface
+        return text_surface
+
     def draw_text(
             self,
             text,
@@ -1323,7 +1703,7 @@ class Visualizer:
             y_screen_pos,
             color_from_my_colors_dict = "black",
     ):
-        text = self.font1.render(text, False, self.colors[color_from_my_colors_dict])
+        text = self.render_text(text, self.font1, self.colors[color_from_my_colors_dict], antialias = False)
         self.screen.blit(text, (x_screen_pos, y_screen_pos))
 
     def draw_text_new(
@@ -1337,9 +1717,9 @@ class Visualizer:
         if type(color_from_my_colors_dict) == str:
             color = self.colors[color_from_my_colors_dict]
         else:
-            color = color_from_my_colors_dict
+            color = tuple(color_from_my_colors_dict)
 
-        text_surface = font.render(text, True, color)
+        text_surface = self.render_text(text, font, color)
         #text_rect = text_surface.get_rect()
         self.screen.blit(text_surface, (x_screen_pos, y_screen_pos))
 
@@ -1347,66 +1727,161 @@ class Visualizer:
     # Update
     ####################################################################################################################
 
+    def request_full_redraw(self):
+        """ Beim nächsten update_screen() alles neu malen, z.B. nachdem sich das Layout geändert hat """
+        self.full_redraw_needed = True
+        self.previous_frame_items = None
+        self.previous_grid_colors = None
+
+    def draw_changed_items(self):
+        """
+        Malt beim inkrementellen Neuzeichnen die Agenten des aktuellen Frames. Neu gemalt werden nur Rechtecke, in denen
+        sich ein Agent verändert hat (neu, verschwunden, bewegt oder umgefärbt) oder das Grid-Array neu übertragen wurde.
+        In jedem solchen Rechteck wird der Hintergrund wiederhergestellt und alle Agenten, die es berühren, werden in
+        ihrer ursprünglichen Reihenfolge neu gemalt (nur innerhalb des Rechtecks, damit Überlappungen stimmen).
+        """
+        items = self.frame_items
+
+        if self.previous_frame_items is None:
+            changed_rects = [self.simulation_window_rect.copy()]
+        else:
+            changed_items = set(items).symmetric_difference(self.previous_frame_items)
+            changed_rects = [pygame.Rect(rect).inflate(2, 2) for rect, color, outline_color in changed_items]
+            if len(changed_rects) > self.MAX_DIRTY_RECTS:
+                changed_rects = [self.simulation_window_rect.copy()]
+
+        # Vom Grid-Array übertragene Zellen: Agenten darauf wurden übermalt
+        redraw_rects = changed_rects + [rect for rect in self.dirty_rects if rect.colliderect(self.simulation_window_rect)]
+
+        item_rects = [pygame.Rect(rect) for rect, color, outline_color in items]
+
+        for redraw_rect in redraw_rects:
+            self.screen.set_clip(redraw_rect)
+            self.restore_simulation_background(redraw_rect)
+            for i in redraw_rect.collidelistall(item_rects):
+                self.draw_item(items[i])
+        self.screen.set_clip(None)
+
+        self.dirty_rects.extend(changed_rects)
+        self.previous_frame_items = items
+        self.frame_items = []
+
+    def start_frame_export(self, path, every_k_ticks = 1, frame_format = "png", queue_size = 64):
+        """
+        FUNCTION
+        Speichert ab jetzt bei jedem k-ten update_screen() den gesamten Bildschirm, z.B. um daraus ein Video zu machen.
+        Kodiert und geschrieben wird in einem Hintergrund-Thread (siehe FrameWriter.py), update_screen() kopiert nur die
+        Pixel. Kommt der Thread nicht hinterher, wartet update_screen(), bis queue_size Frames abgearbeitet sind.
+
+        INPUT
+        path:          Verzeichnis für die PNG-Dateien bzw. Datei des Frame-Archivs
+        every_k_ticks: nur jeden k-ten Tick speichern
+        frame_format:  "png" (eine Datei pro Frame) oder "archive" (komprimierte ZIP-Datei, siehe read_frame_archive())
+        queue_size:    Anzahl der Frames, die auf das Schreiben warten dürfen
+        """
+        self.stop_frame_export()
+        self.frame_writer = FrameWriter(path, frame_format, queue_size)
+        self.export_every_k_ticks = max(int(every_k_ticks), 1)
+
+    def stop_frame_export(self):
+        """ Wartet, bis alle Frames geschrieben sind, und beendet den Frame-Export """
+        if self.frame_writer is not None:
+            frame_writer = self.frame_writer
+            self.frame_writer = None
+            frame_writer.close()
+
+    def export_frame(self, tick):
+        if self.frame_writer is not None and tick % self.export_every_k_ticks == 0:
+            self.frame_writer.submit(tick, pygame.image.tobytes(self.screen, "RGB"), self.screen.get_size())
+
     def update_screen(self):
 
         self.update_pygame_events()
 
-        ################################################################################################################
-        # Solange Maus im Controlling-Window ist
+        self.wait_while_paused()
+
+        self.present_frame()
 
-        mouse_in_controlling_window = self.is_mouse_in_controlling_window()
+        # Ohne Fenster so schnell wie möglich
+        if not self.offscreen:
+            with self.profiler.phase("frame rate limit"):
+                self.clock.tick(self.display_speed)
 
-        while mouse_in_controlling_window or self.display_speed <= 0:
+        self.profiler.end_tick()
+        self.ticks_per_second = self.profiler.ticks_per_second
 
-            # Pygame-Events checken
-            self.update_pygame_events()
-            mouse_in_controlling_window = self.is_mouse_in_controlling_window()
+    def is_paused(self):
+        return self.is_mouse_in_controlling_window() or self.display_speed <= 0
 
+    @profiled_phase("pause")
+    def wait_while_paused(self):
+        """
+        Solange die Maus im Controlling-Window ist (oder display_speed <= 0), werden nur die Controller bedient.
+        Dabei wird blockierend auf Pygame-Events gewartet und nur nach einer Eingabe neu gemalt, eine pausierte
+        Simulation braucht so kaum Rechenzeit.
+        """
 
+        # Ohne Fenster kann niemand die Pause beenden
+        if self.offscreen or not self.is_paused():
+            return
 
-            # Controlling-Window füllen
-            self.screen.fill(
-                self.BACKGROUND_COLOR,
-                (self.controlling_window_x_origin - self.screen_gap,
-                 0,
-                 self.controlling_window_width + self.screen_gap * 2,
-                 self.screen_height,
-                 )
-            )
+        # Klicks, die control() in diesem Tick schon verarbeitet hat, verwerfen
+        self.update_pygame_events()
+        self.draw_pause_screen()
 
-            # Controller aktualisieren/malen (obwohl alles außer dem Controller-Window still steht)
-            for controller_name in self.controllers:
-                self.control(
-                    controller_name,
-                    self.controllers[controller_name]["controlled_object"],
-                    self.controllers[controller_name]["attribute_name"],
-                    self.controllers[controller_name]["attribute_min"],
-                    self.controllers[controller_name]["attribute_max"],
-                )
+        while self.is_paused():
+            event = pygame.event.wait(self.PAUSE_EVENT_TIMEOUT)
 
-            self.draw_text_new(
-                "PAUSE",
-                self.simulation_window_x_origin + self.simulation_window_width // 2,
-                0 + self.screen_gap // 4,
-                self.font_medium,
+            # Keine Eingabe, nichts neu zu malen
+            if event.type == pygame.NOEVENT:
+                continue
+
+            self.update_pygame_events([event] + pygame.event.get())
+            self.draw_pause_screen()
+
+    def draw_pause_screen(self):
+
+        # Controlling-Window füllen
+        self.screen.fill(
+            self.BACKGROUND_COLOR,
+            (self.controlling_window_x_origin - self.screen_gap,
+             0,
+             self.controlling_window_width + self.screen_gap * 2,
+             self.screen_height,
+             )
+        )
+
+        # Controller aktualisieren/malen (obwohl alles außer dem Controller-Window still steht)
+        for controller_name in self.controllers:
+            self.control(
+                controller_name,
+                self.controllers[controller_name]["controlled_object"],
+                self.controllers[controller_name]["attribute_name"],
+                self.controllers[controller_name]["attribute_min"],
+                self.controllers[controller_name]["attribute_max"],
             )
 
-            # Tick-darstellen
-            self.draw_text_new(
-            "tick: " + str(self.tick),
-            self.simulation_window_x_origin,
+        self.draw_text_new(
+            "PAUSE",
+            self.simulation_window_x_origin + self.simulation_window_width // 2,
             0 + self.screen_gap // 4,
             self.font_medium,
-            )
-
-            # Screen aktualisieren
-            pygame.display.flip()
-            self.clock.tick(10000)
+        )
 
+        # Tick-darstellen
+        self.draw_text_new(
+        "tick: " + str(self.tick),
+        self.simulation_window_x_origin,
+        0 + self.screen_gap // 4,
+        self.font_medium,
+        )
 
-        ################################################################################################################
-        # Wenn Maus außerhalb des Controller-Windows ist
+        # Screen aktualisieren
+        pygame.display.flip()
 
+    @profiled_phase("display")
+    def present_frame(self):
+        """ Bringt den fertig gemalten Frame auf den Bildschirm und leert ihn für den nächsten Tick """
 
         # Tick-darstellen
         self.draw_text_new(
@@ -1416,13 +1891,50 @@ class Visualizer:
             self.font_medium,
         )
 
+        if self.show_profiler:
+            self.draw_profiler_overlay()
+
         # Tick aktualisieren
         self.tick += 1
 
-        # Screen aktualisieren
-        pygame.display.flip()
+        if self.incremental_redraw:
+            self.draw_changed_items()
+            self.export_frame(self.tick - 1)
 
-        # Gesamtes Fenster füllen
-        self.screen.fill(self.BACKGROUND_COLOR)
+            # Screen aktualisieren: ganz beim ersten Frame und nach Layout-Änderungen, sonst nur geänderte Rechtecke
+            if self.full_redraw_needed:
+                pygame.display.flip()
+                self.full_redraw_needed = False
+            else:
+                pygame.display.update(self.dirty_rects + self.panel_rects)
+            self.dirty_rects = []
+            self.grid_array_drawn = False
+
+            # Nur außerhalb des Grids füllen, das Grid bleibt für den nächsten Frame stehen
+            for panel_rect in self.panel_rects:
+                self.screen.fill(self.BACKGROUND_COLOR, panel_rect)
 
-        self.clock.tick(self.display_speed)
\ No newline at end of file
+        else:
+            self.export_frame(self.tick - 1)
+
+            # Screen aktualisieren
+            pygame.display.flip()
+
+            # Gesamtes Fenster füllen
+            self.screen.fill(self.BACKGROUND_COLOR)
+            self.dirty_rects = []
+            self.grid_array_drawn = False
+
+    def draw_profiler_overlay(self):
+        """ Zeigt unter dem Grid die Tick-Rate und die Zeit pro Abschnitt eines Ticks (siehe TickProfiler.py) """
+        now = time.perf_counter()
+        if now - self.profiler_overlay_time >= self.PROFILER_OVERLAY_INTERVAL:
+            self.profiler_overlay_text = self.profiler.get_summary_text()
+            self.profiler_overlay_time = now
+
+        self.draw_text_new(
+            self.profiler_overlay_text,
+            self.plotting_window_x_origin,
+            self.screen_height - self.screen_gap * 3 // 4,
+            self.font_medium,
+        )
@@ -1,8 +1,81 @@
 from Helper import *
 from World import *
-from Visualizer import *
 from Agent import *
 from Cell import *
+from Population import *
+from Scheduler import *
+from Recorder import *
+from Checkpoint import *
+from SpatialIndex import *
+from TickProfiler import *
+
+import numpy as np
+
+
+# Platzhalter in den Nachbarschaftstabellen für Positionen außerhalb des Grids
+NO_NEIGHBOR = -1
+
+
+class FreeCellIndex:
+    """
+    Index über alle freien (unbewohnten) Zellen eines Grids.
+    Die Zellen werden über ihren flachen Index (y * len_x_grid_dim + x) verwaltet.
+
+    Die freien Indizes liegen dicht gepackt am Anfang von self.cells, self.positions merkt sich für jeden
+    Zellen-Index, an welcher Stelle er in self.cells steht (-1, wenn die Zelle nicht frei ist).
+    Dadurch sind Einfügen, Entfernen, Zählen und das zufällige Ziehen einer freien Zelle O(1).
+    """
+
+    def __init__(self, n_cells):
+        self.cells = np.arange(n_cells, dtype=np.int64)      # Flache Zellen-Indizes, die ersten n_free sind frei
+        self.positions = np.arange(n_cells, dtype=np.int64)  # Position jedes Zellen-Index in self.cells
+        self.n_free = n_cells                                # Zu Beginn sind alle Zellen frei
+
+    def __len__(self):
+        return self.n_free
+
+    def __contains__(self, flat_index):
+        return self.positions[flat_index] >= 0
+
+    def add(self, flat_index):
+        """ Zelle als frei markieren """
+        if self.positions[flat_index] >= 0:
+            return
+
+        self.cells[self.n_free] = flat_index
+        self.positions[flat_index] = self.n_free
+        self.n_free += 1
+
+    def remove(self, flat_index):
+        """ Zelle als belegt markieren (Swap-Remove mit dem letzten freien Eintrag) """
+        position = self.positions[flat_index]
+        if position < 0:
+            return
+
+        last_position = self.n_free - 1
+        last_flat_index = self.cells[last_position]
+
+        self.cells[position] = last_flat_index
+        self.positions[last_flat_index] = position
+
+        self.cells[last_position] = flat_index
+        self.positions[flat_index] = -1
+        self.n_free -= 1
+
+    def random_choice(self):
+        """ Gibt den Index einer zufälligen freien Zelle zurück (gleichverteilt) """
+        if self.n_free == 0:
+            raise IndexError("Cannot choose from an empty set of free cells")
+        return int(self.cells[random.randrange(self.n_free)])
+
+    def sample(self, n):
+        """ Gibt die Indizes von n verschiedenen, zufälligen freien Zellen zurück """
+        return [int(self.cells[position]) for position in random.sample(range(self.n_free), n)]
+
+    def as_array(self):
+        """ Alle freien Zellen-Indizes in Grid-Reihenfolge """
+        return np.sort(self.cells[:self.n_free])
+
 
 class World:
     """
@@ -29,9 +102,42 @@ class World:
         self.SW_grid_as_flat_list = []
         self.SE_grid_as_flat_list = []
 
+        self.free_cells = FreeCellIndex(0)  # Index der unbewohnten Zellen, wird von den Agenten aktuell gehalten
+
+        # Zellen-Attribute als 2-D-Arrays (Form: len_y_grid_dim x len_x_grid_dim)
+        self.cell_arrays = {}
+
+        # Vom Nutzer deklarierte Zellen-Attribute: {Name: (dtype, Standardwert)}
+        self.cell_attribute_declarations = {}
+
+        self.cell_class = Cell
+
+        # Vorberechnete Nachbarschaftstabellen: {(relative Nachbarpositionen, torus): Array (n_cells, k)}
+        self.neighbor_tables = {}
+
+        # Zuletzt mit set_neighbor_cells() gesetzte Nachbarschaft (rel_pos_neighbors, torus), z.B. für Checkpoints
+        self.neighbor_cells_key = None
+
+        # Wird bei jedem Ein- und Auszug erhöht, damit zwischengespeicherte Agenten-Positionen erneuert werden können
+        self.occupancy_version = 0
+        self.agent_cell_indices_cache = {}
+
         self.agents = {}
 
-        self.heaven = []
+        # Aktivierungsreihenfolge pro Population (siehe Scheduler.py), Standard ist sequentiell
+        self.schedulers = {}
+
+        # Datenrekorder für Agenten-Attribute (siehe Recorder.py)
+        self.recorder = Recorder()
+
+        # Zeitmessung pro Abschnitt eines Ticks (siehe TickProfiler.py), standardmäßig aus
+        self.profiler = TickProfiler(enabled=False)
+
+        # Gestorbene Agenten, je nach Policy aufbewahrt, nur gezählt oder wiederverwendet (siehe Population.py)
+        self.heaven = Heaven()
+
+        # Räumlicher Index für Umkreissuchen (siehe SpatialIndex.py), wird mit create_spatial_index() angelegt
+        self.spatial_index = None
 
 
 
@@ -40,6 +146,18 @@ class World:
         self.grid_as_matrix = []
         self.grid_as_flat_list = []
 
+        self.cell_class = Cell if cell_class == "standard" else cell_class
+
+        # Array-Speicher für die Zellen-Attribute anlegen
+        grid_shape = (self.len_y_grid_dim, self.len_x_grid_dim)
+        self.cell_arrays = {
+            "walkable": np.ones(grid_shape, dtype=bool),
+            "main_resident": np.full(grid_shape, -1, dtype=np.int64),   # ID (Agent.name) des Hauptbewohners
+            "n_residents": np.zeros(grid_shape, dtype=np.int32),
+        }
+        for attribute_name, (dtype, default) in self.cell_attribute_declarations.items():
+            self.cell_arrays[attribute_name] = np.full(grid_shape, default, dtype=dtype)
+
         for y in range(self.len_y_grid_dim):
             row = []
 
@@ -50,6 +168,8 @@ class World:
                 else:
                     cell = cell_class(x, y) # Jede Zellenklasse muss als erste Eingabeparameter die X- und Y-Position haben
 
+                cell.connect_to_world(self)   # Zelle kennt ihre Welt und schreibt ihre Attribute in deren Arrays
+
                 row.append(cell)
 
                 self.grid_as_flat_list.append(cell)
@@ -69,31 +189,195 @@ class World:
 
             self.grid_as_matrix.append(row)
 
+        self.free_cells = FreeCellIndex(len(self.grid_as_flat_list))
+        self.neighbor_tables = {}
+
+    def get_flat_index(self, cell):
+        """ Position einer Zelle in grid_as_flat_list """
+        return cell.y_grid_pos * self.len_x_grid_dim + cell.x_grid_pos
+
+    def get_neighbor_table(self, rel_pos_neighbors = "neumann", torus = True):
+        """
+        FUNCTION
+        Gibt für jede Zelle die flachen Indizes (y * len_x_grid_dim + x) ihrer Nachbarzellen zurück.
+        Die Tabelle wird pro Nachbarschaft und Topologie nur einmal (vektorisiert) berechnet und dann gecacht.
+
+        INPUT
+        rel_pos_neighbors: "neumann", "moore" oder eine Liste relativer Positionen (X-Abweichung, Y-Abweichung)
+        torus:             Gibt an, ob es sich beim Grid um ein Torus handelt
+
+        OUTPUT
+        Int-Array der Form (n_cells, k). Die Spalten folgen der Reihenfolge von rel_pos_neighbors.
+        Positionen außerhalb des Grids (nur ohne Torus) sind mit NO_NEIGHBOR (-1) markiert.
+        """
+        rel_pos_neighbors = get_rel_pos_neighbors(rel_pos_neighbors)
+        key = (rel_pos_neighbors, torus)
+
+        if key not in self.neighbor_tables:
+            x_grid_positions = np.tile(np.arange(self.len_x_grid_dim), self.len_y_grid_dim)
+            y_grid_positions = np.repeat(np.arange(self.len_y_grid_dim), self.len_x_grid_dim)
+
+            table = np.empty((len(x_grid_positions), len(rel_pos_neighbors)), dtype=np.int64)
+
+            for i, (rel_x, rel_y) in enumerate(rel_pos_neighbors):
+                target_x = x_grid_positions + rel_x
+                target_y = y_grid_positions + rel_y
+
+                if torus:
+                    table[:, i] = (target_y % self.len_y_grid_dim) * self.len_x_grid_dim + (target_x % self.len_x_grid_dim)
+                else:
+                    on_grid = ((target_x >= 0) & (target_x < self.len_x_grid_dim)
+                               & (target_y >= 0) & (target_y < self.len_y_grid_dim))
+                    table[:, i] = np.where(on_grid, target_y * self.len_x_grid_dim + target_x, NO_NEIGHBOR)
+
+            self.neighbor_tables[key] = table
+
+        return self.neighbor_tables[key]
+
+    @profiled_phase("neighbor updates")
+    def set_neighbor_cells(self, rel_pos_neighbors = "neumann", torus = True):
+        """
+        Setzt cell.neighbor_cells für alle Zellen des Grids auf einmal anhand der Nachbarschaftstabelle.
+        Entspricht cell.find_arounding_cells() für jede Zelle (Positionen außerhalb des Grids sind None).
+        """
+        self.neighbor_cells_key = (rel_pos_neighbors, torus)
+
+        flat_list = self.grid_as_flat_list + [None]   # Index -1 (NO_NEIGHBOR) zeigt damit auf None
+
+        for cell, neighbor_indices in zip(self.grid_as_flat_list,
+                                          self.get_neighbor_table(rel_pos_neighbors, torus).tolist()):
+            cell.neighbor_cells = [flat_list[i] for i in neighbor_indices]
+
+    @profiled_phase("neighbor updates")
+    def gather_neighbor_values(self, values, rel_pos_neighbors = "neumann", torus = True, fill_value = 0):
+        """
+        FUNCTION
+        Sammelt für jede Zelle die Werte ihrer Nachbarzellen mit einer einzigen Indizierungs-Operation.
+
+        INPUT
+        values:     Werte pro Zelle, entweder als 2-D-Array (z.B. aus World.cell_arrays) oder flach
+        fill_value: Wert für Nachbarpositionen außerhalb des Grids
+
+        OUTPUT
+        Array der Form (n_cells, k)
+        """
+        values = np.asarray(values).reshape(-1)
+        padded_values = np.append(values, np.array(fill_value, dtype=values.dtype))  # NO_NEIGHBOR (-1) liest fill_value
+
+        return padded_values[self.get_neighbor_table(rel_pos_neighbors, torus)]
+
+    def declare_cell_attribute(self, attribute_name, dtype = float, default = 0):
+        """
+        FUNCTION
+        Legt ein zusätzliches Zellen-Attribut als 2-D-Array an. Über die Zellen bleibt es wie gewohnt
+        als cell.<attribute_name> les- und schreibbar, auf das gesamte Grid kann über
+        World.cell_arrays[attribute_name] vektorisiert zugegriffen werden.
+
+        INPUT
+        attribute_name: Name des Attributs
+        dtype:          NumPy-Datentyp des Arrays
+        default:        Startwert aller Zellen
+        """
+        self.cell_attribute_declarations[attribute_name] = (dtype, default)
+
+        # Deskriptor in der Zellenklasse hinterlegen, falls das Attribut dort noch nicht als Array-Attribut existiert
+        if not isinstance(getattr(self.cell_class, attribute_name, None), GridArrayAttribute):
+            setattr(self.cell_class, attribute_name, GridArrayAttribute(attribute_name, default))
+
+        # Gibt es schon ein Grid, dann das Array sofort anlegen und bisherige Zellenwerte übernehmen
+        if self.grid_as_flat_list:
+            self.cell_arrays[attribute_name] = np.full(
+                (self.len_y_grid_dim, self.len_x_grid_dim), default, dtype=dtype)
+
+            for cell in self.grid_as_flat_list:
+                value = cell.pop_local_value(attribute_name)
+                if value is not NO_VALUE:
+                    setattr(cell, attribute_name, value)
+
+    def update_occupancy(self, cell):
+        """
+        Gleicht die Bewohnerzahl im Array und den Freie-Zellen-Index mit den aktuellen Bewohnern einer Zelle ab.
+        Wird von Agent.move_in() und Agent.move_out() aufgerufen.
+        """
+        n_residents = cell.count_residents()
+        self.cell_arrays["n_residents"][cell.y_grid_pos, cell.x_grid_pos] = n_residents
+        self.occupancy_version += 1
+
+        if n_residents == 0:
+            self.free_cells.add(self.get_flat_index(cell))
+        else:
+            self.free_cells.remove(self.get_flat_index(cell))
+
+    def get_cell_indices_of_agents(self, population):
+        """
+        Gibt für jeden Agenten einer Population (in Slot-Reihenfolge) den flachen Index seiner Zelle zurück
+        (-1, wenn der Agent auf keiner Zelle dieser World wohnt).
+        Das Ergebnis wird zwischengespeichert, solange niemand ein- oder auszieht.
+        """
+        key = id(population)
+        cached = self.agent_cell_indices_cache.get(key)
+
+        if cached is None or cached[0] != self.occupancy_version or len(cached[1]) != len(population):
+            cell_indices = np.fromiter(
+                (self.get_flat_index(agent.residence_cell)
+                 if getattr(agent.residence_cell, "world", None) is self else -1
+                 for agent in population),
+                dtype=np.int64,
+                count=len(population),
+            )
+            cached = (self.occupancy_version, cell_indices)
+            self.agent_cell_indices_cache[key] = cached
+
+        return cached[1]
+
+    def get_resident_slots(self, population):
+        """
+        Gibt für jede Zelle (flach) den Slot ihres Bewohners aus der Population zurück (-1 = kein Bewohner
+        aus dieser Population). Wohnen mehrere Agenten der Population auf einer Zelle, gewinnt der letzte Slot.
+        """
+        cell_indices = self.get_cell_indices_of_agents(population)
+        on_grid = cell_indices >= 0
+
+        resident_slots = np.full(self.len_x_grid_dim * self.len_y_grid_dim, -1, dtype=np.int64)
+        resident_slots[cell_indices[on_grid]] = np.flatnonzero(on_grid)
+
+        return resident_slots
+
     # returns a list of empty cells in own grid
     def get_empty_cells(self):
-        
-        empty_cells = [cell 
-                       for cell in self.grid_as_flat_list 
-                       if len(cell.dict_of_residents) == 0]
-        
+
+        empty_cells = [self.grid_as_flat_list[i] for i in self.free_cells.as_array()]
+
         return empty_cells
 
+    def count_empty_cells(self):
+        """ Anzahl der unbewohnten Zellen in O(1) """
+        return len(self.free_cells)
+
+    def get_random_empty_cell(self):
+        """ Eine zufällige unbewohnte Zelle in O(1) """
+        return self.grid_as_flat_list[self.free_cells.random_choice()]
+
+    def get_random_empty_cells(self, n):
+        """ n verschiedene, zufällige unbewohnte Zellen """
+        return [self.grid_as_flat_list[i] for i in self.free_cells.sample(n)]
+
     def place_agents_on_grid(
             self,
             population,
             rule = "random_on_empty_cells",
     ):
         # Das Grid muss groß genug für die Population sein
-        print(len(self.grid_as_flat_list))
-        print(len(population))
         assert len(self.grid_as_flat_list) >= len(population)
 
         if rule == "random_on_empty_cells":
 
-            assert len(self.get_empty_cells()) >= len(population)
+            assert self.count_empty_cells() >= len(population)
+
+            # Alle Zielzellen auf einmal ziehen, statt für jeden Agenten alle freien Zellen zu suchen
+            new_residence_cells = self.get_random_empty_cells(len(population))
 
-            for agent in population:
-                new_residence_cell = random.choice(self.get_empty_cells())
+            for agent, new_residence_cell in zip(population, new_residence_cells):
                 #agent.move_out()
                 agent.move_in(new_residence_cell)
 
@@ -107,12 +391,185 @@ class World:
         agent_class,
         number_of_agents,
         overwrite = True,
+        attributes = None,
+        ordered = True,
         ):
+        """
+        Erstellt eine Population aus number_of_agents Agenten der Klasse agent_class.
+        Die in attributes deklarierten Agenten-Attribute ({Name: dtype} oder {Name: (dtype, Standardwert)})
+        werden spaltenweise in der Population gespeichert (siehe Population.py).
+        Gestorbene Agenten werden wie aus einer Liste entfernt (O(N)), die Reihenfolge der Population bleibt erhalten.
+        Mit ordered = False rückt stattdessen der letzte Agent in die Lücke (O(1)), die Reihenfolge ändert sich dabei.
+        """
 
-        if overwrite:
-            self.agents.update({population_name: []})
+        if overwrite or population_name not in self.agents:
+            self.agents.update({population_name: Population(attributes, capacity = number_of_agents, ordered = ordered)})
 
         for i in range(number_of_agents):
             agent = agent_class()
             agent.population = self.agents[population_name]
             self.agents[population_name].append(agent)
+
+    def set_heaven_policy(self, policy):
+        """ Legt fest, ob gestorbene Agenten aufbewahrt ("keep"), nur gezählt ("count") oder wiederverwendet ("recycle") werden """
+        self.heaven.set_policy(policy)
+
+    @staticmethod
+    def get_agent_class(population):
+        """ Klasse der Agenten einer Population: die des ersten Agenten, bei leerer Population die einzige bekannte """
+        if len(population) > 0:
+            return type(population[0])
+
+        agent_classes = getattr(population, "agent_classes", ())
+        if len(agent_classes) == 1:
+            return next(iter(agent_classes))
+
+        raise ValueError("The population is empty and has no unique agent class, pass agent_class")
+
+    def kill_agents(self, agents):
+        """
+        FUNCTION
+        Lässt mehrere Agenten auf einmal sterben: Sie ziehen aus ihren Zellen aus, werden aus ihren Populationen
+        entfernt (pro Population in einem Durchgang) und kommen in den Himmel. Agenten, die nicht (mehr) in ihrer
+        Population sind, z.B. schon gestorbene, werden übersprungen, ebenso doppelt übergebene.
+        """
+        killed_agents = {}
+        agents_per_population = {}
+
+        for agent in agents:
+            if id(agent) in killed_agents or agent not in agent.population:
+                continue
+            killed_agents[id(agent)] = agent
+
+            if isinstance(agent.residence_cell, CellBase):
+                agent.move_out()
+            agents_per_population.setdefault(id(agent.population), (agent.population, []))[1].append(agent)
+
+        for population, dying_agents in agents_per_population.values():
+            if hasattr(population, "remove_agents"):
+                population.remove_agents(dying_agents)
+            else:
+                dying_agent_ids = {id(agent) for agent in dying_agents}
+                population[:] = [agent for agent in population if id(agent) not in dying_agent_ids]
+
+        self.heaven.extend(killed_agents.values())
+
+    def spawn_agents(
+        self,
+        population_name,
+        number_of_agents,
+        agent_class = None,
+        cells = None,
+        place_on_grid = True,
+        attributes = None,
+        agent_args = (),
+        agent_kwargs = None,
+        ):
+        """
+        FUNCTION
+        Lässt mehrere Agenten auf einmal geboren werden. Bei der Heaven-Policy "recycle" werden gestorbene Agenten
+        derselben Klasse wiederverwendet (ihr Zustand wird gelöscht und __init__() mit denselben Argumenten wie bei
+        neuen Agenten erneut aufgerufen).
+
+        INPUT
+        population_name:  Population, in die die Agenten aufgenommen werden
+        number_of_agents: Anzahl der neuen Agenten
+        agent_class:      Klasse der neuen Agenten (Standard: Klasse des ersten Agenten der Population bzw. die einzige
+                          Klasse, die je in der Population war; bei mehreren Klassen muss sie angegeben werden)
+        cells:            Zellen, auf die die Agenten ziehen (Standard: zufällige unbewohnte Zellen)
+        place_on_grid:    Agenten auf dem Grid platzieren
+        attributes:       Startwerte {Name: Wert} oder {Name: Liste mit einem Wert pro Agent}
+        agent_args:       Positionsargumente für agent_class.__init__()
+        agent_kwargs:     Schlüsselwortargumente für agent_class.__init__()
+
+        OUTPUT
+        Liste der neuen Agenten
+        """
+        population = self.agents[population_name]
+
+        if agent_class is None:
+            agent_class = self.get_agent_class(population)
+        agent_kwargs = agent_kwargs or {}
+
+        if place_on_grid and cells is None:
+            cells = self.get_random_empty_cells(number_of_agents)
+
+        new_agents = []
+
+        for i in range(number_of_agents):
+            agent = self.heaven.take_agent(agent_class)
+
+            if agent is None:
+                agent = agent_class(*agent_args, **agent_kwargs)
+            else:
+                agent.get_local_values().clear()
+                agent.__init__(*agent_args, **agent_kwargs)
+
+            agent.population = population
+            population.append(agent)
+            new_agents.append(agent)
+
+        for attribute_name, values in (attributes or {}).items():
+            if not isinstance(values, (list, tuple, np.ndarray)):
+                values = [values] * number_of_agents
+            for agent, value in zip(new_agents, values):
+                setattr(agent, attribute_name, value)
+
+        if place_on_grid:
+            for agent, cell in zip(new_agents, cells):
+                agent.move_in(cell)
+
+        return new_agents
+
+    def set_scheduler(self, population_name, scheduler = "sequential", buffered_attributes = None):
+        """
+        Legt fest, wie die Agenten einer Population aktiviert werden:
+        "sequential", "random", "synchronous" (mit buffered_attributes) oder eine eigene Scheduler-Instanz.
+        """
+        self.schedulers[population_name] = create_scheduler(scheduler, buffered_attributes)
+
+    @profiled_phase("model step")
+    def activate_agents(self, population_name, step_function):
+        """ Ruft step_function(agent) für alle Agenten der Population gemäß ihres Schedulers auf """
+        scheduler = self.schedulers.setdefault(population_name, SequentialScheduler())
+        scheduler.activate(self.agents[population_name], step_function)
+
+    @profiled_phase("recorder")
+    def record(self, tick):
+        """ Erhebt alle im Rekorder registrierten Attribute für diesen Tick """
+        self.recorder.record(tick)
+
+    def create_spatial_index(self, bucket_size = 4, torus = True):
+        """
+        FUNCTION
+        Legt einen räumlichen Index für alle Agenten auf dem Grid an. Danach wird er von Agent.move_in() und
+        Agent.move_out() aktuell gehalten.
+
+        INPUT
+        bucket_size: Kantenlänge der Eimer in Zellen (etwa der typische Suchradius)
+        torus:       Gibt an, ob Abstände über die Ränder des Grids hinweg gemessen werden
+
+        OUTPUT
+        Der SpatialIndex (auch unter self.spatial_index)
+        """
+        self.spatial_index = SpatialIndex(self.len_x_grid_dim, self.len_y_grid_dim, bucket_size, torus)
+
+        for cell in self.grid_as_flat_list:
+            for agent in cell.dict_of_residents.values():
+                self.spatial_index.insert(agent)
+
+        return self.spatial_index
+
+    def get_agents_in_radius(self, x_grid_pos, y_grid_pos, radius, population_name = None):
+        """ Alle Agenten (optional nur einer Population), deren Abstand zur Position höchstens radius ist """
+        population = None if population_name is None else self.agents[population_name]
+        return self.spatial_index.query_radius(x_grid_pos, y_grid_pos, radius, population)
+
+    def save_checkpoint(self, path):
+        """ Speichert den Zustand der World inklusive der Zufallsgeneratoren (siehe Checkpoint.py) """
+        save_world_checkpoint(self, path)
+
+    @staticmethod
+    def load_checkpoint(path, mmap_arrays = False, restore_random_state = True):
+        """ Lädt eine mit save_checkpoint() gespeicherte World """
+        return load_world_checkpoint(path, mmap_arrays, restore_random_state)
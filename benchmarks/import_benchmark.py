@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Reports how long it takes a fresh interpreter to import the core simulation modules and the visualization layer,
+and whether pygame gets imported along the way.
+
+Every measurement runs in a new process, so it is the startup cost a process-pool worker pays before its first
+replicate. The median over several repetitions is reported.
+
+Usage:
+    python benchmarks/import_benchmark.py
+    python benchmarks/import_benchmark.py --repeat 20 --modules World Visualizer
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PACKAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ["numpy", "Helper", "World", "Population", "BatchRunner", "Sweep", "Checkpoint", "Visualizer"]
+
+MEASURE_IMPORT = """
+import sys, time, json
+sys.path.insert(0, {package_directory!r})
+t0 = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - t0, "pygame": "pygame" in sys.modules}}))
+"""
+
+
+def measure(module):
+    """ Imports the module in a fresh interpreter and returns the import time and whether pygame was loaded """
+    code = MEASURE_IMPORT.format(package_directory = PACKAGE_DIRECTORY, module = module)
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT = "1")
+    output = subprocess.run([sys.executable, "-c", code], capture_output = True, text = True, check = True, env = env)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure_interpreter_startup():
+    """ Wall time of an interpreter that imports nothing, as the baseline every worker pays anyway """
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], capture_output = True, check = True)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type = int, default = 10)
+    parser.add_argument("--modules", nargs = "+", default = MODULES)
+    args = parser.parse_args()
+
+    startup = statistics.median(measure_interpreter_startup() for _ in range(args.repeat))
+    print(f"interpreter startup (wall): {startup * 1000:.1f} ms\n")
+
+    print(f"{'module':<14}{'import ms':>12}{'pygame':>9}")
+
+    for module in args.modules:
+        results = [measure(module) for _ in range(args.repeat)]
+        seconds = statistics.median(result["seconds"] for result in results)
+        print(f"{module:<14}{seconds * 1000:>12.1f}{'yes' if results[0]['pygame'] else 'no':>9}", flush = True)
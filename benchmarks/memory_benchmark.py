@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Reports the memory used per cell and per agent for the standard (Cell, Agent) and the slotted
+(CompactCell, CompactAgent) classes on square grids of growing size.
+
+Every measurement runs in a fresh process and takes the growth of its peak resident set size, so the numbers include
+everything a grid really costs: cell objects, residents, the grid lists and the cell arrays of the World.
+
+Usage:
+    python benchmarks/memory_benchmark.py
+    python benchmarks/memory_benchmark.py --sizes 100 1000 4000 --density 0.5 --variants compact
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from World import *
+from Agent import *
+from Cell import *
+
+
+class StandardBenchmarkAgent(Agent):
+    pass
+
+
+class CompactBenchmarkAgent(CompactAgent):
+    __slots__ = ()
+
+
+VARIANTS = {
+    "standard": (Cell, StandardBenchmarkAgent),
+    "compact": (CompactCell, CompactBenchmarkAgent),
+}
+
+
+def get_peak_rss_bytes():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024    # Linux reports kilobytes
+
+
+def measure(variant, grid_size, density):
+    """ Runs in a fresh process: builds the grid, then the agents, and returns the memory growth of both steps """
+    cell_class, agent_class = VARIANTS[variant]
+    n_agents = int(grid_size * grid_size * density)
+
+    rss_before = get_peak_rss_bytes()
+
+    world = World(grid_size, grid_size)
+    world.create_grid(cell_class)
+    rss_after_grid = get_peak_rss_bytes()
+
+    world.create_agents("agents", agent_class, n_agents)
+    world.place_agents_on_grid(world.agents["agents"])
+    rss_after_agents = get_peak_rss_bytes()
+
+    return {
+        "variant": variant,
+        "grid": f"{grid_size}x{grid_size}",
+        "cells": grid_size * grid_size,
+        "agents": n_agents,
+        "bytes_per_cell": (rss_after_grid - rss_before) / (grid_size * grid_size),
+        "bytes_per_agent": (rss_after_agents - rss_after_grid) / n_agents if n_agents else float("nan"),
+        "total_mb": (rss_after_agents - rss_before) / 2 ** 20,
+    }
+
+
+def run_in_fresh_process(variant, grid_size, density):
+    with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure, variant, grid_size, density).result()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [100, 500, 1000, 2000, 4000])
+    parser.add_argument("--density", type = float, default = 0.5, help = "share of cells with an agent")
+    parser.add_argument("--variants", nargs = "+", default = list(VARIANTS), choices = list(VARIANTS))
+    args = parser.parse_args()
+
+    print(f"{'variant':<10}{'grid':>12}{'cells':>12}{'agents':>12}{'B/cell':>10}{'B/agent':>10}{'total MB':>11}")
+
+    for grid_size in args.sizes:
+        for variant in args.variants:
+            row = run_in_fresh_process(variant, grid_size, args.density)
+            print(
+                f"{row['variant']:<10}{row['grid']:>12}{row['cells']:>12}{row['agents']:>12}"
+                f"{row['bytes_per_cell']:>10.0f}{row['bytes_per_agent']:>10.0f}{row['total_mb']:>11.1f}",
+                flush = True,
+            )
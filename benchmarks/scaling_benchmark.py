@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Times the core hot paths on square grids of growing size and writes the results as JSON, so that two commits can be
+compared case by case.
+
+Cases:
+    create_grid             World.create_grid() on an empty world
+    find_arounding_cells    Cell.find_arounding_cells() for every cell of the grid
+    set_neighbor_cells      World.set_neighbor_cells() for the whole grid, including the neighbor table
+    place_agents_on_grid    World.place_agents_on_grid() for a population on half of the cells
+    move_churn              Agent.move_to_this_cell() to random empty cells
+    die                     Agent.die() for a share of the population (ordered population, the default)
+    die_unordered           the same with a swap-remove population (ordered = False)
+    heating_tick/<s>        one step_heating_vectorized() tick of the heating model per interdependence structure s
+    heating_tick_scalar/<s> one step_heating() tick (only up to --scalar-max-size, it is slow on large grids)
+    visualizer_frame        one offscreen Visualizer frame: grid array of the heating agents, a plot and update_screen()
+
+Every (case, grid size) pair runs in a fresh process. Setup is not timed; the reported numbers are the minimum and
+median over --repeat runs and the median time per item (cell, agent or move).
+
+Usage:
+    python benchmarks/scaling_benchmark.py --output results.json
+    python benchmarks/scaling_benchmark.py --sizes 80 250 --cases create_grid heating_tick --compare results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PACKAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+sys.path.insert(0, PACKAGE_DIRECTORY)
+sys.path.insert(0, os.path.join(PACKAGE_DIRECTORY, "models"))
+
+import numpy as np
+
+from World import *
+from Agent import *
+from Cell import *
+from heating_model import *
+
+
+class BenchmarkAgent(Agent):
+    pass
+
+
+DENSITY = 0.5           # share of cells with an agent in the movement and placement cases
+N_CHURN_MOVES = 100000
+DIE_SHARE = 0.01        # share of the population that dies per run (at most MAX_DEATHS agents)
+MAX_DEATHS = 10000
+
+
+def timed(function):
+    t0 = time.perf_counter()
+    function()
+    return time.perf_counter() - t0
+
+
+def create_world_with_agents(grid_size, place = True, ordered = True):
+    world = World(grid_size, grid_size)
+    world.create_grid()
+    world.create_agents("agents", BenchmarkAgent, int(grid_size * grid_size * DENSITY), ordered = ordered)
+    if place:
+        world.place_agents_on_grid(world.agents["agents"])
+    return world
+
+
+def bench_create_grid(grid_size, repeat):
+    times = [timed(lambda: World(grid_size, grid_size).create_grid()) for _ in range(repeat)]
+    return times, grid_size * grid_size
+
+
+def bench_find_arounding_cells(grid_size, repeat):
+    world = World(grid_size, grid_size)
+    world.create_grid()
+
+    def find_all():
+        for cell in world.grid_as_flat_list:
+            cell.neighbor_cells = cell.find_arounding_cells("neumann", grid_size, grid_size, world.grid_as_matrix)
+
+    return [timed(find_all) for _ in range(repeat)], grid_size * grid_size
+
+
+def bench_set_neighbor_cells(grid_size, repeat):
+    world = World(grid_size, grid_size)
+    world.create_grid()
+
+    times = []
+    for _ in range(repeat):
+        world.neighbor_tables.clear()
+        times.append(timed(world.set_neighbor_cells))
+
+    return times, grid_size * grid_size
+
+
+def bench_place_agents_on_grid(grid_size, repeat):
+    world = create_world_with_agents(grid_size, place = False)
+    population = world.agents["agents"]
+
+    times = []
+    for _ in range(repeat):
+        times.append(timed(lambda: world.place_agents_on_grid(population)))
+        for agent in population:
+            agent.move_out()
+
+    return times, len(population)
+
+
+def bench_move_churn(grid_size, repeat):
+    world = create_world_with_agents(grid_size)
+    population = world.agents["agents"]
+    n_moves = min(N_CHURN_MOVES, len(population))
+
+    def churn():
+        for agent in moving_agents:
+            agent.move_to_this_cell(world.get_random_empty_cell())
+
+    times = []
+    for _ in range(repeat):
+        moving_agents = random.sample(list(population), n_moves)
+        times.append(timed(churn))
+
+    return times, n_moves
+
+
+def bench_die(grid_size, repeat, ordered = True):
+    world = create_world_with_agents(grid_size, ordered = ordered)
+    population = world.agents["agents"]
+    n_deaths = max(1, min(MAX_DEATHS, int(len(population) * DIE_SHARE)))
+
+    def die():
+        for agent in dying_agents:
+            agent.die(world.heaven)
+
+    times = []
+    for _ in range(repeat):
+        dying_agents = random.sample(list(population), n_deaths)
+        times.append(timed(die))
+
+    return times, n_deaths
+
+
+def bench_die_unordered(grid_size, repeat):
+    return bench_die(grid_size, repeat, ordered = False)
+
+
+def make_heating_tick_benchmark(interdependence_structure, vectorized):
+
+    def bench_heating_tick(grid_size, repeat):
+        world = create_heating_world(grid_size, grid_size)
+        n_agents = len(world.agents["agents_1"])
+
+        if vectorized:
+            step = lambda: step_heating_vectorized(world, interdependence_structure)
+        else:
+            step = lambda: step_heating(world, interdependence_structure)
+
+        step()   # warm-up, e.g. neighbor tables and agent positions
+
+        return [timed(step) for _ in range(repeat)], n_agents
+
+    return bench_heating_tick
+
+
+def bench_visualizer_frame(grid_size, repeat):
+    from Visualizer import Visualizer
+
+    world = create_heating_world(grid_size, grid_size)
+    population = world.agents["agents_1"]
+
+    # at least one pixel per cell
+    window_size = max(600, grid_size)
+    visualizer = Visualizer(grid_size, grid_size, simulation_window_width = window_size, screen_height = window_size,
+                            offscreen = True)
+
+    def frame():
+        visualizer.draw_population_as_array(population, "output", attribute_min = -50, attribute_max = 50)
+        visualizer.plot("output", {"mean": mean_output(world)})
+        visualizer.update_screen()
+
+    frame()   # warm-up: surfaces, fonts and static plot chrome
+
+    return [timed(frame) for _ in range(repeat)], grid_size * grid_size
+
+
+CASES = {
+    "create_grid": bench_create_grid,
+    "find_arounding_cells": bench_find_arounding_cells,
+    "set_neighbor_cells": bench_set_neighbor_cells,
+    "place_agents_on_grid": bench_place_agents_on_grid,
+    "move_churn": bench_move_churn,
+    "die": bench_die,
+    "die_unordered": bench_die_unordered,
+}
+for structure in INTERDEPENDENCE_STRUCTURES:
+    CASES["heating_tick/" + structure] = make_heating_tick_benchmark(structure, vectorized = True)
+for structure in INTERDEPENDENCE_STRUCTURES:
+    CASES["heating_tick_scalar/" + structure] = make_heating_tick_benchmark(structure, vectorized = False)
+CASES["visualizer_frame"] = bench_visualizer_frame
+
+
+def select_cases(names):
+    """ Case names or prefixes, e.g. "heating_tick" selects every vectorized structure """
+    selected = [case for case in CASES if any(case == name or case.startswith(name + "/") for name in names)]
+    unknown = [name for name in names if not any(case == name or case.startswith(name + "/") for case in CASES)]
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(unknown)} (available: {', '.join(CASES)})")
+    return selected
+
+
+def measure(case, grid_size, repeat, seed):
+    """ Runs in a fresh process and returns one result row """
+    random.seed(seed)
+    np.random.seed(seed)
+    os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+    times, n_items = CASES[case](grid_size, repeat)
+    median_seconds = statistics.median(times)
+
+    return {
+        "case": case,
+        "grid_size": grid_size,
+        "items": n_items,
+        "repeat": repeat,
+        "min_seconds": min(times),
+        "median_seconds": median_seconds,
+        "median_ns_per_item": median_seconds / n_items * 1e9 if n_items else None,
+    }
+
+
+def run_in_fresh_process(case, grid_size, repeat, seed):
+    with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure, case, grid_size, repeat, seed).result()
+
+
+def get_git_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], cwd = PACKAGE_DIRECTORY, capture_output = True,
+                                text = True, check = True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment():
+    return {
+        "commit": get_git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def print_row(row, baseline = None):
+    line = (f"{row['case']:<34}{row['grid_size']:>7}{row['items']:>10}"
+            f"{row['median_seconds'] * 1000:>13.2f}{row['median_ns_per_item']:>12.0f}")
+
+    if baseline is not None:
+        key = (row["case"], row["grid_size"])
+        if key in baseline:
+            line += f"{row['median_seconds'] / baseline[key]['median_seconds']:>10.2f}x"
+        else:
+            line += f"{'-':>11}"
+
+    print(line, flush = True)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [80, 250, 500, 1000, 2000])
+    parser.add_argument("--cases", nargs = "+", default = [case for case in CASES
+                                                           if not case.startswith("heating_tick_scalar/")],
+                        help = "case names or prefixes (default: all but the scalar heating ticks)")
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--scalar-max-size", type = int, default = 500,
+                        help = "largest grid for the scalar heating ticks")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--output", help = "write the results as JSON to this file")
+    parser.add_argument("--compare", help = "JSON results of an earlier run, prints the ratio new / old")
+    args = parser.parse_args()
+
+    cases = select_cases(args.cases)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = {(row["case"], row["grid_size"]): row for row in json.load(file)["results"]}
+
+    print(f"{'case':<34}{'grid':>7}{'items':>10}{'median ms':>13}{'ns/item':>12}"
+          + (f"{'vs. old':>11}" if baseline is not None else ""))
+
+    results = []
+    for grid_size in args.sizes:
+        for case in cases:
+            if case.startswith("heating_tick_scalar/") and grid_size > args.scalar_max_size:
+                continue
+            row = run_in_fresh_process(case, grid_size, args.repeat, args.seed)
+            results.append(row)
+            print_row(row, baseline)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment": get_environment(), "results": results}, file, indent = 2)
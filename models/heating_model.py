@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""
+Heating model: agents adjust their output until the perceived world state matches their desire.
+
+Contains the agent class, a world factory and whole-population step functions. The animation scripts import
+everything from here.
+"""
+
+import os
+import sys
+
+# sampy-Module liegen eine Ebene über dem models-Ordner
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Helper import *
+from World import *
+from Agent import *
+from Cell import *
+from Population import *
+from Scheduler import *
+
+from functools import partial
+import numpy as np
+import random
+
+
+# Per-agent attributes that are stored as columns of the population
+HEATING_AGENT_ATTRIBUTES = {
+    "desire": float,
+    "output": float,
+    "worldstate": float,
+    "input": float,
+    "evaluation_result": object,
+}
+
+# Attributes written during a tick (double-buffered under synchronous updating)
+HEATING_BUFFERED_ATTRIBUTES = ("output", "worldstate", "input", "evaluation_result")
+
+INTERDEPENDENCE_STRUCTURES = ("local_exchange", "local_giving", "diffusion")
+
+
+class Heating_Agent(Agent):
+    desire = 0
+    loss_rate = 0.125
+    tolerance = 0.1
+    adjustment_size = 1
+
+    def __init__(self,
+                 desire,
+                 output,
+                 worldstate,
+                 input,
+                 loss_rate,
+                 ):
+
+        Agent.__init__(self)
+
+        # desired worldstate value / input value
+        self.desire = desire
+
+        # value of performed action
+        self.output = output
+
+        # worldstate in the world of this agent
+        self.worldstate = worldstate
+
+        # subjectively perceived world state
+        self.input = input
+
+        # result of last evaluation
+        self.evaluation_result = str
+
+        # dict of lists with neighbor-groups
+        self.neighbors = {}
+
+        # number
+        self.n_borders = int
+
+        # loss rate per border
+        #self.loss_rate = loss_rate
+
+        # data per tick is collected by the world's recorder, see register_heating_recorder()
+
+    
+    def find_all_neighbors_on_neighbor_cells(self):
+        self.neighbors = []
+        for cell in self.residence_cell.neighbor_cells:
+            if cell is None:    # outside the grid (torus = False)
+                continue
+            self.neighbors.extend(
+                    list(
+                            cell.dict_of_residents.values()
+                            )
+                    )
+        
+        
+        #self.neighbors = [len(cell.residents) 
+        #                  for cell in self.residence_cell.neighbor_cells]
+        self.n_borders = len(self.neighbors)
+    
+    def random_move(self, world):
+        if self.output - self.worldstate > 8:
+            if random.random() < 0.1:
+                #print("moved")
+                old_neighbors = self.neighbors
+                self.move_to_this_cell(world.get_random_empty_cell())
+                self.find_all_neighbors_on_neighbor_cells()
+                # the old neighbors must forget the agent, the new ones must see it
+                for neighbor in old_neighbors + self.neighbors:
+                    neighbor.find_all_neighbors_on_neighbor_cells()
+            
+            
+
+
+    def evaluate_input(self):
+        """
+        evaluates the perceived worldstate/input value
+        changes Agent.evaluation_result to either "too high", "too low" or "perfect"
+        Input: Agent.input; Agent.desire
+        Output: Agent.evaluation_result
+        """
+
+        if self.input > self.desire + self.tolerance:
+            self.evaluation_result = "too high"
+
+        elif self.input < self.desire - self.tolerance:
+            self.evaluation_result = "too low"
+
+        else:
+            self.evaluation_result = "perfect"
+
+
+    def set_output(self, output_min=None, output_max=None):
+        """
+        sets/adjusts the output depending on the evaluation of the input
+        Input: Agent.evaluation_result
+        Output: Agent.output
+        """
+
+        output = self.output
+
+        if self.evaluation_result == "perfect":
+            pass
+        else:
+            adjustment = random.uniform(0, self.adjustment_size)
+            # wenn adjustment sehr klein, dann entstehen die muster nicht.
+
+            if self.evaluation_result == "too high":
+                output -= adjustment
+            else:
+                output += adjustment
+
+        # keep output within boundaries
+        if output_min != None:
+            if output < output_min:
+                output = output_min
+
+        if output_max != None:
+            if output > output_max:
+                output = output_max
+
+        self.output = output
+
+
+    def calculate_worldstate_and_input(self, interdependence_structure):
+
+        # input_i = worldstate_i = output_i * (1 - p) + output_j * p
+        if interdependence_structure == "local_exchange":
+
+            own_contribution = self.output * (1 - self.loss_rate * self.n_borders)
+            contribution_of_neighbors = sum([neigh.loss_rate * neigh.output for neigh in self.neighbors])
+            self.worldstate = own_contribution + contribution_of_neighbors
+
+            self.input = self.worldstate
+
+        # input_i = worldstate_i = output_i + output_j * p
+        elif interdependence_structure == "local_giving":
+
+            own_contribution = self.output
+            contribution_of_neighbors = sum([neigh.loss_rate * neigh.output for neigh in self.neighbors])
+            self.worldstate = own_contribution + contribution_of_neighbors
+
+            self.input = self.worldstate
+
+
+        elif interdependence_structure == "diffusion":
+            own_contribution = self.output
+
+            contribution_of_neighbors = sum([neigh.loss_rate * neigh.worldstate for neigh in self.neighbors])
+
+            self.worldstate = own_contribution + contribution_of_neighbors
+
+            self.input = self.worldstate * (1 - self.loss_rate)
+
+
+def create_heating_world(
+        len_x_grid_dim = 80,
+        len_y_grid_dim = 80,
+        density = 0.975,
+        rel_pos_neighbors = "neumann",
+        torus = True,
+        population_name = "agents_1",
+        ):
+    """
+    Creates a world whose cells are occupied by Heating_Agents with probability `density`.
+    The agents' desires are 0 +/- 1.
+    """
+
+    world = World(len_x_grid_dim, len_y_grid_dim)
+    world.create_grid()
+
+    # Agenten-Population erstellen
+    population = Population(HEATING_AGENT_ATTRIBUTES, capacity = len_x_grid_dim * len_y_grid_dim)
+    world.agents.update({population_name: population})
+
+    for cell in world.grid_as_flat_list:
+        if random.random() < density:
+
+            agent = Heating_Agent(0,0,0,0,0.15)
+            agent.desire += random.randint(-1,1)
+
+            population.append(agent)
+
+    # Nachbarzellen aller Zellen auf einmal setzen
+    world.set_neighbor_cells(rel_pos_neighbors, torus)
+
+    world.place_agents_on_grid(population)
+
+    # Nachbarn der Agenten finden
+    for agent in population:
+        agent.find_all_neighbors_on_neighbor_cells()
+
+    return world
+
+
+def activate_heating_agent(
+        agent,
+        world,
+        interdependence_structure = "local_exchange",
+        output_min = -50,
+        output_max = 50,
+        move = True,
+        ):
+    """ One activation of a single agent: move, perceive, evaluate and act """
+
+    if move:
+        agent.random_move(world)
+    agent.calculate_worldstate_and_input(interdependence_structure)
+    agent.evaluate_input()
+    agent.set_output(output_min=output_min, output_max=output_max)
+
+
+def step_heating(
+        world,
+        interdependence_structure = "local_exchange",
+        output_min = -50,
+        output_max = 50,
+        population_name = "agents_1",
+        move = True,
+        ):
+    """
+    Scalar step. Order and information state of the activations are given by the scheduler
+    that is set for the population in the world (World.set_scheduler(), sequential by default).
+    """
+
+    world.activate_agents(
+        population_name,
+        partial(
+            activate_heating_agent,
+            world = world,
+            interdependence_structure = interdependence_structure,
+            output_min = output_min,
+            output_max = output_max,
+            move = move,
+        ),
+    )
+
+
+def register_heating_recorder(
+        world,
+        population_name = "agents_1",
+        attribute_names = ("desire", "worldstate", "input", "output"),
+        directory = None,
+        chunk_size = 1000,
+        ):
+    """
+    Registers the heating agents' attributes in a new recorder of the world.
+    Call world.record(tick) once per tick. The recorded columns grow with the population, e.g. after
+    world.spawn_agents().
+    """
+
+    world.recorder = Recorder(directory, chunk_size)
+
+    for attribute_name in attribute_names:
+        world.recorder.register(attribute_name, world.agents[population_name])
+
+
+@profiled_phase("model step")
+def step_heating_synchronous(
+        world,
+        interdependence_structure = "local_exchange",
+        output_min = -50,
+        output_max = 50,
+        population_name = "agents_1",
+        ):
+    """
+    Scalar reference for synchronous updating: all agents perceive the state of the previous tick.
+    step_heating_vectorized() gives the same results.
+    """
+
+    SynchronousScheduler(HEATING_BUFFERED_ATTRIBUTES).activate(
+        world.agents[population_name],
+        partial(
+            activate_heating_agent,
+            world = world,
+            interdependence_structure = interdependence_structure,
+            output_min = output_min,
+            output_max = output_max,
+            move = False,
+        ),
+    )
+
+
+def get_agent_parameter(population, attribute_name):
+    """
+    Values of a model parameter for step_heating_vectorized(): the population's column if the attribute is declared,
+    otherwise the class attribute of the population's agent class. If the population mixes agent classes with
+    different values, one value per agent.
+    """
+    if attribute_name in population.columns:
+        return population.column(attribute_name)
+
+    values = {getattr(agent_class, attribute_name) for agent_class in population.agent_classes}
+    if len(values) == 1:
+        return values.pop()
+
+    return np.array([getattr(agent, attribute_name) for agent in population], dtype=float)
+
+
+@profiled_phase("model step")
+def step_heating_vectorized(
+        world,
+        interdependence_structure = "local_exchange",
+        output_min = -50,
+        output_max = 50,
+        population_name = "agents_1",
+        rel_pos_neighbors = "neumann",
+        torus = True,
+        ):
+    """
+    Whole-population synchronous step on the population's columns and the world's neighbor table.
+
+    Bit-compatible with step_heating_synchronous(): neighbor contributions are summed in the same order,
+    and the output adjustments are drawn with random.uniform() in population order. Assumes that every
+    cell hosts at most one agent (as in create_heating_world()); the neighbors of an agent are the residents
+    of its neighbor cells given by rel_pos_neighbors / torus. loss_rate, tolerance and adjustment_size are read
+    with get_agent_parameter().
+    """
+
+    if interdependence_structure not in INTERDEPENDENCE_STRUCTURES:
+        raise ValueError(f"Unknown interdependence structure: {interdependence_structure}")
+
+    population = world.agents[population_name]
+    n_agents = len(population)
+    if n_agents == 0:
+        return
+
+    if world.cell_arrays["n_residents"].max() > 1:
+        raise ValueError("step_heating_vectorized() requires at most one agent per cell")
+
+    output = population.column("output")
+    worldstate = population.column("worldstate")
+    input = population.column("input")
+    desire = population.column("desire")
+
+    loss_rate = np.broadcast_to(get_agent_parameter(population, "loss_rate"), n_agents)
+
+    # Slots der Nachbarn jedes Agenten (-1 = kein Nachbar)
+    with world.profiler.phase("neighbor updates"):
+        resident_slots = np.append(world.get_resident_slots(population), -1)
+        cell_indices = world.get_cell_indices_of_agents(population)
+        neighbor_slots = resident_slots[world.get_neighbor_table(rel_pos_neighbors, torus)[cell_indices]]
+        neighbor_slots[cell_indices < 0] = -1   # Agenten ohne Zelle haben keine Nachbarn
+        n_borders = (neighbor_slots >= 0).sum(axis=1)
+
+    # Beiträge der Nachbarn; Slot -1 liest den angehängten Beitrag 0
+    if interdependence_structure == "diffusion":
+        given = np.append(loss_rate * worldstate, 0.0)
+    else:
+        given = np.append(loss_rate * output, 0.0)
+
+    contribution_of_neighbors = np.zeros(n_agents)
+    for i in range(neighbor_slots.shape[1]):
+        contribution_of_neighbors += given[neighbor_slots[:, i]]   # gleiche Summationsreihenfolge wie sum()
+
+    if interdependence_structure == "local_exchange":
+        new_worldstate = output * (1 - loss_rate * n_borders) + contribution_of_neighbors
+        new_input = new_worldstate
+
+    elif interdependence_structure == "local_giving":
+        new_worldstate = output + contribution_of_neighbors
+        new_input = new_worldstate
+
+    else:
+        new_worldstate = output + contribution_of_neighbors
+        new_input = new_worldstate * (1 - loss_rate)
+
+    worldstate[:] = new_worldstate
+    input[:] = new_input
+
+    # evaluate_input()
+    tolerance = get_agent_parameter(population, "tolerance")
+    too_high = input > desire + tolerance
+    too_low = ~too_high & (input < desire - tolerance)
+
+    population.column("evaluation_result")[:] = np.where(
+        too_high, "too high", np.where(too_low, "too low", "perfect"))
+
+    # set_output(): Zufallszahlen in derselben Reihenfolge ziehen wie der skalare Pfad
+    adjusted = too_high | too_low
+    adjustment = np.zeros(n_agents)
+    adjustment_size = get_agent_parameter(population, "adjustment_size")
+    if np.ndim(adjustment_size) == 0:
+        adjustment[adjusted] = [random.uniform(0, adjustment_size) for _ in range(int(adjusted.sum()))]
+    else:
+        adjustment[adjusted] = [random.uniform(0, size) for size in adjustment_size[adjusted].tolist()]
+
+    new_output = np.where(too_high, output - adjustment, np.where(too_low, output + adjustment, output))
+
+    # keep output within boundaries
+    if output_min != None:
+        new_output = np.maximum(new_output, output_min)
+    if output_max != None:
+        new_output = np.minimum(new_output, output_max)
+
+    output[:] = new_output
+
+
+def mean_output(world, population_name = "agents_1"):
+    return float(world.agents[population_name].column("output").mean())
+
+
+def mean_absolute_output(world, population_name = "agents_1"):
+    return float(np.abs(world.agents[population_name].column("output")).mean())
+
+
+def mean_deviation_from_desire(world, population_name = "agents_1"):
+    population = world.agents[population_name]
+    return float(np.abs(population.column("input") - population.column("desire")).mean())
+
+
+def share_of_satisfied_agents(world, population_name = "agents_1"):
+    return float((world.agents[population_name].column("evaluation_result") == "perfect").mean())
+
+
+HEATING_METRICS = {
+    "mean_output": mean_output,
+    "mean_absolute_output": mean_absolute_output,
+    "mean_deviation_from_desire": mean_deviation_from_desire,
+    "share_of_satisfied_agents": share_of_satisfied_agents,
+}
+
+
+def get_output_matrix(world):
+    """ Output of the main resident of every cell (0 for empty cells) as a 2-D list """
+    return [[(cell.main_resident.output if cell.main_resident else 0) for cell in row]
+            for row in world.grid_as_matrix]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Runs replicates of the heating model headless (without pygame or matplotlib) on all cores
+and prints the final value of every metric per seed.
+"""
+
+from functools import partial
+
+from heating_model import *
+from BatchRunner import *
+
+
+world_factory = partial(create_heating_world, 80, 80)
+step_function = partial(step_heating_vectorized, interdependence_structure = "local_exchange")
+
+n_ticks = 500
+seeds = list(range(16))
+
+
+if __name__ == "__main__":
+
+    results = run_batch(
+        world_factory,
+        step_function,
+        n_ticks,
+        seeds,
+        metrics = HEATING_METRICS,
+        recording_interval = 10,
+    )
+
+    for result in results:
+        print(
+            "seed", result["seed"],
+            "runtime", round(result["runtime"], 2),
+            {metric_name: round(result[metric_name][-1], 4) for metric_name in HEATING_METRICS},
+        )
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Renders the heating model without a window and saves every k-th frame, e.g. to turn a long run into a video.
+
+The Visualizer draws to an offscreen surface, so this also runs on machines without a display. Encoding and writing the
+frames happens in a background thread. Turn a PNG sequence into a video with
+    ffmpeg -framerate 30 -pattern_type glob -i "heating_frames/*.png" heating.mp4
+or read an archive back with FrameWriter.read_frame_archive().
+"""
+
+import argparse
+
+from heating_model import *
+from Visualizer import *
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type = int, default = 80)
+    parser.add_argument("--ticks", type = int, default = 1000)
+    parser.add_argument("--every", type = int, default = 10, help = "save every k-th frame")
+    parser.add_argument("--format", choices = FRAME_FORMATS, default = "png")
+    parser.add_argument("--output", default = "heating_frames")
+    args = parser.parse_args()
+
+    world = create_heating_world(args.size, args.size)
+    population = world.agents["agents_1"]
+
+    visualizer = Visualizer(args.size, args.size, offscreen = True)
+    visualizer.start_frame_export(args.output, every_k_ticks = args.every, frame_format = args.format)
+
+    for tick in range(args.ticks):
+        step_heating_vectorized(world, "local_exchange", output_min = -50, output_max = 50)
+
+        visualizer.draw_population_as_array(population, "output", attribute_min = -50, attribute_max = 50)
+        visualizer.plot("output", {"mean": mean_output(world), "mean absolute": mean_absolute_output(world)})
+        visualizer.update_screen()
+
+    visualizer.stop_frame_export()
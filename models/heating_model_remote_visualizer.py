@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the heating model at full speed while a Visualizer in a separate process shows the latest state.
+
+The simulation publishes the output grid and two plot values after every tick and never waits for the display.
+Changing the loss rate in the window is sent back and applied before the next tick. Closing the window stops the run.
+"""
+
+from heating_model import *
+from RemoteVisualizer import *
+
+
+len_x_grid_dim = 80
+len_y_grid_dim = 80
+n_ticks = 100000
+
+
+if __name__ == "__main__":
+
+    world = create_heating_world(len_x_grid_dim, len_y_grid_dim)
+    population = world.agents["agents_1"]
+
+    remote_visualizer = RemoteVisualizer(
+        len_x_grid_dim,
+        len_y_grid_dim,
+        grid_arrays = {"output": {"attribute_min": -50, "attribute_max": 50}},
+        plots = {"output": ["mean", "mean absolute"]},
+        controllers = {"loss rate": (Heating_Agent, "loss_rate", 0, 0.25, 0.005)},
+        display_speed = 30,
+    )
+
+    with remote_visualizer:
+        for tick in range(n_ticks):
+            step_heating_vectorized(world, "local_exchange", output_min = -50, output_max = 50)
+
+            remote_visualizer.publish(
+                tick,
+                grid_arrays = {"output": agents_to_grid_array(population, "output", len_x_grid_dim, len_y_grid_dim)},
+                plot_values = {"output": {"mean": mean_output(world), "mean absolute": mean_absolute_output(world)}},
+            )
+            remote_visualizer.apply_controller_changes()
+
+            if not remote_visualizer.is_running():
+                break
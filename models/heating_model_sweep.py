@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Sweeps loss_rate and tolerance of the heating model headless on all cores
+and writes one row per parameter combination and seed to heating_model_sweep.csv.
+"""
+
+from functools import partial
+
+from heating_model import *
+from Sweep import *
+
+
+world_factory = partial(create_heating_world, 80, 80)
+step_function = partial(step_heating_vectorized, interdependence_structure = "local_exchange")
+
+parameters = [
+    SweepParameter("loss_rate", Heating_Agent, "loss_rate", 0.05, 0.25, 0.05),
+    SweepParameter("tolerance", Heating_Agent, "tolerance", 0, 0.5, 0.1),
+]
+
+n_ticks = 500
+seeds = list(range(10))
+
+
+if __name__ == "__main__":
+
+    table = run_sweep(
+        world_factory,
+        step_function,
+        n_ticks,
+        parameters,
+        seeds,
+        metrics = HEATING_METRICS,
+    )
+
+    write_rows_to_csv(table, "heating_model_sweep.csv")
+
+    print(len(table), "rows written to heating_model_sweep.csv")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# sampy modules live in the package root, the models in models/
+sys.path.insert(0, PACKAGE_DIRECTORY)
+sys.path.insert(0, os.path.join(PACKAGE_DIRECTORY, "models"))
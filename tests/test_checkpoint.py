@@ -0,0 +1,67 @@
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from BatchRunner import set_seed
+from heating_model import *
+
+
+@pytest.mark.parametrize("mmap_arrays", [False, True])
+@pytest.mark.parametrize("step", [step_heating, step_heating_vectorized])
+def test_resumed_checkpoint_reproduces_the_following_ticks(tmp_path, step, mmap_arrays):
+    set_seed(3)
+    world = create_heating_world(20, 20, density = 0.6)
+    world.set_scheduler("agents_1", "sequential")
+    for _ in range(5):
+        step(world)
+
+    path = str(tmp_path / "world.ckpt")
+    world.save_checkpoint(path)
+
+    for _ in range(10):
+        step(world)
+
+    resumed_world = World.load_checkpoint(path, mmap_arrays = mmap_arrays)
+    for _ in range(10):
+        step(resumed_world)
+
+    assert np.array_equal(get_output_matrix(resumed_world), get_output_matrix(world))
+    assert resumed_world.count_empty_cells() == world.count_empty_cells()
+
+
+def create_world_with_dead_agents(policy = "keep"):
+    world = World(10, 10)
+    world.create_grid()
+    world.create_agents("agents", Agent, 20)
+    world.place_agents_on_grid(world.agents["agents"])
+    world.set_heaven_policy(policy)
+
+    for agent in list(world.agents["agents"])[:3]:
+        agent.die(world.heaven)
+
+    return world
+
+
+@pytest.mark.parametrize("policy", Heaven.POLICIES)
+def test_heaven_survives_pickling_and_copying(policy):
+    world = create_world_with_dead_agents(policy)
+
+    for heaven in (pickle.loads(pickle.dumps(world)).heaven, copy.deepcopy(world.heaven), copy.copy(world.heaven)):
+        assert type(heaven) is Heaven
+        assert heaven.policy == policy
+        assert heaven.n_dead == 3
+        assert len(heaven) == len(world.heaven)
+
+
+def test_heaven_survives_checkpoint(tmp_path):
+    world = create_world_with_dead_agents()
+
+    path = str(tmp_path / "world.ckpt")
+    world.save_checkpoint(path)
+    loaded_world = World.load_checkpoint(path)
+
+    assert loaded_world.heaven.n_dead == 3
+    assert len(loaded_world.heaven) == 3
+    assert len(loaded_world.agents["agents"]) == 17
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from BatchRunner import set_seed
+from heating_model import *
+
+
+def create_world(seed, torus):
+    set_seed(seed)
+    return create_heating_world(24, 18, density = 0.8, torus = torus)
+
+
+@pytest.mark.parametrize("torus", [True, False])
+@pytest.mark.parametrize("interdependence_structure", INTERDEPENDENCE_STRUCTURES)
+def test_vectorized_step_matches_synchronous_step(interdependence_structure, torus):
+    scalar_world = create_world(1, torus)
+    vectorized_world = create_world(1, torus)
+
+    set_seed(2)
+    for _ in range(25):
+        step_heating_synchronous(scalar_world, interdependence_structure)
+
+    set_seed(2)
+    for _ in range(25):
+        step_heating_vectorized(vectorized_world, interdependence_structure, torus = torus)
+
+    scalar_population = scalar_world.agents["agents_1"]
+    vectorized_population = vectorized_world.agents["agents_1"]
+
+    for attribute_name in ("output", "worldstate", "input"):
+        assert np.array_equal(scalar_population.column(attribute_name), vectorized_population.column(attribute_name))
+    assert list(scalar_population.column("evaluation_result")) == list(vectorized_population.column("evaluation_result"))
+
+
+def test_vectorized_step_reads_parameters_of_the_agent_class():
+
+    class Tolerant_Agent(Heating_Agent):
+        tolerance = 0.6
+        adjustment_size = 2
+
+    worlds = [create_world(3, True), create_world(3, True)]
+    for world in worlds:
+        population = world.agents["agents_1"]
+        for agent in list(population)[::4]:
+            agent.__class__ = Tolerant_Agent
+        population.register_agent_class(Tolerant_Agent)
+
+    set_seed(4)
+    for _ in range(10):
+        step_heating_synchronous(worlds[0], "local_exchange")
+
+    set_seed(4)
+    for _ in range(10):
+        step_heating_vectorized(worlds[1], "local_exchange")
+
+    assert np.array_equal(worlds[0].agents["agents_1"].column("output"), worlds[1].agents["agents_1"].column("output"))
+
+
+def test_synchronous_and_vectorized_steps_match_with_movement():
+    worlds = []
+    for _ in range(2):
+        set_seed(1)
+        worlds.append(create_heating_world(30, 30))
+    worlds[0].set_scheduler("agents_1", "synchronous", buffered_attributes = HEATING_BUFFERED_ATTRIBUTES)
+
+    for world, vectorized in zip(worlds, (False, True)):
+        set_seed(6)
+        n_moves = 0
+        for _ in range(30):
+            for agent in world.agents["agents_1"]:
+                cell = agent.residence_cell
+                agent.random_move(world)
+                n_moves += agent.residence_cell is not cell
+            if vectorized:
+                step_heating_vectorized(world)
+            else:
+                step_heating(world, move = False)
+        assert n_moves > 0
+
+    assert np.array_equal(get_output_matrix(worlds[0]), get_output_matrix(worlds[1]))
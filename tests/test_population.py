@@ -0,0 +1,254 @@
+import random
+
+import pytest
+
+from World import *
+from Agent import *
+
+
+class NumberedAgent(Agent):
+
+    def __init__(self, number = -1):
+        Agent.__init__(self)
+        self.number = number
+
+
+def create_world(n_agents = 20, policy = "keep", ordered = True):
+    world = World(10, 10)
+    world.create_grid()
+    world.agents["agents"] = Population({"number": int}, capacity = 4, ordered = ordered)
+    world.spawn_agents("agents", n_agents, agent_class = NumberedAgent, attributes = {"number": list(range(n_agents))})
+    world.set_heaven_policy(policy)
+    return world
+
+
+def assert_consistent(world, population, numbers):
+    """ Slots, columns and cells agree; numbers maps id(agent) to the number of every living agent """
+    assert len(population) == len(numbers)
+    assert len({id(agent) for agent in population}) == len(population)
+
+    for slot, agent in enumerate(population):
+        assert agent.slot == slot
+        assert agent in population
+        assert population.index(agent) == slot
+        assert population.column("number")[slot] == numbers[id(agent)]
+        assert agent.number == numbers[id(agent)]
+        assert agent.residence_cell.get_resident(agent.name) is agent
+
+    for agent in world.heaven:
+        assert agent not in population
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@pytest.mark.parametrize("policy", Heaven.POLICIES)
+def test_slots_and_columns_stay_consistent_under_churn(ordered, policy):
+    random.seed(7)
+    world = create_world(30, policy, ordered)
+    population = world.agents["agents"]
+    numbers = {id(agent): agent.number for agent in population}
+    next_number = 30
+
+    for step in range(60):
+        action = step % 3
+        if action == 0 and len(population):
+            agent = random.choice(list(population))
+            agent.die(world.heaven)
+            del numbers[id(agent)]
+        elif action == 1 and len(population):
+            agents = random.sample(list(population), min(len(population), random.randint(1, 4)))
+            world.kill_agents(agents)
+            for agent in agents:
+                del numbers[id(agent)]
+        else:
+            n_new = min(random.randint(1, 5), world.count_empty_cells())
+            new_numbers = list(range(next_number, next_number + n_new))
+            next_number += n_new
+            for agent, number in zip(world.spawn_agents("agents", n_new, attributes = {"number": new_numbers}),
+                                     new_numbers):
+                numbers[id(agent)] = number
+
+        assert_consistent(world, population, numbers)
+
+    assert world.heaven.n_dead == next_number - len(population)
+
+
+def test_ordered_removal_keeps_the_order():
+    world = create_world(10)
+    population = world.agents["agents"]
+
+    population[2].die(world.heaven)
+    world.kill_agents([population[5], population[0]])
+    population.remove_agents([population[1]])
+
+    assert [agent.number for agent in population] == [1, 4, 5, 7, 8, 9]
+    assert list(population.column("number")) == [1, 4, 5, 7, 8, 9]
+
+
+def test_swap_remove_moves_the_last_agent_into_the_gap():
+    world = create_world(6, ordered = False)
+    population = world.agents["agents"]
+
+    population[1].die(world.heaven)
+    assert [agent.number for agent in population] == [0, 5, 2, 3, 4]
+
+    population.remove(population[0])
+    assert [agent.number for agent in population] == [4, 5, 2, 3]
+    assert list(population.column("number")) == [4, 5, 2, 3]
+
+
+@pytest.mark.parametrize("policy", Heaven.POLICIES)
+def test_heaven_policies(policy):
+    world = create_world(6, policy)
+    population = world.agents["agents"]
+    dead_agents = [population[0], population[1]]
+
+    world.kill_agents(dead_agents[:2])
+    dead_agents.append(population[0])
+    dead_agents[2].die(world.heaven)
+
+    assert world.heaven.n_dead == 3
+    if policy == "count":
+        assert len(world.heaven) == 0
+    else:
+        assert len(world.heaven) == 3
+        assert all(any(agent is dead_agent for dead_agent in world.heaven) for agent in dead_agents)
+
+    new_agents = world.spawn_agents("agents", 2)
+    recycled = [agent for agent in new_agents if any(agent is dead_agent for dead_agent in dead_agents)]
+
+    if policy == "recycle":
+        assert len(recycled) == 2
+        assert len(world.heaven) == 1
+        assert all(agent.number == -1 for agent in new_agents)     # __init__() ran again
+    else:
+        assert recycled == []
+
+    assert world.heaven.n_dead == 3
+    assert len(population) == 5
+
+
+def test_killing_dead_agents_again_is_skipped():
+    world = create_world(5, policy = "recycle")
+    population = world.agents["agents"]
+    agent = population[0]
+
+    world.kill_agents([agent])
+    world.kill_agents([agent, agent])
+
+    assert world.heaven.n_dead == 1
+    assert len(world.heaven) == 1
+    assert len(population) == 4
+
+    new_agents = world.spawn_agents("agents", 2)
+
+    assert new_agents[0] is not new_agents[1]
+    assert len({id(agent) for agent in population}) == len(population) == 6
+    assert world.count_empty_cells() == 100 - 6
+
+
+class ArgumentAgent(Agent):
+
+    def __init__(self, value, label = None):
+        Agent.__init__(self)
+        self.value = value
+        self.label = label
+
+
+@pytest.mark.parametrize("policy", Heaven.POLICIES)
+def test_spawned_agents_get_constructor_arguments(policy):
+    world = World(10, 10)
+    world.create_grid()
+    world.agents["agents"] = Population({"value": float})
+    world.spawn_agents("agents", 4, agent_class = ArgumentAgent, agent_args = (1.0,))
+    world.set_heaven_policy(policy)
+
+    world.kill_agents(list(world.agents["agents"])[:2])
+    new_agents = world.spawn_agents("agents", 3, agent_args = (2.0,), agent_kwargs = {"label": "new"})
+
+    assert [agent.value for agent in new_agents] == [2.0, 2.0, 2.0]
+    assert [agent.label for agent in new_agents] == ["new", "new", "new"]
+    assert sum(agent in new_agents for agent in world.heaven) == 0
+
+
+def test_empty_populations():
+    world = create_world(3)
+    population = world.agents["agents"]
+
+    world.kill_agents(list(population))
+    assert len(population) == 0
+    assert world.count_empty_cells() == 100
+
+    world.kill_agents([])
+    population.remove_agents([])
+
+    new_agents = world.spawn_agents("agents", 2)
+    assert len(population) == 2
+    assert all(type(agent) is NumberedAgent for agent in new_agents)
+    assert [agent.slot for agent in population] == [0, 1]
+
+    world.agents["empty"] = Population()
+    with pytest.raises(ValueError):
+        world.spawn_agents("empty", 1)
+
+
+def assert_groups_match_a_linear_scan(population, attribute_name):
+    expected_counts = {}
+    for agent in population:
+        value = getattr(agent, attribute_name)
+        expected_counts[value] = expected_counts.get(value, 0) + 1
+
+    assert population.get_group_counts(attribute_name) == expected_counts
+
+    for agent in population:
+        value = getattr(agent, attribute_name)
+        expected = {other.name for other in population if getattr(other, attribute_name) == value}
+        assert {other.name for other in agent.get_agents_like_me(attribute_name, population)} == expected
+        assert agent.count_agents_like_me(attribute_name, population) == len(expected)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@pytest.mark.parametrize("policy", ["keep", "recycle"])
+def test_group_indexes_stay_consistent_under_churn(ordered, policy):
+    random.seed(5)
+    world = create_world(30, policy, ordered)
+    population = world.agents["agents"]
+    population.create_group_index("number")
+    population.create_group_index("color")
+    for agent in population:
+        agent.color = random.choice("rgb")
+
+    for step in range(80):
+        action = step % 6
+        if action == 0:
+            for agent in random.sample(list(population), min(len(population), 5)):
+                agent.number = random.randint(0, 4)             # through the descriptor
+                agent.color = random.choice("rgby")
+        elif action == 1 and len(population):
+            population.set_column("number", [random.randint(0, 4) for agent in population])
+        elif action == 2 and len(population):
+            agent = random.choice(list(population))
+            agent.die(world.heaven)
+            agent.color = "dead"                                # must not reach the index any more
+        elif action == 3 and len(population):
+            world.kill_agents(random.sample(list(population), min(len(population), 3)))
+        elif action == 4:
+            population.remove_agents(random.sample(list(population), min(len(population), 2)))
+        else:
+            world.spawn_agents("agents", min(random.randint(1, 6), world.count_empty_cells()),
+                               attributes = {"number": 3})
+
+        assert_groups_match_a_linear_scan(population, "number")
+        assert_groups_match_a_linear_scan(population, "color")
+
+
+def test_group_index_uses_the_stored_column_value():
+    world = create_world(4)
+    population = world.agents["agents"]
+    population.create_group_index("number")
+
+    population[0].number = 2.7          # stored as 2 in the int column
+    population[1].number = population[1].number
+
+    assert population.get_group_counts("number") == {2: 2, 1: 1, 3: 1}
+    assert {agent.name for agent in population[2].get_agents_like_me("number", population)} == \
+           {population[0].name, population[2].name}
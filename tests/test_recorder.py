@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from World import *
+from Agent import *
+
+
+class ValueAgent(Agent):
+
+    def __init__(self, value = 0.0):
+        Agent.__init__(self)
+        self.value = value
+
+
+def create_world(n_agents, declared):
+    world = World(10, 10)
+    world.create_grid()
+    world.agents["agents"] = Population({"value": float} if declared else None)
+    world.spawn_agents("agents", n_agents, agent_class = ValueAgent)
+    return world
+
+
+def record_ticks(world, recorder, n_agents_per_tick):
+    """ Records one tick per entry; the population is resized to the given number of agents first """
+    population = world.agents["agents"]
+    expected_values = []
+    expected_ids = []
+
+    for tick, n_agents in enumerate(n_agents_per_tick):
+        if n_agents > len(population):
+            world.spawn_agents("agents", n_agents - len(population))
+        else:
+            world.kill_agents(list(population)[n_agents:])
+
+        for agent in population:
+            agent.value = tick * 1000 + agent.slot
+
+        recorder.record(tick)
+        expected_values.append([agent.value for agent in population])
+        expected_ids.append([agent.name for agent in population])
+
+    return expected_values, expected_ids
+
+
+def assert_recorded(recorder, expected_values, expected_ids):
+    data = recorder.get_data("value")
+    agent_ids = recorder.get_agent_ids("value")
+
+    assert len(data) == len(agent_ids) == len(expected_values)
+    assert list(recorder.get_ticks()) == list(range(len(expected_values)))
+
+    for row, values, ids in zip(range(len(data)), expected_values, expected_ids):
+        assert list(data[row, :len(values)]) == values
+        assert np.isnan(data[row, len(values):]).all()
+        assert list(agent_ids[row, :len(ids)]) == ids
+        assert (agent_ids[row, len(ids):] == -1).all()
+
+
+@pytest.mark.parametrize("declared", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_growing_and_shrinking_populations(tmp_path, declared, chunk_size):
+    world = create_world(4, declared)
+    recorder = Recorder(str(tmp_path), chunk_size)
+    recorder.register("value", world.agents["agents"])
+
+    n_agents_per_tick = [4, 6, 2, 9, 9, 30, 5, 0, 31, 12]
+    expected_values, expected_ids = record_ticks(world, recorder, n_agents_per_tick)
+    assert_recorded(recorder, expected_values, expected_ids)
+
+    recorder.flush()
+    assert_recorded(recorder, expected_values, expected_ids)
+
+
+def test_agent_data_follows_agents_across_slots():
+    world = create_world(5, True)
+    population = world.agents["agents"]
+    recorder = Recorder(chunk_size = 2)
+    recorder.register("value", population)
+
+    agent = population[4]
+    for tick in range(6):
+        for other_agent in population:
+            other_agent.value = tick
+        agent.value = 100 + tick
+        recorder.record(tick)
+        if tick == 1:
+            population[0].die(world.heaven)
+        if tick == 3:
+            world.spawn_agents("agents", 10)
+
+    assert list(recorder.get_agent_data("value", agent.name)) == [100, 101, 102, 103, 104, 105]
+    recorder.close()
+
+
+def test_temporary_directory_is_removed():
+    world = create_world(3, True)
+
+    with Recorder(chunk_size = 1) as recorder:
+        recorder.register("value", world.agents["agents"])
+        recorder.record(0)
+        directory = recorder.directory
+        assert os.path.isdir(directory)
+
+    assert not os.path.exists(directory)
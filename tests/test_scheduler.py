@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from World import *
+from Agent import *
+from Scheduler import *
+
+
+class ValueAgent(Agent):
+
+    def __init__(self, value = 0):
+        Agent.__init__(self)
+        self.value = value
+
+
+def create_world(n_agents = 6, declared = True):
+    world = World(10, 10)
+    world.create_grid()
+    world.agents["agents"] = Population({"value": int} if declared else None)
+    world.spawn_agents("agents", n_agents, agent_class = ValueAgent, attributes = {"value": list(range(n_agents))})
+    return world
+
+
+def chain_step(population):
+    """ Toy step: every agent takes the value of its predecessor (the first one of the last agent) plus 10 """
+    def step(agent):
+        predecessor = population[agent.slot - 1]
+        agent.value = predecessor.value + 10
+    return step
+
+
+def test_sequential_agents_see_earlier_updates():
+    world = create_world()
+    population = world.agents["agents"]
+    world.set_scheduler("agents", "sequential")
+
+    world.activate_agents("agents", chain_step(population))
+
+    assert [agent.value for agent in population] == [15, 25, 35, 45, 55, 65]
+
+
+@pytest.mark.parametrize("declared", [True, False])
+def test_synchronous_agents_see_the_previous_state(declared):
+    world = create_world(declared = declared)
+    population = world.agents["agents"]
+    world.set_scheduler("agents", "synchronous", ["value"])
+
+    seen_own_values = []
+
+    def step(agent):
+        chain_step(population)(agent)
+        seen_own_values.append(agent.value)
+
+    world.activate_agents("agents", step)
+
+    assert [agent.value for agent in population] == [15, 10, 11, 12, 13, 14]
+    assert seen_own_values == [15, 10, 11, 12, 13, 14]     # an agent sees its own new value during its activation
+    if declared:
+        assert list(population.column("value")) == [15, 10, 11, 12, 13, 14]
+
+
+def test_synchronous_matches_a_sequential_step_on_a_copy():
+    world = create_world(20)
+    population = world.agents["agents"]
+    world.set_scheduler("agents", "synchronous", ["value"])
+    previous_values = [agent.value for agent in population]
+
+    world.activate_agents("agents", lambda agent: setattr(
+        agent, "value", 2 * population[agent.slot - 1].value + population[(agent.slot + 1) % len(population)].value))
+
+    expected = [2 * previous_values[i - 1] + previous_values[(i + 1) % 20] for i in range(20)]
+    assert [agent.value for agent in population] == expected
+
+
+@pytest.mark.parametrize("scheduler", ["sequential", "random"])
+def test_agents_killed_during_the_tick_are_skipped(scheduler):
+    np.random.seed(2)
+    world = create_world(8)
+    population = world.agents["agents"]
+    world.set_scheduler("agents", scheduler)
+    activated = []
+    killed = []
+
+    def step(agent):
+        activated.append(agent)
+        # the first activated agent kills three others
+        if len(activated) == 1:
+            killed.extend([other for other in population if other is not agent][1::2][:3])
+            world.kill_agents(killed)
+
+    world.activate_agents("agents", step)
+
+    assert len(activated) == 8 - 3
+    assert not any(agent is dead_agent for agent in activated for dead_agent in killed)
+
+
+def test_random_scheduler_activates_every_agent_once():
+    np.random.seed(4)
+    world = create_world(50)
+    population = world.agents["agents"]
+    world.set_scheduler("agents", "random")
+    orders = []
+
+    for tick in range(3):
+        activated = []
+        world.activate_agents("agents", activated.append)
+        assert sorted(agent.slot for agent in activated) == list(range(50))
+        orders.append([agent.slot for agent in activated])
+
+    assert orders[0] != orders[1]
+    assert [agent.value for agent in population] == list(range(50))     # the population is not reordered
+
+
+def test_create_scheduler():
+    assert isinstance(create_scheduler("sequential"), SequentialScheduler)
+    assert isinstance(create_scheduler("random"), RandomScheduler)
+    assert isinstance(create_scheduler("synchronous", ["value"]), SynchronousScheduler)
+
+    scheduler = RandomScheduler()
+    assert create_scheduler(scheduler) is scheduler
+
+    with pytest.raises(ValueError):
+        create_scheduler("synchronous")
+    with pytest.raises(ValueError):
+        create_scheduler("parallel")
@@ -0,0 +1,107 @@
+import math
+import random
+
+import pytest
+
+from World import *
+from Agent import *
+from Helper import euclidian_distance
+
+RADII = [0, 1, 1.5, 2.9, 4, 7.3, 100, 1e8]
+
+
+def create_world(torus):
+    random.seed(11)
+    world = World(17, 13)
+    world.create_grid()
+    world.create_agents("agents", Agent, 90)
+    world.create_agents("others", Agent, 30)
+    world.place_agents_on_grid(world.agents["agents"])
+    world.place_agents_on_grid(world.agents["others"])
+    world.create_spatial_index(bucket_size = 4, torus = torus)
+
+    # Churn after the index was built: moves (some onto occupied cells) and deaths
+    population = world.agents["agents"]
+    for agent in random.sample(list(population), 30):
+        agent.move_to_this_cell(random.choice(world.grid_as_flat_list))
+    for agent in random.sample(list(population), 15):
+        agent.die(world.heaven)
+
+    return world
+
+
+def get_all_agents(world):
+    return [agent for population in world.agents.values() for agent in population]
+
+
+def distance(world, agent, x_grid_pos, y_grid_pos):
+    return euclidian_distance(agent.x_grid_pos, agent.y_grid_pos, x_grid_pos, y_grid_pos,
+                              world.len_x_grid_dim, world.len_y_grid_dim, world.spatial_index.torus)
+
+
+def get_query_positions(world):
+    return [(0, 0), (16, 12), (8, 6), (3, 11)] + [(agent.x_grid_pos, agent.y_grid_pos)
+                                                  for agent in list(world.agents["agents"])[:5]]
+
+
+@pytest.mark.parametrize("torus", [True, False])
+def test_index_holds_exactly_the_living_agents(torus):
+    world = create_world(torus)
+    living_agents = get_all_agents(world)
+
+    assert len(world.spatial_index) == len(living_agents)
+    assert all(agent in world.spatial_index for agent in living_agents)
+    assert not any(agent in world.spatial_index for agent in world.heaven)
+
+
+@pytest.mark.parametrize("torus", [True, False])
+@pytest.mark.parametrize("radius", RADII)
+def test_query_radius_matches_brute_force(torus, radius):
+    world = create_world(torus)
+    population = world.agents["others"]
+
+    for x_grid_pos, y_grid_pos in get_query_positions(world):
+        expected = {agent.name for agent in get_all_agents(world)
+                    if distance(world, agent, x_grid_pos, y_grid_pos) <= radius}
+        assert {agent.name for agent in world.spatial_index.query_radius(x_grid_pos, y_grid_pos, radius)} == expected
+
+        expected_in_population = {agent.name for agent in population
+                                  if distance(world, agent, x_grid_pos, y_grid_pos) <= radius}
+        assert {agent.name for agent in world.spatial_index.query_radius(
+            x_grid_pos, y_grid_pos, radius, population = population)} == expected_in_population
+
+
+@pytest.mark.parametrize("torus", [True, False])
+@pytest.mark.parametrize("k", [1, 5, 200])
+def test_query_nearest_matches_brute_force(torus, k):
+    world = create_world(torus)
+    agents = get_all_agents(world)
+
+    for x_grid_pos, y_grid_pos in get_query_positions(world):
+        expected_distances = sorted(distance(world, agent, x_grid_pos, y_grid_pos) for agent in agents)[:k]
+        nearest = world.spatial_index.query_nearest(x_grid_pos, y_grid_pos, k)
+
+        assert len({agent.name for agent in nearest}) == len(nearest)
+        assert [distance(world, agent, x_grid_pos, y_grid_pos) for agent in nearest] == expected_distances
+
+
+@pytest.mark.parametrize("torus", [True, False])
+@pytest.mark.parametrize("radius", RADII)
+def test_query_pairs_matches_brute_force(torus, radius):
+    world = create_world(torus)
+    agents = get_all_agents(world)
+
+    expected = {}
+    for i, agent in enumerate(agents):
+        for other_agent in agents[i + 1:]:
+            pair_distance = distance(world, agent, other_agent.x_grid_pos, other_agent.y_grid_pos)
+            if pair_distance <= radius:
+                expected[frozenset((agent.name, other_agent.name))] = pair_distance
+
+    pairs = world.spatial_index.query_pairs(radius)
+    found = {frozenset((agent.name, other_agent.name)): pair_distance for agent, other_agent, pair_distance in pairs}
+
+    assert len(found) == len(pairs)     # every pair only once
+    assert found.keys() == expected.keys()
+    for key, pair_distance in found.items():
+        assert math.isclose(pair_distance, expected[key])
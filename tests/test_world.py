@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from World import *
+from Agent import *
+
+
+def assert_free_cells_match_a_full_scan(world):
+    empty_cells = [cell for cell in world.grid_as_flat_list if cell.count_residents() == 0]
+
+    assert world.count_empty_cells() == len(empty_cells)
+    assert {id(cell) for cell in world.get_empty_cells()} == {id(cell) for cell in empty_cells}
+    for cell in world.grid_as_flat_list:
+        assert world.cell_arrays["n_residents"][cell.y_grid_pos, cell.x_grid_pos] == cell.count_residents()
+
+    if empty_cells:
+        assert world.get_random_empty_cell().count_residents() == 0
+        sample = world.get_random_empty_cells(min(5, len(empty_cells)))
+        assert len({id(cell) for cell in sample}) == len(sample)
+        assert all(cell.count_residents() == 0 for cell in sample)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_free_cell_index_under_churn(ordered):
+    random.seed(3)
+    world = World(12, 9)
+    world.create_grid()
+    world.create_agents("agents", Agent, 60, ordered = ordered)
+    population = world.agents["agents"]
+    world.place_agents_on_grid(population)
+    assert_free_cells_match_a_full_scan(world)
+
+    for step in range(200):
+        action = step % 5
+        if action == 0 and world.count_empty_cells():
+            random.choice(list(population)).move_to_this_cell(world.get_random_empty_cell())
+        elif action == 1:
+            # also onto occupied cells, several agents per cell
+            random.choice(list(population)).move_to_this_cell(random.choice(world.grid_as_flat_list))
+        elif action == 2 and len(population) > 10:
+            random.choice(list(population)).die(world.heaven)
+        elif action == 3 and len(population) > 10:
+            world.kill_agents(random.sample(list(population), 3))
+        elif world.count_empty_cells() >= 3:
+            world.spawn_agents("agents", 3)
+
+        assert_free_cells_match_a_full_scan(world)
+
+
+def test_full_and_empty_grid():
+    world = World(4, 3)
+    world.create_grid()
+    world.create_agents("agents", Agent, 12)
+    world.place_agents_on_grid(world.agents["agents"])
+
+    assert world.count_empty_cells() == 0
+    assert world.get_empty_cells() == []
+
+    world.kill_agents(list(world.agents["agents"]))
+    assert world.count_empty_cells() == 12
+    assert_free_cells_match_a_full_scan(world)